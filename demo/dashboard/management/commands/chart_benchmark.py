@@ -0,0 +1,189 @@
+import datetime
+import json
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django_dramatiq.models import Task
+
+from django_dramatiq_charts.forms import DramatiqLoadChartForm, DramatiqTimelineChartForm
+
+# actor: (queue, median duration sec), actor frequencies follow Zipf's law
+_actors = [
+    ('actor_{}'.format(i), ('default', 'mail', 'reports', 'import', 'cleanup')[i % 5], 2 ** (i % 8) / 4)
+    for i in range(20)
+]
+_actor_weights = [1 / (i + 1) for i in range(len(_actors))]
+_statuses = [
+    (Task.STATUS_DONE, 90), (Task.STATUS_FAILED, 5), (Task.STATUS_SKIPPED, 2),
+    (Task.STATUS_RUNNING, 1), (Task.STATUS_ENQUEUED, 1), (Task.STATUS_DELAYED, 1),
+]
+_period_start = datetime.datetime(2022, 2, 1)
+_period = datetime.timedelta(days=1)
+
+
+@contextmanager
+def _explicit_task_dates():
+    """Let bulk_create save generated created_at and updated_at"""
+    fields = [Task._meta.get_field('created_at'), Task._meta.get_field('updated_at')]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _make_dt(dt: datetime.datetime) -> datetime.datetime:
+    return timezone.make_aware(dt) if settings.USE_TZ else dt
+
+
+def generate_tasks(count: int, rnd: random.Random, batch_size: int = 5000):
+    """Bulk create tasks during the benchmark day, durations are log-normal around the actor median"""
+    statuses, status_weights = zip(*_statuses)
+    period_sec = _period.total_seconds()
+    with _explicit_task_dates():
+        for batch_start in range(0, count, batch_size):
+            tasks = []
+            for _ in range(min(batch_size, count - batch_start)):
+                actor_name, queue_name, median_sec = rnd.choices(_actors, _actor_weights)[0]
+                created_at = _period_start + datetime.timedelta(seconds=rnd.uniform(0, period_sec))
+                duration = datetime.timedelta(seconds=rnd.lognormvariate(0, 1) * median_sec)
+                tasks.append(Task(
+                    id=uuid.UUID(int=rnd.getrandbits(128)),
+                    status=rnd.choices(statuses, status_weights)[0],
+                    created_at=_make_dt(created_at),
+                    updated_at=_make_dt(created_at + duration),
+                    message_data=b'{}',
+                    actor_name=actor_name,
+                    queue_name=queue_name,
+                ))
+            Task.tasks.bulk_create(tasks)
+
+
+def _reference_loop():
+    """Fixed python work, each chart run is paired with it to compare times between runs and machines"""
+    rnd = random.Random(0)
+    counts = {}
+    for _ in range(20000):
+        key = rnd.randrange(100)
+        counts[key] = counts.get(key, 0) + 1
+    sorted(counts.items())
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _measure(fn, repeat: int) -> dict:
+    """
+    Median time of the repeats, median ratio of the time to the reference loop run next to it
+    (the machine speed changes are mostly cancelled) and the peak of python memory allocations
+    """
+    times = []
+    ratios = []
+    for _ in range(repeat):
+        reference_sec = _timed(_reference_loop)
+        times.append(_timed(fn))
+        ratios.append(times[-1] / reference_sec)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'time': round(statistics.median(times), 4),
+        'relative_time': round(statistics.median(ratios), 3),
+        'peak_kb': peak // 1024,
+    }
+
+
+def _get_form(form_class, **data):
+    form = form_class(data=data)
+    if not form.is_valid():
+        raise CommandError(form.errors.as_text())
+    return form
+
+
+class Command(BaseCommand):
+    help = 'Benchmark chart data on synthetic tasks in a test database, compare results with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help='Task table sizes, e.g. 10000 100000 1000000')
+        parser.add_argument('--windows', type=int, nargs='+', default=[1, 4, 24], help='Chart periods, hours')
+        parser.add_argument('--ticks', type=int, nargs='+', default=[1, 10, 60], help='Load chart intervals, sec')
+        parser.add_argument('--repeat', type=int, default=9, help='Runs of each case, the median time is used')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', help='Baseline json file, regressions fail the command')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed memory growth')
+        parser.add_argument('--time-tolerance', type=float, default=0.5,
+                            help='Allowed growth of the time relative to the reference loop')
+        parser.add_argument('--min-time', type=float, default=0.1,
+                            help='Time of the cases faster than this in the baseline, sec, is not compared')
+        parser.add_argument('--save-baseline', help='Write the results to the json file')
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        old_db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_db_name, verbosity=0)
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=4, sort_keys=True)
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            # peak memory is deterministic, short times are mostly noise
+            metrics = [('peak_kb', options['tolerance'])]
+            if baseline[name]['time'] >= options['min_time'] and 'relative_time' in baseline[name]:
+                metrics.append(('relative_time', options['time_tolerance']))
+            for metric, tolerance in metrics:
+                if result[metric] > baseline[name][metric] * (1 + tolerance):
+                    regressions.append('{} {}: {} > {}'.format(name, metric, result[metric], baseline[name][metric]))
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+
+    def _run(self, options) -> dict:
+        rnd = random.Random(options['seed'])
+        results = {}
+        task_count = 0
+        for size in sorted(options['sizes']):
+            started = time.perf_counter()
+            generate_tasks(size - task_count, rnd)
+            task_count = size
+            self.stdout.write('{} tasks generated in {:.1f} sec'.format(size, time.perf_counter() - started))
+            end_date = _period_start + _period
+            for window in options['windows']:
+                start_date = end_date - datetime.timedelta(hours=window)
+                period = dict(start_date=start_date, end_date=end_date)
+                cases = [
+                    ('timeline size={} window={}h'.format(size, window),
+                     _get_form(DramatiqTimelineChartForm, **period)),
+                ]
+                for tick in options['ticks']:
+                    cases.append(('load size={} window={}h tick={}'.format(size, window, tick),
+                                  _get_form(DramatiqLoadChartForm, time_interval=tick, **period)))
+                for name, form in cases:
+                    results[name] = result = _measure(form.get_chart_data, options['repeat'])
+                    self.stdout.write('{:<45} {:>9.4f} sec {:>9.3f} ref {:>9} KiB'.format(
+                        name, result['time'], result['relative_time'], result['peak_kb']))
+        return results
@@ -15,13 +15,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from django_dramatiq_charts.views import load_chart, timeline_chart, clean_cache
 from django.conf.urls import include, url
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('django_dramatiq_charts/load_chart/', load_chart, name='ddc_load_chart'),
-    path('django_dramatiq_charts/timeline_chart/', timeline_chart, name='ddc_timeline_chart'),
-    path('django_dramatiq_charts/clean_cache/', clean_cache, name='ddc_clean_cache'),
+    path('django_dramatiq_charts/', include('django_dramatiq_charts.urls')),
     url(r'^', include('dashboard.urls')),
 ]
@@ -0,0 +1,769 @@
+import datetime
+import math
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import connections
+from django.utils import timezone
+
+from .consts import LOAD_VALUE_SAMPLED, LOAD_VALUE_MEAN
+from .query import iter_task_rows
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+_1_us = datetime.timedelta(microseconds=1)
+_1_ms = datetime.timedelta(milliseconds=1)
+_us_in_sec = 10 ** 6
+_epoch = datetime.datetime(1970, 1, 1)
+
+
+def get_epoch_ms(dt: datetime.datetime) -> int:
+    """Milliseconds from the epoch to the wall time of the dt in the current time zone"""
+    if timezone.is_aware(dt):
+        dt = timezone.make_naive(dt)
+    return (dt - _epoch) // _1_ms
+
+
+class LoadTickCounter:
+    """
+    Number of simultaneously running tasks of each actor at each chart tick
+    Ticks are integer indexes: tick N is at start_date + N * tick_sec
+    load_value:
+        sampled - tasks running at the tick instant,
+            each task adds +1/-1 to a difference array of its actor when it is added, counts are the prefix sums,
+            tasks are not kept, so memory depends on actors and ticks only
+        max, mean - max and time-weighted mean of running tasks in the tick interval [tick, next tick),
+            task start/end events are swept in time order, so short tasks between tick instants are counted
+    Tasks are not counted at ticks before min_tick, they are counted elsewhere
+    """
+
+    def __init__(self, start_date: datetime.datetime, end_date: datetime.datetime, tick_sec: int,
+                 min_tick: int = 0, load_value: str = LOAD_VALUE_SAMPLED):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tick_sec = tick_sec
+        self.load_value = load_value
+        window_sec = (end_date - start_date).total_seconds()
+        # the last tick may be after the end date, tasks are never assigned to it
+        self.tick_count = len(range(0, int(window_sec + tick_sec), tick_sec))
+        self.min_tick = min_tick
+        self.max_tick = min(math.floor(window_sec / tick_sec), self.tick_count - 1)
+        self._window_us = (end_date - start_date) // _1_us
+        self.row_count = 0
+        self._actor_ids = {}  # actor name: actor index
+        # sampled: difference arrays by actor index
+        self._diffs = []
+        # max, mean: task columns for the sweep
+        # actor index, created_at and updated_at as microseconds since start_date
+        self._task_actors = []
+        self._task_created_us = []
+        self._task_updated_us = []
+        # counts aggregated outside: (actor index, tick, count)
+        self._tick_counts = []
+
+    def _get_actor_id(self, actor_name: str) -> int:
+        actor_id = self._actor_ids.get(actor_name)
+        if actor_id is None:
+            actor_id = self._actor_ids[actor_name] = len(self._actor_ids)
+        return actor_id
+
+    def _get_diff(self, actor_id: int) -> List[int]:
+        diffs = self._diffs
+        while len(diffs) <= actor_id:
+            diffs.append([0] * (self.tick_count + 1))
+        return diffs[actor_id]
+
+    def _add_diff(self, actor_id: int, created_us: int, updated_us: int):
+        tick_sec = self.tick_sec
+        # correcting the time range for external tasks
+        created_us = max(created_us, 0)
+        updated_us = min(updated_us, self._window_us)
+        first_tick = math.ceil(created_us / _us_in_sec / tick_sec)
+        last_tick = min(first_tick + int((updated_us - created_us) / _us_in_sec / tick_sec), self.max_tick)
+        first_tick = max(first_tick, self.min_tick)
+        if first_tick > last_tick:
+            return
+        diff = self._get_diff(actor_id)
+        diff[first_tick] += 1
+        diff[last_tick + 1] -= 1
+
+    def add(self, created_at: datetime.datetime, updated_at: datetime.datetime, actor_name: str):
+        self.row_count += 1
+        if (updated_at - created_at).days >= 1:
+            # miss tasks that "work" for more than a day (most likely an error)
+            return
+        actor_id = self._get_actor_id(actor_name)
+        created_us = (created_at - self.start_date) // _1_us
+        updated_us = (updated_at - self.start_date) // _1_us
+        if self.load_value == LOAD_VALUE_SAMPLED:
+            self._add_diff(actor_id, created_us, updated_us)
+        else:
+            self._task_actors.append(actor_id)
+            self._task_created_us.append(created_us)
+            self._task_updated_us.append(updated_us)
+
+    def extend(self, rows: Iterable[Tuple[datetime.datetime, datetime.datetime, str]]):
+        """Add (created_at, updated_at, actor_name) rows"""
+        for created_at, updated_at, actor_name in rows:
+            self.add(created_at, updated_at, actor_name)
+
+    def add_tick_count(self, actor_name: str, tick: Optional[int], count: int):
+        """Add a ready count of actor tasks at the tick, tick is None for actor without ticks"""
+        self.row_count += 1
+        actor_id = self._get_actor_id(actor_name)
+        if tick is not None and count:
+            self._tick_counts.append((actor_id, tick, count))
+
+    def merge(self, other: 'LoadTickCounter'):
+        """Add tasks and counts of the other counter with the same period and ticks"""
+        actor_ids = [self._get_actor_id(actor_name) for actor_name in other._actor_ids]
+        self.row_count += other.row_count
+        for actor_id, other_diff in zip(actor_ids, other._diffs):
+            diff = self._get_diff(actor_id)
+            diff[:] = [value + other_value for value, other_value in zip(diff, other_diff)]
+        self._task_actors.extend(actor_ids[actor_id] for actor_id in other._task_actors)
+        self._task_created_us.extend(other._task_created_us)
+        self._task_updated_us.extend(other._task_updated_us)
+        self._tick_counts.extend((actor_ids[actor_id], tick, count) for actor_id, tick, count in other._tick_counts)
+
+    @property
+    def actor_names(self) -> List[str]:
+        return list(self._actor_ids)
+
+    def get_counts(self) -> Dict[str, List[Optional[int]]]:
+        """
+        Task counts (load_value) by ticks for each actor, None for ticks without tasks
+        Ready counts of add_tick_count are tick instant counts, they are added as is for any load_value
+        """
+        if not self._actor_ids:
+            return {}
+        if self.load_value == LOAD_VALUE_SAMPLED:
+            counts = self._get_counts_py() if numpy is None else self._get_counts_np()
+        else:
+            maxes, areas = self._sweep_py() if numpy is None else self._sweep_np()
+            counts = self._get_interval_counts(maxes, areas)
+        return dict(zip(self._actor_ids, counts))
+
+    def _get_counts_py(self) -> List[List[Optional[int]]]:
+        self._get_diff(len(self._actor_ids) - 1)
+        counts = [list(accumulate(diff[:-1])) for diff in self._diffs]
+        for actor_id, tick, count in self._tick_counts:
+            counts[actor_id][tick] += count
+        return [[count or None for count in actor_counts] for actor_counts in counts]
+
+    def _get_counts_np(self) -> List[List[Optional[int]]]:
+        self._get_diff(len(self._actor_ids) - 1)
+        counts = numpy.cumsum(numpy.array(self._diffs, dtype=numpy.int64)[:, :-1], axis=1)
+        if self._tick_counts:
+            tick_counts = numpy.array(self._tick_counts, dtype=numpy.int64)
+            numpy.add.at(counts, (tick_counts[:, 0], tick_counts[:, 1]), tick_counts[:, 2])
+        counts = counts.astype(object)
+        counts[counts == 0] = None
+        return counts.tolist()
+
+    def _get_interval_bounds(self) -> Tuple[int, int]:
+        """Swept time range, microseconds since start_date: from the min_tick instant to the end date"""
+        return self.min_tick * self.tick_sec * _us_in_sec, self._window_us
+
+    def _get_interval_counts(self, maxes: List[List[int]], areas: List[List[int]]) -> List[list]:
+        tick_us = self.tick_sec * _us_in_sec
+        low_us, high_us = self._get_interval_bounds()
+        # the last tick interval is cut by the end date, it may be empty - then its mean is its max
+        tick_lengths = [
+            min((tick + 1) * tick_us, high_us) - max(tick * tick_us, low_us) for tick in range(self.tick_count)]
+        if self.load_value == LOAD_VALUE_MEAN:
+            counts = [
+                [area / length if length > 0 else float(tick_max) for tick_max, area, length in zip(
+                    actor_maxes, actor_areas, tick_lengths)]
+                for actor_maxes, actor_areas in zip(maxes, areas)
+            ]
+        else:
+            counts = maxes
+        for actor_id, tick, count in self._tick_counts:
+            counts[actor_id][tick] += count
+        if self.load_value == LOAD_VALUE_MEAN:
+            return [[round(count, 2) or None for count in actor_counts] for actor_counts in counts]
+        return [[count or None for count in actor_counts] for actor_counts in counts]
+
+    def _sweep_py(self) -> Tuple[List[List[int]], List[List[int]]]:
+        """
+        Max and area (running tasks * microseconds) of each actor in each tick interval
+        The events of each actor are sorted once, a start goes before an end at the same time
+        """
+        tick_us = self.tick_sec * _us_in_sec
+        low_us, high_us = self._get_interval_bounds()
+        max_tick = self.max_tick
+        actor_events = [[] for _ in self._actor_ids]
+        for actor_id, created_us, updated_us in zip(
+                self._task_actors, self._task_created_us, self._task_updated_us):
+            if created_us > high_us or updated_us < max(low_us, created_us):
+                continue
+            actor_events[actor_id].append((max(created_us, low_us), -1))
+            actor_events[actor_id].append((min(updated_us, high_us), 1))
+        maxes = [[0] * self.tick_count for _ in self._actor_ids]
+        areas = [[0] * self.tick_count for _ in self._actor_ids]
+        for events, tick_maxes, tick_areas in zip(actor_events, maxes, areas):
+            events.sort()
+            level = 0
+            time_us = low_us
+            for event_us, end in events:
+                # the level is constant from the previous event to this one
+                while level and time_us < event_us:
+                    tick = min(time_us // tick_us, max_tick)
+                    part_end_us = min(event_us, (tick + 1) * tick_us)
+                    tick_areas[tick] += level * (part_end_us - time_us)
+                    if level > tick_maxes[tick]:
+                        tick_maxes[tick] = level
+                    time_us = part_end_us
+                time_us = event_us
+                # the tasks that end at the event time are running at it
+                tick = min(event_us // tick_us, max_tick)
+                tick_maxes[tick] = max(tick_maxes[tick], level, level - end)
+                level -= end
+        return maxes, areas
+
+    def _sweep_np(self) -> Tuple[List[List[int]], List[List[int]]]:
+        tick_us = self.tick_sec * _us_in_sec
+        low_us, high_us = self._get_interval_bounds()
+        actors = numpy.array(self._task_actors, dtype=numpy.int64)
+        created_us = numpy.array(self._task_created_us, dtype=numpy.int64)
+        updated_us = numpy.array(self._task_updated_us, dtype=numpy.int64)
+        in_bounds = (created_us <= high_us) & (updated_us >= numpy.maximum(created_us, low_us))
+        actors = actors[in_bounds]
+        if not len(actors):
+            return [[0] * self.tick_count for _ in self._actor_ids], [[0] * self.tick_count for _ in self._actor_ids]
+        event_actors = numpy.concatenate((actors, actors))
+        event_us = numpy.concatenate((
+            numpy.maximum(created_us[in_bounds], low_us), numpy.minimum(updated_us[in_bounds], high_us)))
+        event_diffs = numpy.concatenate((numpy.ones(len(actors), numpy.int64), -numpy.ones(len(actors), numpy.int64)))
+        # by actor, time, a start before an end at the same time
+        order = numpy.lexsort((-event_diffs, event_us, event_actors))
+        event_actors, event_us, event_diffs = event_actors[order], event_us[order], event_diffs[order]
+        # the events of each actor sum to 0, so the global running sum is the running sum of each actor
+        levels = numpy.cumsum(event_diffs)
+        # area before each event, the level between actors is 0
+        areas_before = numpy.concatenate(([0], numpy.cumsum(levels[:-1] * numpy.diff(event_us))))
+        # events are searched by (actor, time) keys
+        actor_span_us = high_us + 1
+        event_keys = event_actors * actor_span_us + event_us
+        actor_ids = numpy.arange(len(self._actor_ids), dtype=numpy.int64)[:, numpy.newaxis]
+        tick_bounds_us = numpy.clip(numpy.arange(self.tick_count + 1, dtype=numpy.int64) * tick_us, low_us, high_us)
+        bound_keys = actor_ids * actor_span_us + tick_bounds_us
+        # level and area at the tick bounds, the last event before a bound is of the same actor or its level is 0
+        last_events = numpy.searchsorted(event_keys, bound_keys, side='right') - 1
+        has_events = last_events >= 0
+        last_events = numpy.maximum(last_events, 0)
+        bound_areas = numpy.where(has_events, areas_before[last_events] + levels[last_events] * (
+            tick_bounds_us - event_us[last_events]), 0)
+        areas = numpy.diff(bound_areas, axis=1)
+        # the max of a tick is the level before its start or a level after an event in it
+        prev_events = numpy.searchsorted(event_keys, bound_keys[:, :-1], side='left') - 1
+        maxes = numpy.where(prev_events >= 0, levels[numpy.maximum(prev_events, 0)], 0)
+        event_ticks = numpy.minimum(event_us // tick_us, self.max_tick)
+        numpy.maximum.at(maxes, (event_actors, event_ticks), levels)
+        # ticks out of the swept range
+        for tick_values in (maxes, areas):
+            tick_values[:, :self.min_tick] = 0
+            tick_values[:, self.max_tick + 1:] = 0
+        return maxes.tolist(), areas.tolist()
+
+
+class TimelineColumns:
+    """
+    Timeline tasks as columns: actor, queue and status are indexes in the value tables,
+    start and end are milliseconds from the epoch (see get_epoch_ms)
+    """
+
+    def __init__(self, color_fn: Callable[[str], str]):
+        self.color_fn = color_fn
+        self.row_count = 0
+        self._tables = {'actor': {}, 'queue': {}, 'status': {}}  # column: {value: value index}
+        self._columns = {'actor': [], 'queue': [], 'status': [], 'start': [], 'end': []}
+
+    def _get_value_id(self, column: str, value: str) -> int:
+        table = self._tables[column]
+        value_id = table.get(value)
+        if value_id is None:
+            value_id = table[value] = len(table)
+        return value_id
+
+    def add(self, actor_name: str, queue_name: str, status: str,
+            created_at: datetime.datetime, updated_at: datetime.datetime):
+        self.row_count += 1
+        columns = self._columns
+        columns['actor'].append(self._get_value_id('actor', actor_name))
+        columns['queue'].append(self._get_value_id('queue', queue_name))
+        columns['status'].append(self._get_value_id('status', status))
+        columns['start'].append(get_epoch_ms(created_at))
+        columns['end'].append(get_epoch_ms(updated_at))
+
+    def extend(self, rows: Iterable[Tuple[str, str, str, datetime.datetime, datetime.datetime]]):
+        """Add (actor_name, queue_name, status, created_at, updated_at) rows"""
+        for row in rows:
+            self.add(*row)
+
+    def get_data(self, max_bars: int = 0, period_ms: int = 0) -> dict:
+        """
+        Column data, with more than max_bars tasks short tasks are merged into bars with "count" column
+        period_ms - chart period duration, the initial merge interval is period_ms / max_bars
+        """
+        actors = list(self._tables['actor'])
+        data = {
+            'actors': actors,
+            'colors': [self.color_fn(actor_name) for actor_name in actors],
+            'queues': list(self._tables['queue']),
+            'statuses': list(self._tables['status']),
+        }
+        if max_bars and self.row_count > max_bars:
+            data.update(self._get_merged_columns(max_bars, period_ms))
+        else:
+            data.update(self._columns)
+        return data
+
+    def _get_merged_columns(self, max_bars: int, period_ms: int) -> Dict[str, list]:
+        """
+        Tasks shorter than the merge interval are merged by actor, queue, status and interval,
+        the interval is doubled until bars fit max_bars, the rest is sampled evenly
+        """
+        columns = self._columns
+        rows = list(zip(columns['actor'], columns['queue'], columns['status'], columns['start'], columns['end']))
+        merge_ms = max(period_ms // max_bars, 1000)
+        while True:
+            bars = []
+            merged_bars = {}
+            for actor_id, queue_id, status_id, start, end in rows:
+                if end - start >= merge_ms:
+                    bars.append([actor_id, queue_id, status_id, start, end, 1])
+                    continue
+                key = (actor_id, queue_id, status_id, start // merge_ms)
+                bar = merged_bars.get(key)
+                if bar is None:
+                    merged_bars[key] = [actor_id, queue_id, status_id, start, end, 1]
+                else:
+                    bar[3] = min(bar[3], start)
+                    bar[4] = max(bar[4], end)
+                    bar[5] += 1
+            bars.extend(merged_bars.values())
+            if len(bars) <= max_bars or merge_ms >= period_ms:
+                break
+            merge_ms *= 2
+        # same order as tasks: by start and end desc
+        bars.sort(key=lambda i: (i[3], i[4]), reverse=True)
+        if len(bars) > max_bars:
+            step = len(bars) / max_bars
+            bars = [bars[int(i * step)] for i in range(max_bars)]
+        return dict(zip(('actor', 'queue', 'status', 'start', 'end', 'count'), map(list, zip(*bars))))
+
+
+class ThroughputCounter:
+    """
+    Number of tasks created and updated to each status at each chart tick, for each group of tasks
+    Tick N has events in [start_date + N * tick_sec, start_date + (N + 1) * tick_sec)
+    One pass over tasks: each task adds 1 to the "created" counter and to the counter of its status
+    """
+    CREATED = 'created'
+
+    def __init__(self, start_date: datetime.datetime, end_date: datetime.datetime, tick_sec: int):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tick_sec = tick_sec
+        self.tick_count = math.ceil((end_date - start_date).total_seconds() / tick_sec)
+        self.row_count = 0
+        self._tick = datetime.timedelta(seconds=tick_sec)
+        self._counts = {}  # group: {series: [count of each tick]}
+
+    def _get_counts(self, group, series: str) -> List[int]:
+        group_counts = self._counts.get(group)
+        if group_counts is None:
+            group_counts = self._counts[group] = {}
+        counts = group_counts.get(series)
+        if counts is None:
+            counts = group_counts[series] = [0] * self.tick_count
+        return counts
+
+    def add(self, group, status: str, created_at: datetime.datetime, updated_at: datetime.datetime):
+        self.row_count += 1
+        tick_count = self.tick_count
+        tick = (created_at - self.start_date) // self._tick
+        if 0 <= tick < tick_count:
+            self._get_counts(group, self.CREATED)[tick] += 1
+        tick = (updated_at - self.start_date) // self._tick
+        if 0 <= tick < tick_count:
+            self._get_counts(group, status)[tick] += 1
+
+    def extend(self, rows: Iterable[Tuple[object, str, datetime.datetime, datetime.datetime]]):
+        """Add (group, status, created_at, updated_at) rows"""
+        for group, status, created_at, updated_at in rows:
+            self.add(group, status, created_at, updated_at)
+
+    def add_tick_count(self, group, series: str, tick: int, count: int):
+        """Add a ready count of group events at the tick"""
+        self.row_count += 1
+        self._get_counts(group, series)[tick] += count
+
+    def get_counts(self) -> Dict[object, Dict[str, List[int]]]:
+        """Counts by ticks of each series ("created" and statuses) for each group"""
+        return self._counts
+
+
+class QueueWaitCounter:
+    """
+    Tasks waiting in each queue: enqueued (or available after the delay) and not started
+    Depth of tick N is the number of tasks waiting at start_date + N * tick_sec,
+    wait times of tick N are of the tasks started in [start_date + N * tick_sec, start_date + (N + 1) * tick_sec)
+    """
+
+    def __init__(self, start_date: datetime.datetime, end_date: datetime.datetime, tick_sec: int):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tick_sec = tick_sec
+        self.tick_count = math.ceil((end_date - start_date).total_seconds() / tick_sec)
+        self.row_count = 0
+        self._tick = datetime.timedelta(seconds=tick_sec)
+        # queue: [depth difference array, wait sum, wait count, max wait of each tick]
+        self._queues = {}
+
+    def _get_queue_data(self, queue_name: str) -> list:
+        queue_data = self._queues.get(queue_name)
+        if queue_data is None:
+            tick_count = self.tick_count
+            queue_data = self._queues[queue_name] = [
+                [0] * (tick_count + 1), [0.0] * tick_count, [0] * tick_count, [0.0] * tick_count]
+        return queue_data
+
+    def add(self, queue_name: str, enqueued_at: datetime.datetime, started_at: datetime.datetime, started: bool):
+        """
+        Add a task waiting from enqueued_at to started_at, not started tasks wait till started_at
+        and have no wait time
+        """
+        self.row_count += 1
+        wait = started_at - enqueued_at
+        if wait.days >= 1:
+            # miss tasks that wait for more than a day (most likely an error or a lost message)
+            return
+        first_tick = max(-(-(enqueued_at - self.start_date) // self._tick), 0)
+        # ticks before the start are waiting
+        end_tick = min(-(-(started_at - self.start_date) // self._tick), self.tick_count)
+        depths, wait_sums, wait_counts, wait_maxes = self._get_queue_data(queue_name)
+        if first_tick < end_tick:
+            depths[first_tick] += 1
+            depths[end_tick] -= 1
+        tick = (started_at - self.start_date) // self._tick
+        if started and 0 <= tick < self.tick_count:
+            wait_sec = max(wait.total_seconds(), 0)
+            wait_sums[tick] += wait_sec
+            wait_counts[tick] += 1
+            wait_maxes[tick] = max(wait_maxes[tick], wait_sec)
+
+    def extend(self, rows: Iterable[Tuple[str, datetime.datetime, datetime.datetime, bool]]):
+        """Add (queue_name, enqueued_at, started_at, started) rows"""
+        for queue_name, enqueued_at, started_at, started in rows:
+            self.add(queue_name, enqueued_at, started_at, started)
+
+    def get_data(self) -> Dict[str, Tuple[List[int], List[Optional[float]], List[Optional[float]]]]:
+        """
+        Depths, mean and max wait seconds by ticks for each queue with waiting or started tasks,
+        wait times are None for ticks without started tasks
+        """
+        result = {}
+        for queue_name, (depths, wait_sums, wait_counts, wait_maxes) in self._queues.items():
+            depths = list(accumulate(depths[:-1]))
+            if not any(depths) and not any(wait_counts):
+                continue
+            result[queue_name] = (
+                depths,
+                [round(wait_sum / count, 3) if count else None for wait_sum, count in zip(wait_sums, wait_counts)],
+                [round(wait_max, 3) if count else None for wait_max, count in zip(wait_maxes, wait_counts)],
+            )
+        return result
+
+
+def count_load_in_shards(counter: LoadTickCounter, task_qs, shard_count: int,
+                         count_fn: Callable[[LoadTickCounter, object], None]):
+    """
+    Count tasks concurrently by created_at shards of the counted ticks, each task is in exactly one shard
+    count_fn(counter, task_qs) counts a shard into its own counter in a thread with its own db connection
+    """
+    shard_start = counter.start_date + datetime.timedelta(seconds=counter.tick_sec * counter.min_tick)
+    shard_duration = (counter.end_date - shard_start) / shard_count
+    # the first shard has tasks that start before the period, the last - after it
+    bounds = [None] + [shard_start + shard_duration * i for i in range(1, shard_count)] + [None]
+
+    def count_shard(created_from: Optional[datetime.datetime], created_to: Optional[datetime.datetime]):
+        shard_counter = LoadTickCounter(
+            counter.start_date, counter.end_date, counter.tick_sec, counter.min_tick, counter.load_value)
+        shard_qs = task_qs
+        if created_from is not None:
+            shard_qs = shard_qs.filter(created_at__gte=created_from)
+        if created_to is not None:
+            shard_qs = shard_qs.filter(created_at__lt=created_to)
+        try:
+            count_fn(shard_counter, shard_qs)
+        finally:
+            connections.close_all()
+        return shard_counter
+
+    with ThreadPoolExecutor(max_workers=shard_count) as executor:
+        for shard_counter in executor.map(count_shard, bounds[:-1], bounds[1:]):
+            counter.merge(shard_counter)
+
+
+_load_ticks_pg_sql = """
+SELECT task.actor_name, tick, COUNT(tick)
+FROM (
+    SELECT actor_name, GREATEST(first_tick, %s) AS first_tick, LEAST(first_tick + TRUNC(EXTRACT(EPOCH FROM (
+        LEAST(updated_at, %s) - GREATEST(created_at, %s)
+    )) / %s), %s) AS last_tick
+    FROM (
+        SELECT actor_name, created_at, updated_at, CEIL(EXTRACT(EPOCH FROM (
+            GREATEST(created_at, %s) - %s
+        )) / %s) AS first_tick
+        FROM ({task_sql}) AS filtered_task
+        WHERE updated_at - created_at < INTERVAL '1 day'
+    ) AS bounded_task
+) AS task
+LEFT JOIN LATERAL generate_series(
+    CAST(task.first_tick AS BIGINT), CAST(task.last_tick AS BIGINT)
+) AS tick ON TRUE
+GROUP BY task.actor_name, tick
+"""
+
+
+def count_load_in_db(counter: LoadTickCounter, task_qs):
+    """
+    Count tasks by ticks on the database side, only (actor, tick, count) rows are fetched
+    PostgreSQL and tick instant counts only, otherwise only the required columns are fetched and counted in python
+    """
+    task_qs = task_qs.order_by().values('actor_name', 'created_at', 'updated_at')
+    connection = connections[task_qs.db]
+    if connection.vendor != 'postgresql' or counter.load_value != LOAD_VALUE_SAMPLED:
+        counter.extend(iter_task_rows(task_qs, ('created_at', 'updated_at', 'actor_name')))
+        return
+    task_sql, task_params = task_qs.query.sql_with_params()
+    start_date, end_date, tick_sec = counter.start_date, counter.end_date, counter.tick_sec
+    # in order of appearance in the query
+    params = (counter.min_tick, end_date, start_date, tick_sec, counter.max_tick,
+              start_date, start_date, tick_sec, *task_params)
+    with connection.cursor() as cursor:
+        cursor.execute(_load_ticks_pg_sql.format(task_sql=task_sql), params)
+        for actor_name, tick, count in cursor:
+            counter.add_tick_count(actor_name, tick, count)
+
+
+class DDSketch:
+    """
+    Streaming quantile sketch with relative accuracy (DDSketch): values are counted in logarithmic bins,
+    a quantile is within relative_accuracy of the exact one, size depends on the value range, not on count
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.count = 0
+        self.zero_count = 0  # values less than min_value
+        self.bins = {}  # bin index: count, bin i has values in (gamma ** (i - 1), gamma ** i]
+
+    def add(self, value: float):
+        self.count += 1
+        if value < self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other: 'DDSketch'):
+        """Add values of the other sketch with the same accuracy"""
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value of the q quantile (0 <= q <= 1), None for the empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)  # pragma: no cover
+
+
+# upper edges of the duration histogram bins in microseconds, the last bin has longer durations
+DURATION_HISTOGRAM_EDGES = (
+    ('1 ms', 10 ** 3), ('2 ms', 2 * 10 ** 3), ('5 ms', 5 * 10 ** 3), ('10 ms', 10 ** 4), ('20 ms', 2 * 10 ** 4),
+    ('50 ms', 5 * 10 ** 4), ('100 ms', 10 ** 5), ('200 ms', 2 * 10 ** 5), ('500 ms', 5 * 10 ** 5),
+    ('1 s', 10 ** 6), ('2 s', 2 * 10 ** 6), ('5 s', 5 * 10 ** 6), ('10 s', 10 ** 7), ('30 s', 3 * 10 ** 7),
+    ('1 min', 6 * 10 ** 7), ('2 min', 12 * 10 ** 7), ('5 min', 3 * 10 ** 8), ('10 min', 6 * 10 ** 8),
+    ('30 min', 18 * 10 ** 8), ('1 h', 36 * 10 ** 8), ('2 h', 72 * 10 ** 8), ('6 h', 216 * 10 ** 8),
+    ('12 h', 432 * 10 ** 8), ('1 d', 864 * 10 ** 8),
+)
+_duration_edges_us = [edge_us for _, edge_us in DURATION_HISTOGRAM_EDGES]
+
+
+def get_duration_bin_labels() -> List[str]:
+    """Labels of the duration histogram bins"""
+    labels = [label for label, _ in DURATION_HISTOGRAM_EDGES]
+    return ['< ' + labels[0]] + ['{} - {}'.format(*pair) for pair in zip(labels, labels[1:])] + ['> ' + labels[-1]]
+
+
+class DurationCounter:
+    """
+    Task duration (updated_at - created_at) quantiles of each actor at each chart tick and duration histogram
+    Tick N has tasks updated in [start_date + N * tick_sec, start_date + (N + 1) * tick_sec)
+    Tasks are not stored: durations are added to a DDSketch of the actor tick and to the actor histogram
+    """
+
+    def __init__(self, start_date: datetime.datetime, end_date: datetime.datetime, tick_sec: int,
+                 relative_accuracy: float = 0.01):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tick_sec = tick_sec
+        self.tick_count = math.ceil((end_date - start_date).total_seconds() / tick_sec)
+        self.relative_accuracy = relative_accuracy
+        self.row_count = 0
+        self._tick = datetime.timedelta(seconds=tick_sec)
+        self._sketches = {}  # (actor name, tick): DDSketch
+        self._histograms = {}  # actor name: [count of each bin]
+        # quantiles computed outside: (actor name, tick): ([quantile values], count)
+        self._tick_quantiles = {}
+
+    def _get_histogram(self, actor_name: str) -> List[int]:
+        histogram = self._histograms.get(actor_name)
+        if histogram is None:
+            histogram = self._histograms[actor_name] = [0] * (len(_duration_edges_us) + 1)
+        return histogram
+
+    def add(self, created_at: datetime.datetime, updated_at: datetime.datetime, actor_name: str):
+        self.row_count += 1
+        duration_us = max((updated_at - created_at) // _1_us, 0)
+        key = (actor_name, (updated_at - self.start_date) // self._tick)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            sketch = self._sketches[key] = DDSketch(self.relative_accuracy)
+        sketch.add(duration_us / _us_in_sec)
+        self._get_histogram(actor_name)[bisect_right(_duration_edges_us, duration_us)] += 1
+
+    def extend(self, rows: Iterable[Tuple[datetime.datetime, datetime.datetime, str]]):
+        """Add (created_at, updated_at, actor_name) rows"""
+        for created_at, updated_at, actor_name in rows:
+            self.add(created_at, updated_at, actor_name)
+
+    def add_tick_quantiles(self, actor_name: str, tick: int, values: Sequence[float], count: int):
+        """Add ready quantile values of the actor tasks at the tick"""
+        self._tick_quantiles[(actor_name, tick)] = (list(values), count)
+
+    def add_histogram_count(self, actor_name: str, histogram_bin: int, count: int):
+        """Add a ready count of actor tasks in the histogram bin, the row count is the histogram sum"""
+        self.row_count += count
+        self._get_histogram(actor_name)[histogram_bin] += count
+
+    @property
+    def actor_names(self) -> List[str]:
+        return sorted(self._histograms)
+
+    def get_quantiles(self, quantiles: Sequence[float]) -> Dict[str, Tuple[List[list], List[Optional[int]]]]:
+        """
+        For each actor: durations in seconds by ticks for each quantile and task counts by ticks,
+        None for ticks without tasks
+        """
+        result = {
+            actor_name: ([[None] * self.tick_count for _ in quantiles], [None] * self.tick_count)
+            for actor_name in self._histograms
+        }
+        for (actor_name, tick), sketch in self._sketches.items():
+            actor_durations, actor_counts = result[actor_name]
+            for durations, q in zip(actor_durations, quantiles):
+                durations[tick] = round(sketch.quantile(q), 6)
+            actor_counts[tick] = sketch.count
+        for (actor_name, tick), (values, count) in self._tick_quantiles.items():
+            actor_durations, actor_counts = result[actor_name]
+            for durations, value in zip(actor_durations, values):
+                durations[tick] = round(value, 6)
+            actor_counts[tick] = count
+        return result
+
+    def get_histogram(self) -> Dict[str, List[int]]:
+        """Task counts in the duration bins (see get_duration_bin_labels) of each actor"""
+        return {actor_name: list(histogram) for actor_name, histogram in self._histograms.items()}
+
+
+_duration_quantiles_pg_sql = """
+SELECT actor_name, FLOOR(EXTRACT(EPOCH FROM (updated_at - %s)) / %s) AS tick, PERCENTILE_CONT(%s) WITHIN GROUP (
+    ORDER BY CAST(EXTRACT(EPOCH FROM (GREATEST(updated_at, created_at) - created_at)) AS DOUBLE PRECISION)
+), COUNT(*)
+FROM ({task_sql}) AS filtered_task
+GROUP BY actor_name, tick
+"""
+
+_duration_histogram_pg_sql = """
+SELECT actor_name, WIDTH_BUCKET(
+    CAST(ROUND(EXTRACT(EPOCH FROM (GREATEST(updated_at, created_at) - created_at)) * 1000000) AS BIGINT),
+    CAST(%s AS BIGINT[])
+) AS duration_bin, COUNT(*)
+FROM ({task_sql}) AS filtered_task
+GROUP BY actor_name, duration_bin
+"""
+
+
+def count_durations_in_db(counter: DurationCounter, task_qs, quantiles: Sequence[float]):
+    """
+    Exact quantiles by PERCENTILE_CONT and the histogram on the database side, PostgreSQL only,
+    for other databases only the required columns are fetched and counted in python
+    """
+    task_qs = task_qs.order_by().values('actor_name', 'created_at', 'updated_at')
+    connection = connections[task_qs.db]
+    if connection.vendor != 'postgresql':
+        counter.extend(iter_task_rows(task_qs, ('created_at', 'updated_at', 'actor_name')))
+        return
+    task_sql, task_params = task_qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(_duration_quantiles_pg_sql.format(task_sql=task_sql),
+                       (counter.start_date, counter.tick_sec, list(quantiles), *task_params))
+        for actor_name, tick, values, count in cursor:
+            counter.add_tick_quantiles(actor_name, int(tick), values, count)
+        cursor.execute(_duration_histogram_pg_sql.format(task_sql=task_sql), (_duration_edges_us, *task_params))
+        for actor_name, duration_bin, count in cursor:
+            counter.add_histogram_count(actor_name, duration_bin, count)
+
+
+_throughput_pg_sql = """
+SELECT actor_name, queue_name, event.series, FLOOR(EXTRACT(EPOCH FROM (event.dt - %s)) / %s) AS tick, COUNT(*)
+FROM ({task_sql}) AS filtered_task
+CROSS JOIN LATERAL (VALUES (%s, created_at), (status, updated_at)) AS event (series, dt)
+WHERE event.dt >= %s AND event.dt < %s
+GROUP BY actor_name, queue_name, event.series, tick
+"""
+
+
+def count_throughput_in_db(counter: ThroughputCounter, task_qs, group_fn: Callable[[str, str], object]):
+    """
+    Count task events by ticks in a single GROUP BY on the database side, PostgreSQL only,
+    for other databases only the required columns are fetched and counted in python
+    group_fn(actor_name, queue_name) - group of the task
+    """
+    task_qs = task_qs.order_by().values('actor_name', 'queue_name', 'status', 'created_at', 'updated_at')
+    connection = connections[task_qs.db]
+    if connection.vendor != 'postgresql':
+        for actor_name, queue_name, status, created_at, updated_at in iter_task_rows(
+                task_qs, ('actor_name', 'queue_name', 'status', 'created_at', 'updated_at')):
+            counter.add(group_fn(actor_name, queue_name), status, created_at, updated_at)
+        return
+    task_sql, task_params = task_qs.query.sql_with_params()
+    # in order of appearance in the query
+    params = (counter.start_date, counter.tick_sec, *task_params,
+              counter.CREATED, counter.start_date, counter.end_date)
+    with connection.cursor() as cursor:
+        cursor.execute(_throughput_pg_sql.format(task_sql=task_sql), params)
+        for actor_name, queue_name, series, tick, count in cursor:
+            counter.add_tick_count(group_fn(actor_name, queue_name), series, int(tick), count)
@@ -0,0 +1,145 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import Event, Lock
+from typing import AsyncIterator, Iterator
+
+import django
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from . import views
+from .config import get_async_workers
+
+_executor = None
+_executor_lock = Lock()
+# produced and not sent parts of a streaming response
+_stream_queue_size = 2
+_stream_end = object()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_async_workers(), thread_name_prefix='django_dramatiq_charts')
+        return _executor
+
+
+def _async_view(view):
+    """Async variant of the view for ASGI: the view runs in the bounded chart thread pool, not in the event loop"""
+
+    def call_view(request, *args, **kwargs):
+        # request_started and request_finished close connections of the handler thread, not of the pool threads
+        close_old_connections()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(call_view, thread_sensitive=False, executor=_get_executor())(
+            request, *args, **kwargs)
+
+    return async_view
+
+
+async def _iter_in_executor(iterator: Iterator) -> AsyncIterator:
+    """
+    Parts of the sync iterator produced in one thread of the chart pool, the event loop only sends them:
+    a database cursor of the iterator is used in the thread that opened it
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(_stream_queue_size)
+    stopped = Event()
+
+    def produce():
+        close_old_connections()
+        try:
+            for part in iterator:
+                if stopped.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(queue.put((part, None)), loop).result()
+            item = (_stream_end, None)
+        except Exception as e:
+            item = (_stream_end, e)
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            close_old_connections()
+        if not stopped.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    producer = loop.run_in_executor(_get_executor(), produce)
+    try:
+        while True:
+            part, error = await queue.get()
+            if error is not None:
+                raise error
+            if part is _stream_end:
+                break
+            yield part
+    finally:
+        # the client is gone or the stream is sent: a blocked producer is released and stops
+        stopped.set()
+        while not queue.empty():
+            queue.get_nowait()
+        await producer
+
+
+def _read_streaming_response(view):
+    """
+    The view with the streaming content read in the view thread:
+    Django before 4.2 iterates streaming responses in the event loop, where the rows can not be queried
+    """
+
+    @wraps(view)
+    def read_view(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = list(response.streaming_content)
+        return response
+
+    return read_view
+
+
+def _async_export_view(view):
+    """
+    Async variant of the export view: the response is created in the chart thread pool,
+    with Django 4.2+ its rows are produced there while the event loop sends them,
+    older versions read the whole export there before sending
+    """
+    if django.VERSION < (4, 2):
+        return _async_view(_read_streaming_response(view))
+    async_view = _async_view(view)
+
+    @wraps(view)
+    async def async_export_view(request, *args, **kwargs):
+        response = await async_view(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = _iter_in_executor(iter(response.streaming_content))
+        return response
+
+    return async_export_view
+
+
+load_chart = _async_view(views.load_chart)
+load_chart_data = _async_view(views.load_chart_data)
+load_chart_export = _async_export_view(views.load_chart_export)
+load_chart_delta = _async_view(views.load_chart_delta)
+duration_chart = _async_view(views.duration_chart)
+duration_chart_data = _async_view(views.duration_chart_data)
+duration_chart_export = _async_export_view(views.duration_chart_export)
+throughput_chart = _async_view(views.throughput_chart)
+throughput_chart_data = _async_view(views.throughput_chart_data)
+throughput_chart_export = _async_export_view(views.throughput_chart_export)
+queue_chart = _async_view(views.queue_chart)
+queue_chart_data = _async_view(views.queue_chart_data)
+queue_chart_export = _async_export_view(views.queue_chart_export)
+timeline_chart = _async_view(views.timeline_chart)
+timeline_chart_data = _async_view(views.timeline_chart_data)
+timeline_chart_export = _async_export_view(views.timeline_chart_export)
+chart_colors = _async_view(views.chart_colors)
+clean_cache = _async_view(views.clean_cache)
@@ -0,0 +1,70 @@
+import json
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .consts import CACHE_KEY_CHART_DATA_PREFIX, CACHE_KEY_CHART_DATA_VERSION
+from .config import get_cache_chart_data_sec, get_cache_recent_chart_data_sec, get_timeline_max_bars, \
+    get_auto_ticks, get_load_rollup_interval_sec
+from .json_encoder import get_json_encoder_name
+
+
+def get_chart_data_settings() -> tuple:
+    """Settings that change the chart data of the same filter"""
+    return get_timeline_max_bars(), get_auto_ticks(), get_load_rollup_interval_sec(), get_json_encoder_name()
+
+
+def get_chart_data_cache_key(form) -> str:
+    """
+    Cache key of the chart data: form class, normalized filter, settings qs filter, chart data settings
+    and the cache version, so changed settings do not serve stale data
+    """
+    key_data = json.dumps(
+        (
+            type(form).__name__,
+            form.get_normalized_data(),
+            str(form.get_qs_filter()),
+            get_chart_data_settings(),
+            cache.get(CACHE_KEY_CHART_DATA_VERSION, 0),
+        ),
+        sort_keys=True,
+        cls=DjangoJSONEncoder,
+    )
+    return '{}__{}'.format(CACHE_KEY_CHART_DATA_PREFIX, md5(key_data.encode()).hexdigest())
+
+
+def get_chart_data_cache_timeout(form) -> int:
+    """Shorter timeout for the chart periods that are not finished yet"""
+    cache_sec = get_cache_chart_data_sec()
+    if not cache_sec:
+        return 0
+    start_date, end_date = form.get_period()
+    if end_date >= timezone.now():
+        return min(cache_sec, get_cache_recent_chart_data_sec())
+    return cache_sec
+
+
+def get_cached_chart_data(form) -> dict:
+    """form.get_chart_data() cached by DJANGO_DRAMATIQ_CHARTS_CACHE_CHART_DATA_SEC, form should be valid"""
+    timeout = get_chart_data_cache_timeout(form)
+    if not timeout:
+        return form.get_chart_data()
+    cache_key = get_chart_data_cache_key(form)
+    chart_data = cache.get(cache_key)
+    form.timing.count('cache_hit', int(chart_data is not None))
+    if chart_data is None:
+        chart_data = form.get_chart_data()
+        cache.set(cache_key, chart_data, timeout)
+    # title shows the requested values, not the normalized ones
+    chart_data['chart_title'] = form.get_title()
+    return chart_data
+
+
+def clean_chart_data_cache():
+    """Make all cached chart data outdated"""
+    try:
+        cache.incr(CACHE_KEY_CHART_DATA_VERSION)
+    except ValueError:
+        cache.set(CACHE_KEY_CHART_DATA_VERSION, 1, None)
@@ -0,0 +1,73 @@
+import datetime
+import threading
+import time
+from typing import Callable, Iterable
+
+import dramatiq
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from django_dramatiq import models
+from dramatiq.common import q_name
+
+from .config import get_cache_form_data_sec, get_choices_fn, get_choices_recent_days
+
+_refresh_lock_sec = 60 * 5
+
+
+def distinct_choices(field_name: str) -> Iterable[str]:
+    """All distinct values of the task column, scans the whole task table"""
+    return models.Task.tasks.values_list(field_name, flat=True).distinct().order_by(field_name)
+
+
+def recent_distinct_choices(field_name: str) -> Iterable[str]:
+    """Distinct values of the tasks updated during DJANGO_DRAMATIQ_CHARTS_CHOICES_RECENT_DAYS, uses updated_at index"""
+    updated_after = timezone.now() - datetime.timedelta(days=get_choices_recent_days())
+    return models.Task.tasks.filter(updated_at__gte=updated_after).values_list(
+        field_name, flat=True).distinct().order_by(field_name)
+
+
+def broker_choices(field_name: str) -> Iterable[str]:
+    """Actors and queues declared in the dramatiq broker, no database queries"""
+    broker = dramatiq.get_broker()
+    if field_name == 'actor_name':
+        return sorted(broker.get_declared_actors())
+    # without delay and dead letter queues
+    return sorted({q_name(queue_name) for queue_name in broker.get_declared_queues()})
+
+
+def _get_choices_fn() -> Callable[[str], Iterable[str]]:
+    return get_choices_fn() or distinct_choices
+
+
+def get_choices(field_name: str) -> ((str, str),):
+    """Form choices by DJANGO_DRAMATIQ_CHARTS_CHOICES_FN"""
+    return tuple((i, i) for i in _get_choices_fn()(field_name))
+
+
+def _refresh_cached_choices(cache_key: str, field_name: str, cache_sec: int):
+    try:
+        cache.set(cache_key, (time.time() + cache_sec, get_choices(field_name)), None)
+    finally:
+        cache.delete(cache_key + '__refresh')
+        connections.close_all()
+
+
+def get_cached_choices(cache_key: str, field_name: str) -> ((str, str),):
+    """
+    Choices cached for DJANGO_DRAMATIQ_CHARTS_CACHE_FORM_DATA_SEC, stale-while-revalidate:
+    expired choices are returned while a background thread builds new ones, only empty cache waits for them
+    """
+    cache_sec = get_cache_form_data_sec()
+    if not cache_sec:
+        return get_choices(field_name)
+    cached = cache.get(cache_key)
+    if cached is None:
+        choices = get_choices(field_name)
+        cache.set(cache_key, (time.time() + cache_sec, choices), None)
+        return choices
+    fresh_until, choices = cached
+    if fresh_until < time.time() and cache.add(cache_key + '__refresh', True, _refresh_lock_sec):
+        threading.Thread(
+            target=_refresh_cached_choices, args=(cache_key, field_name, cache_sec), daemon=True).start()
+    return choices
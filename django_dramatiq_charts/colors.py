@@ -0,0 +1,104 @@
+import colorsys
+from functools import lru_cache
+from hashlib import md5
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.core.cache import cache
+
+from .choices import get_cached_choices
+from .consts import CACHE_KEY_ACTOR_CHOICES, CACHE_KEY_ACTOR_COLORS
+
+_golden_angle = 137.50776405003785
+_max_hue_distance = 24
+_hue_attempts = 64
+_saturation = 0.65
+_lightness_levels = (0.45, 0.6, 0.35)
+
+
+def _name_hash(name: str) -> int:
+    return int(md5(str(name).encode()).hexdigest()[:8], 16)
+
+
+def _hsl_hex(hue: float, lightness: float) -> str:
+    return '#{:02x}{:02x}{:02x}'.format(
+        *(round(i * 255) for i in colorsys.hls_to_rgb(hue / 360, lightness, _saturation)))
+
+
+def _hue_distance(hue: float, other: float) -> float:
+    distance = abs(hue - other) % 360
+    return min(distance, 360 - distance)
+
+
+@lru_cache(maxsize=4096)
+def get_name_color(name: str) -> str:
+    """Permanent color of the name: hue and lightness from the name hash"""
+    name_hash = _name_hash(name)
+    return _hsl_hex(name_hash % 360, _lightness_levels[name_hash // 360 % len(_lightness_levels)])
+
+
+# name: (hue, lightness level index)
+AssignedColors = Dict[str, Tuple[float, int]]
+
+
+class ColorTable:
+    """
+    Colors of the names, deterministic for the same set of names:
+    names get hues from their hashes in sorted order, a hue close to the taken ones is moved by the golden angle
+    assigned - colors of the previous table, they are kept, only new names get hues
+    Names outside of the table get get_name_color
+    """
+
+    def __init__(self, names: Iterable[str], assigned: Optional[AssignedColors] = None):
+        self.assigned = dict(assigned or {})
+        new_names = sorted(set(names) - set(self.assigned))
+        # similar hues are avoided while the names fit the color circle
+        min_distance = min(_max_hue_distance, 360 / max(len(self.assigned) + len(new_names), 1))
+        taken_hues = [hue for hue, _ in self.assigned.values()]
+        for name in new_names:
+            name_hash = _name_hash(name)
+            hue = best_hue = float(name_hash % 360)
+            best_distance = -1
+            for _ in range(_hue_attempts):
+                distance = min((_hue_distance(hue, i) for i in taken_hues), default=360)
+                if distance > best_distance:
+                    best_hue, best_distance = hue, distance
+                if distance >= min_distance:
+                    break
+                hue = (hue + _golden_angle) % 360
+            taken_hues.append(best_hue)
+            self.assigned[name] = (best_hue, name_hash // 360 % len(_lightness_levels))
+        self.colors = {  # name: hex color
+            name: _hsl_hex(hue, _lightness_levels[lightness_level])
+            for name, (hue, lightness_level) in sorted(self.assigned.items())
+        }
+        self.version = md5('\n'.join(
+            '{} {}'.format(name, color) for name, color in self.colors.items()).encode()).hexdigest()[:12]
+
+    def get_color(self, name: str) -> str:
+        color = self.colors.get(name)
+        if color is None:
+            return get_name_color(name)
+        return color
+
+
+@lru_cache(maxsize=16)
+def _get_color_table(names: Tuple[str, ...], assigned: Tuple[Tuple[str, Tuple[float, int]], ...] = ()) -> ColorTable:
+    return ColorTable(names, dict(assigned))
+
+
+def get_color_table(names: Iterable[str]) -> ColorTable:
+    """Color table of the names, built once for the same names in the process"""
+    return _get_color_table(tuple(sorted(set(names))))
+
+
+def get_actor_color_table() -> ColorTable:
+    """
+    Color table of the actor choices, charts use it for consistent actor colors
+    Assigned colors are kept in the cache without timeout, so a new actor does not change colors of the others
+    """
+    assigned = cache.get(CACHE_KEY_ACTOR_COLORS) or {}
+    names = {value for value, _ in get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name')}
+    if names - set(assigned):
+        assigned = ColorTable(names, assigned).assigned
+        cache.set(CACHE_KEY_ACTOR_COLORS, assigned, None)
+    return _get_color_table((), tuple(sorted(assigned.items())))
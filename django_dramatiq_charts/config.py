@@ -3,6 +3,8 @@ from typing import Optional, Callable
 from django.conf import settings
 from django.db.models import Q
 
+from .consts import LOAD_BACKEND_PYTHON, JSON_ENCODER_AUTO
+
 
 def _has_charts_perm_fn_default(request):
     return request.user.is_superuser
@@ -12,6 +14,14 @@ def get_perm_fn() -> Callable:
     return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_PERM_FN", _has_charts_perm_fn_default)
 
 
+def get_choices_fn() -> Optional[Callable]:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_CHOICES_FN", None)
+
+
+def get_choices_recent_days() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_CHOICES_RECENT_DAYS", 30)
+
+
 def get_load_chart_qs_filter() -> Optional[Q]:
     return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER", None)
 
@@ -20,9 +30,105 @@ def get_timeline_chart_qs_filter() -> Optional[Q]:
     return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER", None)
 
 
+def get_duration_chart_qs_filter() -> Optional[Q]:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_DURATION_QS_FILTER", None)
+
+
+def get_throughput_chart_qs_filter() -> Optional[Q]:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_THROUGHPUT_QS_FILTER", None)
+
+
+def get_queue_chart_qs_filter() -> Optional[Q]:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_QUEUE_QS_FILTER", None)
+
+
+def get_cache_message_data_sec() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_CACHE_MESSAGE_DATA_SEC", 60 * 60 * 24)
+
+
 def get_cache_form_data_sec() -> int:
     return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_CACHE_FORM_DATA_SEC", 60 * 60 * 4)
 
 
+def get_cache_chart_data_sec() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_CACHE_CHART_DATA_SEC", 0)
+
+
+def get_cache_recent_chart_data_sec() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_CACHE_RECENT_CHART_DATA_SEC", 10)
+
+
 def get_clean_cache_redirect_url() -> int:
     return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_CLEAN_CACHE_REDIRECT_URL", None)
+
+
+def get_load_chart_backend() -> str:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_LOAD_BACKEND", LOAD_BACKEND_PYTHON)
+
+
+def get_duration_chart_backend() -> str:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_DURATION_BACKEND", LOAD_BACKEND_PYTHON)
+
+
+def get_throughput_chart_backend() -> str:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_THROUGHPUT_BACKEND", LOAD_BACKEND_PYTHON)
+
+
+def get_qs_chunk_size() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_QS_CHUNK_SIZE", 2000)
+
+
+def get_load_rollup_interval_sec() -> Optional[int]:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_INTERVAL_SEC", None)
+
+
+def get_load_rollup_max_days() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_MAX_DAYS", 90)
+
+
+def get_load_rollup_max_lag_sec() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_MAX_LAG_SEC", 60 * 60)
+
+
+def get_timeline_max_bars() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_TIMELINE_MAX_BARS", 2000)
+
+
+def get_live_refresh_sec() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_LIVE_REFRESH_SEC", 10)
+
+
+def get_timing_enabled() -> bool:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_TIMING", False)
+
+
+def get_load_workers() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_LOAD_WORKERS", 1)
+
+
+def get_async_workers() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_ASYNC_WORKERS", 4)
+
+
+def get_json_encoder() -> str:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_JSON_ENCODER", JSON_ENCODER_AUTO)
+
+
+def get_max_date_range_days() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_MAX_DATE_RANGE_DAYS", 7)
+
+
+def get_auto_ticks() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_AUTO_TICKS", 500)
+
+
+def get_max_ticks() -> int:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_MAX_TICKS", 100000)
+
+
+def get_task_qs_fn() -> Optional[Callable]:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_TASK_QS_FN", None)
+
+
+def get_task_rows_fn() -> Optional[Callable]:
+    return getattr(settings, "DJANGO_DRAMATIQ_CHARTS_TASK_ROWS_FN", None)
@@ -1,3 +1,32 @@
-CACHE_KEY_ACTOR_CHOICES = 'django_dramatiq_charts__actor_choice_list'
+CACHE_KEY_ACTOR_CHOICES = 'django_dramatiq_charts__actor_choices'
 
-CACHE_KEY_QUEUE_CHOICES = 'django_dramatiq_charts__queue_choice_list'
+CACHE_KEY_QUEUE_CHOICES = 'django_dramatiq_charts__queue_choices'
+
+CACHE_KEY_CHART_DATA_PREFIX = 'django_dramatiq_charts__chart_data'
+
+CACHE_KEY_CHART_DATA_VERSION = 'django_dramatiq_charts__chart_data_version'
+
+CACHE_KEY_ACTOR_COLORS = 'django_dramatiq_charts__actor_colors'
+
+LOAD_BACKEND_PYTHON = 'python'
+
+LOAD_BACKEND_DB = 'db'
+
+JSON_ENCODER_AUTO = 'auto'
+
+JSON_ENCODER_ORJSON = 'orjson'
+
+JSON_ENCODER_MSGSPEC = 'msgspec'
+
+JSON_ENCODER_JSON = 'json'
+
+LOAD_VALUE_SAMPLED = 'sampled'
+
+LOAD_VALUE_MAX = 'max'
+
+LOAD_VALUE_MEAN = 'mean'
+
+CACHE_KEY_MESSAGE_TIMES_PREFIX = 'django_dramatiq_charts__message_times'
+
+# message option with the start time of the message processing, epoch milliseconds, see TaskStartMiddleware
+MESSAGE_OPTION_STARTED_AT = 'ddc_started_at'
@@ -0,0 +1,137 @@
+import csv
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+from django.conf import settings
+
+from .config import get_qs_chunk_size
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_ARROW = 'arrow'
+EXPORT_FORMAT_PARQUET = 'parquet'
+
+# export format: (content type, file extension)
+_export_formats = {
+    EXPORT_FORMAT_CSV: ('text/csv', 'csv'),
+    EXPORT_FORMAT_ARROW: ('application/vnd.apache.arrow.stream', 'arrows'),
+    EXPORT_FORMAT_PARQUET: ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# export columns are (name, type) pairs, type is one of: datetime, str, int, float
+ExportColumns = List[Tuple[str, str]]
+
+
+def get_export_formats() -> List[str]:
+    """Available export formats, arrow and parquet require pyarrow"""
+    if pyarrow is None:
+        return [EXPORT_FORMAT_CSV]
+    return list(_export_formats)
+
+
+def get_export_content_type(export_format: str) -> str:
+    return _export_formats[export_format][0]
+
+
+def get_export_file_name(name: str, export_format: str) -> str:
+    return '{}.{}'.format(name, _export_formats[export_format][1])
+
+
+def _iter_batches(rows: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class _Echo:
+    """File-like object for csv.writer, the written line is returned"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(columns: ExportColumns, rows: Iterable[tuple]) -> Iterator[str]:
+    """CSV text by batches of rows"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for batch in _iter_batches(rows, get_qs_chunk_size()):
+        yield ''.join(writer.writerow(row) for row in batch)
+
+
+class _StreamSink:
+    """Write-only file for pyarrow writers, written bytes are taken after each batch"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _get_arrow_schema(columns: ExportColumns):
+    # aware datetimes are stored in UTC
+    types = {
+        'datetime': pyarrow.timestamp('us', tz='UTC' if settings.USE_TZ else None),
+        'str': pyarrow.string(),
+        'int': pyarrow.int64(),
+        'float': pyarrow.float64(),
+    }
+    return pyarrow.schema([(name, types[column_type]) for name, column_type in columns])
+
+
+def iter_arrow(columns: ExportColumns, rows: Iterable[tuple], export_format: str) -> Iterator[bytes]:
+    """Arrow IPC stream or Parquet file by batches of rows, a batch is a record batch or a row group"""
+    schema = _get_arrow_schema(columns)
+    sink = _StreamSink()
+    arrow_file = pyarrow.PythonFile(sink, mode='w')
+    if export_format == EXPORT_FORMAT_PARQUET:
+        writer = pyarrow.parquet.ParquetWriter(arrow_file, schema)
+    else:
+        writer = pyarrow.ipc.new_stream(arrow_file, schema)
+    for batch in _iter_batches(rows, get_qs_chunk_size()):
+        writer.write_batch(pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array(values, field.type) for values, field in zip(zip(*batch), schema)], schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def iter_export(export_format: str, columns: ExportColumns, rows: Iterable[tuple]) -> Iterator:
+    """Exported rows in the format by parts for StreamingHttpResponse"""
+    if export_format == EXPORT_FORMAT_CSV:
+        return iter_csv(columns, rows)
+    return iter_arrow(columns, rows, export_format)
@@ -1,43 +1,36 @@
 import datetime
-import json
 import math
-from collections import Counter
 from hashlib import md5
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
 
 from django import forms
-from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
 from django_dramatiq import models
 
-from .consts import CACHE_KEY_ACTOR_CHOICES, CACHE_KEY_QUEUE_CHOICES
-from .config import get_load_chart_qs_filter, get_timeline_chart_qs_filter, get_cache_form_data_sec
+from .aggregation import LoadTickCounter, TimelineColumns, DurationCounter, ThroughputCounter, QueueWaitCounter, \
+    count_load_in_db, count_load_in_shards, count_durations_in_db, count_throughput_in_db, get_duration_bin_labels
+from .choices import get_cached_choices
+from .colors import get_actor_color_table, get_color_table
+from .message_data import iter_with_message_times, epoch_ms_to_dt
+from .timing import ChartTiming
+from .export import ExportColumns
+from .query import TaskQuery, iter_task_rows
+from .rollup import can_use_load_rollup, count_load_from_rollup, is_load_rollup_built
+from .consts import CACHE_KEY_ACTOR_CHOICES, CACHE_KEY_QUEUE_CHOICES, LOAD_BACKEND_DB, LOAD_VALUE_SAMPLED, \
+    LOAD_VALUE_MAX, LOAD_VALUE_MEAN
+from .config import get_load_chart_qs_filter, get_timeline_chart_qs_filter, get_load_chart_backend, \
+    get_load_rollup_max_days, get_timeline_max_bars, get_load_workers, \
+    get_duration_chart_qs_filter, get_duration_chart_backend, get_throughput_chart_qs_filter, \
+    get_throughput_chart_backend, get_max_date_range_days, get_auto_ticks, get_max_ticks, get_queue_chart_qs_filter
 
 
 def get_actor_choices() -> ((str, str),):
-    cache_form_data_sec = get_cache_form_data_sec()
-    result = tuple()
-    if cache_form_data_sec:
-        result = cache.get(CACHE_KEY_ACTOR_CHOICES)
-    if not result:
-        result = tuple(
-            (i, i) for i in models.Task.tasks.values_list('actor_name', flat=True).distinct().order_by('actor_name')
-        )
-        if cache_form_data_sec:
-            cache.set(CACHE_KEY_ACTOR_CHOICES, result, cache_form_data_sec)
-    return result
+    return get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name')
 
 
 def get_queue_choices() -> ((str, str),):
-    cache_form_data_sec = get_cache_form_data_sec()
-    result = tuple()
-    if cache_form_data_sec:
-        result = cache.get(CACHE_KEY_QUEUE_CHOICES)
-    if not result:
-        result = tuple(
-            (i, i) for i in models.Task.tasks.values_list('queue_name', flat=True).distinct().order_by('queue_name')
-        )
-        if cache_form_data_sec:
-            cache.set(CACHE_KEY_QUEUE_CHOICES, result, cache_form_data_sec)
-    return result
+    return get_cached_choices(CACHE_KEY_QUEUE_CHOICES, 'queue_name')
 
 
 def get_dt_delta_ms(start: datetime.datetime, end: datetime.datetime) -> int:
@@ -46,10 +39,39 @@ def get_dt_delta_ms(start: datetime.datetime, end: datetime.datetime) -> int:
 
 
 def permanent_hex_color_for_name(name: str) -> str:
+    """
+    Permanent color of the name from its md5, kept for compatibility:
+    charts use get_actor_color_table for actor colors without similar hues
+    """
     hex_color: str = md5(str(name).encode()).hexdigest()[1:7]
     return '#' + hex_color
 
 
+_1_day = datetime.timedelta(days=1)
+
+
+def get_tick_dates(start_date: datetime.datetime, tick_sec: int, tick_count: int) -> List[datetime.datetime]:
+    """Dates of the chart ticks"""
+    return [start_date + datetime.timedelta(seconds=tick_sec * i) for i in range(tick_count)]
+
+
+# chart intervals of the adaptive mode, longer intervals are whole days
+_auto_tick_secs = (
+    1, 2, 5, 10, 15, 30,
+    60, 60 * 2, 60 * 5, 60 * 10, 60 * 15, 60 * 30,
+    60 * 60, 60 * 60 * 2, 60 * 60 * 3, 60 * 60 * 6, 60 * 60 * 12, 60 * 60 * 24,
+)
+
+
+def get_auto_tick_sec(period_sec: float, max_ticks: int) -> int:
+    """The shortest round chart interval with at most max_ticks intervals in the period"""
+    min_tick_sec = period_sec / max(max_ticks, 1)
+    for tick_sec in _auto_tick_secs:
+        if tick_sec >= min_tick_sec:
+            return tick_sec
+    return math.ceil(min_tick_sec / _auto_tick_secs[-1]) * _auto_tick_secs[-1]
+
+
 def _now_dt() -> datetime.datetime:
     return datetime.datetime.now()
 
@@ -66,6 +88,8 @@ class BasicFilterForm(forms.Form):
     date_format = "%Y-%m-%d"
     dt_format_sec = "%Y-%m-%d %H:%M:%S"
     dt_format_ms = "%Y-%m-%d %H:%M:%S.%f"
+    # order of the task queryset, order does not matter for counting
+    task_ordering = ()
 
     start_date = forms.DateTimeField(label='Period start', initial=_4_hours_ago, widget=forms.DateTimeInput(
         attrs={'placeholder': 'Period start', 'style': 'width: 9.5rem;', 'maxlength': '19'}
@@ -76,6 +100,11 @@ class BasicFilterForm(forms.Form):
     queue = forms.MultipleChoiceField(choices=get_queue_choices, required=False, label='Queue')
     actor = forms.MultipleChoiceField(choices=get_actor_choices, required=False, label='Actor')
 
+    def __init__(self, *args, timing: Optional[ChartTiming] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # chart data phases are measured here
+        self.timing = timing or ChartTiming()
+
     def clean(self):
         cleaned_data = super().clean()
         start_date = cleaned_data.get('start_date', None)
@@ -84,13 +113,26 @@ class BasicFilterForm(forms.Form):
         if start_date and end_date:
             if start_date >= end_date:
                 raise forms.ValidationError('The period start date is greater than or equal to the period end date')
-            if (end_date - start_date) > datetime.timedelta(days=7):
-                raise forms.ValidationError('The maximum date range is 7 days')
+            period_sec = (end_date - start_date).total_seconds()
+            if 'time_interval' in self.fields and not time_interval:
+                # adaptive mode: the chart has at most DJANGO_DRAMATIQ_CHARTS_AUTO_TICKS ticks
+                time_interval = cleaned_data['time_interval'] = get_auto_tick_sec(period_sec, get_auto_ticks())
+            max_date_range_days = self.get_max_date_range_days()
+            if (end_date - start_date) > datetime.timedelta(days=max_date_range_days):
+                raise forms.ValidationError('The maximum date range is {} days'.format(max_date_range_days))
             if time_interval:
-                if (end_date - start_date).total_seconds() < time_interval * 2:
+                if period_sec < time_interval * 2:
                     raise forms.ValidationError('Time interval is too long')
+                max_ticks = get_max_ticks()
+                if period_sec / time_interval > max_ticks:
+                    raise forms.ValidationError(
+                        'The maximum number of intervals is {}, increase the interval or leave it empty'.format(
+                            max_ticks))
         return cleaned_data
 
+    def get_max_date_range_days(self) -> int:
+        return get_max_date_range_days()
+
     def get_title(self) -> str:
         pairs = []
         if self.is_bound and self.is_valid():
@@ -102,6 +144,8 @@ class BasicFilterForm(forms.Form):
                         pairs.append((fields_label, field_value.strftime(self.date_format)))
                     elif type(field_value) is datetime.datetime:
                         pairs.append((fields_label, field_value.strftime(self.dt_format_sec)))
+                    elif hasattr(self.fields[field_name], 'choices') and isinstance(field_value, str):
+                        pairs.append((fields_label, dict(self.fields[field_name].choices)[field_value]))
                     elif hasattr(self.fields[field_name], 'choices'):
                         pairs.append((fields_label, ', '.join(
                             [dict(self.fields[field_name].choices)[value] for value in field_value])))
@@ -109,121 +153,517 @@ class BasicFilterForm(forms.Form):
                         pairs.append((fields_label, field_value))
         return ', '.join('{}: <b>{}</b>'.format(k, v) for k, v in pairs if v)
 
+    def get_period(self) -> (datetime.datetime, datetime.datetime):
+        """Chart period start and end"""
+        return self.cleaned_data['start_date'], self.cleaned_data['end_date']
+
+    def get_qs_filter(self) -> Optional[Q]:
+        """Additional task queryset filter from settings"""
+        return None
+
+    def get_period_filter(self, start_date: datetime.datetime, end_date: datetime.datetime) -> Q:
+        """Tasks that run in the period"""
+        return Q(updated_at__gte=start_date, created_at__lte=end_date)
+
+    def get_task_query(self, start_date: datetime.datetime, end_date: datetime.datetime) -> TaskQuery:
+        """Chart tasks of the period filtered by the form, the query is built the same way for all charts"""
+        cd = self.cleaned_data
+        return TaskQuery(self.get_period_filter(start_date, end_date), actors=cd.get('actor'), queues=cd.get('queue'),
+                         statuses=cd.get('status'), qs_filter=self.get_qs_filter(), ordering=self.task_ordering)
+
+    def get_task_qs(self, start_date: datetime.datetime, end_date: datetime.datetime):
+        """Filtered tasks of the period"""
+        return self.get_task_query(start_date, end_date).get_queryset()
 
-class DramatiqLoadChartForm(BasicFilterForm):
+    def get_normalized_data(self) -> dict:
+        """Cleaned data, equal for the forms that build equal charts"""
+        result = {}
+        for field_name, field_value in self.cleaned_data.items():
+            if isinstance(field_value, (list, tuple)):
+                field_value = sorted(field_value)
+            result[field_name] = field_value
+        result['start_date'], result['end_date'] = (i.isoformat() for i in self.get_period())
+        return result
+
+
+class TickChartForm(BasicFilterForm):
+    """Chart by time intervals (ticks) from the period start, the period is aligned to minutes"""
     time_interval = forms.IntegerField(
-        label='Interval, sec', initial=10, min_value=1, max_value=60 * 60 * 24,
-        widget=forms.TextInput(attrs={'style': 'width: 2rem;', 'maxlength': '5'})
+        label='Interval, sec', min_value=1, max_value=60 * 60 * 24, required=False,
+        widget=forms.TextInput(attrs={'style': 'width: 2rem;', 'maxlength': '5', 'placeholder': 'auto'})
     )
+
+    field_order = ['start_date', 'end_date', 'time_interval']
+    # initial time interval of the chart, sec
+    initial_time_interval = 60
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['time_interval'].initial = self.initial_time_interval
+
+    def get_period(self) -> (datetime.datetime, datetime.datetime):
+        start_date, end_date = super().get_period()
+        return start_date.replace(second=0, microsecond=0), end_date.replace(second=0, microsecond=0)
+
+    def get_tick_rows(self, chart_data: dict, keys: Sequence[str],
+                      get_values: Callable[..., Optional[tuple]]) -> Iterable[tuple]:
+        """
+        Export rows (tick, category, *values) of the chart data lists of the keys by category and tick
+        get_values(tick, *category lists) returns the values of the row, None for skipped ticks
+        """
+        if chart_data['empty_qs']:
+            return []
+        tick_dates = get_tick_dates(self.get_period()[0], chart_data['time_interval'], chart_data['tick_count'])
+        category_data = list(zip(chart_data['categories'], *(chart_data[key] for key in keys)))
+
+        def iter_rows():
+            for tick, tick_date in enumerate(tick_dates):
+                for category, *category_lists in category_data:
+                    values = get_values(tick, *category_lists)
+                    if values is not None:
+                        yield (tick_date, category, *values)
+
+        return iter_rows()
+
+
+class DramatiqLoadChartForm(TickChartForm):
     status = forms.MultipleChoiceField(label='Status', required=False,
                                        choices=models.Task.STATUSES, initial=models.Task.STATUS_DONE)
+    load_value = forms.ChoiceField(label='Value', required=False, initial=LOAD_VALUE_SAMPLED, choices=(
+        (LOAD_VALUE_SAMPLED, 'At tick'),
+        (LOAD_VALUE_MAX, 'Max in interval'),
+        (LOAD_VALUE_MEAN, 'Mean in interval'),
+    ))
 
-    field_order = ['start_date', 'end_date', 'time_interval']
+    initial_time_interval = 10
+
+    def get_qs_filter(self) -> Optional[Q]:
+        return get_load_chart_qs_filter()
+
+    def get_load_value(self) -> str:
+        return self.cleaned_data.get('load_value') or LOAD_VALUE_SAMPLED
+
+    def can_use_load_rollup(self, start_date: datetime.datetime, tick_sec: int) -> bool:
+        # the rollup has tick instant counts only
+        return self.get_load_value() == LOAD_VALUE_SAMPLED and can_use_load_rollup(start_date, tick_sec)
+
+    def get_max_date_range_days(self) -> int:
+        # long periods are counted from the rollup, if it is built - otherwise the whole period is read from tasks
+        cd = self.cleaned_data
+        start_date, end_date, time_interval = cd.get('start_date'), cd.get('end_date'), cd.get('time_interval')
+        max_date_range_days = super().get_max_date_range_days()
+        if start_date and end_date and time_interval and \
+                end_date - start_date > datetime.timedelta(days=max_date_range_days) and \
+                self.can_use_load_rollup(start_date.replace(second=0, microsecond=0), time_interval) and \
+                is_load_rollup_built(end_date):
+            return get_load_rollup_max_days()
+        return max_date_range_days
+
+    @staticmethod
+    def _count_load(counter: LoadTickCounter, task_qs):
+        if get_load_chart_backend() == LOAD_BACKEND_DB:
+            count_load_in_db(counter, task_qs)
+        else:
+            counter.extend(iter_task_rows(task_qs, ('created_at', 'updated_at', 'actor_name')))
+
+    def count_load(self, counter: LoadTickCounter, task_qs):
+        """Count tasks by the configured backend, in time shards concurrently with several workers"""
+        load_workers = get_load_workers()
+        self.timing.count('shards', load_workers)
+        if load_workers > 1:
+            count_load_in_shards(counter, task_qs, load_workers, self._count_load)
+        else:
+            self._count_load(counter, task_qs)
 
     def get_chart_data(self) -> dict:
         cd = self.cleaned_data
-        start_date = cd['start_date'].replace(second=0, microsecond=0)
-        end_date = cd['end_date'].replace(second=0, microsecond=0)
+        start_date, end_date = self.get_period()
         tick_sec = cd['time_interval']
-        actors = cd.get('actor')
-        queues = cd.get('queue')
-        statuses = cd.get('status')
-        # get qs
-        task_qs = models.Task.tasks.filter(
-            updated_at__gte=start_date, created_at__lte=end_date
-        ).order_by('updated_at')
-        load_chart_qs_filter = get_load_chart_qs_filter()
-        if actors:
-            task_qs = task_qs.filter(actor_name__in=actors)
-        if queues:
-            task_qs = task_qs.filter(queue_name__in=queues)
-        if statuses:
-            task_qs = task_qs.filter(status__in=statuses)
-        if load_chart_qs_filter:
-            task_qs = task_qs.filter(load_chart_qs_filter)
-        if not task_qs.count():
+        task_qs = self.get_task_qs(start_date, end_date)
+        counter = LoadTickCounter(start_date, end_date, tick_sec, load_value=self.get_load_value())
+        if self.can_use_load_rollup(start_date, tick_sec):
+            # ticks after the rollup watermark are counted from the task table
+            with self.timing.phase('rollup'):
+                counter.min_tick = count_load_from_rollup(
+                    counter, cd.get('actor'), cd.get('queue'), cd.get('status'))
+            task_qs = task_qs.filter(
+                updated_at__gte=start_date + datetime.timedelta(seconds=tick_sec * (counter.min_tick - 1)))
+        if counter.min_tick <= counter.max_tick:
+            with self.timing.phase('fetch'):
+                self.count_load(counter, task_qs)
+        self.timing.count('rows', counter.row_count)
+        self.timing.count('ticks', counter.tick_count)
+        if not counter.row_count:
             return {
                 'empty_qs': True,
                 'chart_title': self.get_title(),
             }
-        categories = []
-        # dt: a list of actors that worked at this time
-        actor_wt_by_ticks = {(start_date + datetime.timedelta(seconds=i)).strftime(self.dt_format_sec): []
-                             for i in range(0, int((end_date - start_date).total_seconds() + tick_sec), tick_sec)}
-        for task in task_qs:
-            # correcting the time range for external tasks
-            updated_at = min(task.updated_at, end_date)
-            created_at = max(task.created_at, start_date)
-            if (task.updated_at - task.created_at).days >= 1:
-                # miss tasks that "work" for more than a day (most likely an error)
-                continue
-            if task.actor_name not in categories:
-                categories.append(task.actor_name)
-            actor_work_secs = (updated_at - created_at).total_seconds()
-            # seconds passed before the next tick interval
-            next_tick = math.ceil((created_at - start_date).total_seconds() / tick_sec) * tick_sec
-            start_time = start_date + datetime.timedelta(seconds=next_tick)
-            # what ticks should this actor be assigned to
-            for sec in range(0, int(actor_work_secs / tick_sec) + 1):
-                calculating_dt = start_time + datetime.timedelta(seconds=tick_sec * sec)
-                if calculating_dt > end_date:
-                    # actor can run longer than the final dt of the chart
-                    continue
-                else:
-                    timestamp = (start_time + datetime.timedelta(seconds=tick_sec * sec)).strftime(self.dt_format_sec)
-                    actor_wt_by_ticks[timestamp].append(task.actor_name)
-        categories = sorted(categories, reverse=True)
-        working_actors_count = [[] for _ in categories]
-        dates = []
-        for date, actors in actor_wt_by_ticks.items():
-            actors_count = Counter(actors)
-            dates.append(date)
-            if actors_count:
-                for i, items in enumerate(categories):
-                    if items in set(actors):
-                        working_actors_count[i].append(actors_count[items])
-                    else:
-                        working_actors_count[i].append(None)
+        with self.timing.phase('aggregate'):
+            actor_counts = counter.get_counts()
+        self.timing.count('actors', len(actor_counts))
+        categories = sorted(actor_counts, reverse=True)
+        working_actors_count = [actor_counts[actor] for actor in categories]
+        return {
+            'categories': categories,
+            'working_actors_count': working_actors_count,
+            # tick N is at start_date + N * time_interval, the client builds the tick dates
+            'start_date': start_date.strftime(self.dt_format_sec),
+            'time_interval': tick_sec,
+            'first_tick': 0,
+            'tick_count': counter.tick_count,
+            'chart_height': 200 + len(categories) * 30,
+            'chart_title': self.get_title(),
+            'empty_qs': False,
+        }
+
+    def get_export_data(self) -> (ExportColumns, Iterable[tuple]):
+        """Chart task counts as (tick, actor, count) rows, ticks without tasks are skipped"""
+        columns = [('tick', 'datetime'), ('actor', 'str'),
+                   ('count', 'float' if self.get_load_value() == LOAD_VALUE_MEAN else 'int')]
+        return columns, self.get_tick_rows(
+            self.get_chart_data(), ['working_actors_count'],
+            lambda tick, counts: None if counts[tick] is None else (counts[tick],))
+
+
+class DramatiqLoadChartDeltaForm(DramatiqLoadChartForm):
+    """Live load chart update: ticks from the last client tick to now, ticks of changed tasks are recounted"""
+    since_tick = forms.IntegerField(label='Last chart tick', min_value=0)
+    watermark = forms.DateTimeField(label='Previous update', required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        since_tick = cleaned_data.get('since_tick', None)
+        start_date = cleaned_data.get('start_date', None)
+        time_interval = cleaned_data.get('time_interval', None)
+        if since_tick is not None and start_date and time_interval:
+            since = cleaned_data['since'] = start_date.replace(second=0, microsecond=0) + datetime.timedelta(
+                seconds=time_interval * since_tick)
+            max_date_range_days = self.get_max_date_range_days()
+            if timezone.now() - since > datetime.timedelta(days=max_date_range_days):
+                raise forms.ValidationError('The maximum date range is {} days'.format(max_date_range_days))
+        return cleaned_data
+
+    def get_chart_delta(self) -> dict:
+        """
+        Counts from the first changed tick to now, the client replaces its ticks from first_tick
+        Tasks updated after the watermark are recounted since their start, without the watermark - the last day
+        """
+        cd = self.cleaned_data
+        now = timezone.now()
+        watermark = timezone.localtime(now) if timezone.is_aware(now) else now
+        start_date, _ = self.get_period()
+        tick = datetime.timedelta(seconds=cd['time_interval'])
+        recount_date = cd['since']
+        if cd.get('watermark'):
+            with self.timing.phase('changed'):
+                changed_start = self.get_task_qs(cd['watermark'], now).aggregate(
+                    Min('created_at'))['created_at__min']
+            if changed_start:
+                recount_date = min(recount_date, changed_start)
+        else:
+            recount_date = recount_date - _1_day
+        recount_tick = max((recount_date - start_date) // tick, 0)
+        # tasks longer than a day are not counted, so the counter starts a day before the recount
+        counter_tick = max(recount_tick - _1_day // tick - 1, 0)
+        counter = LoadTickCounter(start_date + tick * counter_tick, now, cd['time_interval'],
+                                  min_tick=recount_tick - counter_tick, load_value=self.get_load_value())
+        if counter.min_tick <= counter.max_tick:
+            with self.timing.phase('fetch'):
+                self.count_load(counter, self.get_task_qs(start_date + tick * (recount_tick - 1), now))
+        tick_range = range(counter.min_tick, counter.max_tick + 1)
+        self.timing.count('rows', counter.row_count)
+        self.timing.count('ticks', len(tick_range))
+        with self.timing.phase('aggregate'):
+            actor_counts = {
+                actor: counts[tick_range.start:tick_range.stop] for actor, counts in counter.get_counts().items()
+                if any(counts[tick_range.start:tick_range.stop])
+            }
+        categories = sorted(actor_counts, reverse=True)
+        return {
+            'categories': categories,
+            'working_actors_count': [actor_counts[actor] for actor in categories],
+            # tick index from the period start
+            'first_tick': counter_tick + tick_range.start,
+            'tick_count': len(tick_range),
+            'watermark': watermark.strftime(self.dt_format_ms),
+        }
+
+
+class DramatiqDurationChartForm(TickChartForm):
+    """Task duration percentiles of each actor by time intervals and duration histogram"""
+    status = forms.MultipleChoiceField(label='Status', required=False,
+                                       choices=models.Task.STATUSES, initial=models.Task.STATUS_DONE)
+
+    initial_time_interval = 60 * 10
+    percentiles = (50, 95, 99)
+
+    def get_qs_filter(self) -> Optional[Q]:
+        return get_duration_chart_qs_filter()
+
+    def get_period_filter(self, start_date: datetime.datetime, end_date: datetime.datetime) -> Q:
+        """Tasks updated in the period"""
+        return Q(updated_at__gte=start_date, updated_at__lt=end_date)
+
+    def get_chart_data(self) -> dict:
+        cd = self.cleaned_data
+        start_date, end_date = self.get_period()
+        quantiles = [percentile / 100 for percentile in self.percentiles]
+        counter = DurationCounter(start_date, end_date, cd['time_interval'])
+        task_qs = self.get_task_qs(start_date, end_date)
+        with self.timing.phase('fetch'):
+            if get_duration_chart_backend() == LOAD_BACKEND_DB:
+                count_durations_in_db(counter, task_qs, quantiles)
             else:
-                for i, _ in enumerate(categories):
-                    working_actors_count[i].append(None)
+                counter.extend(iter_task_rows(task_qs, ('created_at', 'updated_at', 'actor_name')))
+        self.timing.count('rows', counter.row_count)
+        self.timing.count('ticks', counter.tick_count)
+        if not counter.row_count:
+            return {
+                'empty_qs': True,
+                'chart_title': self.get_title(),
+            }
+        with self.timing.phase('aggregate'):
+            actor_quantiles = counter.get_quantiles(quantiles)
+            actor_histograms = counter.get_histogram()
+        categories = counter.actor_names
+        self.timing.count('actors', len(categories))
+        # bins after the longest duration are not shown
+        histograms = [actor_histograms[actor] for actor in categories]
+        bin_count = max(max(i for i, count in enumerate(histogram) if count) for histogram in histograms) + 1
+        color_table = get_actor_color_table()
         return {
-            'categories': json.dumps(categories),
-            'working_actors_count': json.dumps(working_actors_count),
-            'dates': json.dumps(dates),
-            'chart_height': json.dumps(200 + len(categories) * 30),
+            'categories': categories,
+            'colors': [color_table.get_color(actor) for actor in categories],
+            'percentiles': list(self.percentiles),
+            'durations': [actor_quantiles[actor][0] for actor in categories],
+            'task_counts': [actor_quantiles[actor][1] for actor in categories],
+            'histogram_bins': get_duration_bin_labels()[:bin_count],
+            'histograms': [histogram[:bin_count] for histogram in histograms],
+            # tick N has tasks updated in [start_date + N * time_interval, start_date + (N + 1) * time_interval)
+            'start_date': start_date.strftime(self.dt_format_sec),
+            'time_interval': cd['time_interval'],
+            'first_tick': 0,
+            'tick_count': counter.tick_count,
             'chart_title': self.get_title(),
             'empty_qs': False,
         }
 
+    def get_export_data(self) -> (ExportColumns, Iterable[tuple]):
+        """Chart percentiles as (tick, actor, tasks, p50, ...) rows, ticks without tasks are skipped"""
+        columns = [('tick', 'datetime'), ('actor', 'str'), ('tasks', 'int')] + [
+            ('p{}'.format(percentile), 'float') for percentile in self.percentiles]
+        return columns, self.get_tick_rows(
+            self.get_chart_data(), ['task_counts', 'durations'],
+            lambda tick, counts, actor_durations: None if counts[tick] is None else (
+                counts[tick], *(durations[tick] for durations in actor_durations)))
+
+
+class DramatiqThroughputChartForm(TickChartForm):
+    """Number of created tasks and of tasks updated to each status by time intervals, failure rate"""
+    status = forms.MultipleChoiceField(label='Status', required=False, choices=models.Task.STATUSES)
+    group_by = forms.ChoiceField(label='Group by', initial='actor', required=False, choices=(
+        ('actor', 'Actor'), ('queue', 'Queue'), ('actor_queue', 'Actor and queue')))
+
+    initial_time_interval = 60 * 10
+
+    def get_qs_filter(self) -> Optional[Q]:
+        return get_throughput_chart_qs_filter()
+
+    def get_period_filter(self, start_date: datetime.datetime, end_date: datetime.datetime) -> Q:
+        """Tasks created or updated in the period"""
+        return Q(updated_at__gte=start_date, created_at__lt=end_date)
+
+    def get_group_fn(self) -> Callable[[str, str], str]:
+        """Group name of the task by actor and queue names, by actor without group_by"""
+        group_by = self.cleaned_data.get('group_by')
+        if group_by == 'queue':
+            return lambda actor_name, queue_name: queue_name
+        if group_by == 'actor_queue':
+            return lambda actor_name, queue_name: '{} ({})'.format(actor_name, queue_name)
+        return lambda actor_name, queue_name: actor_name
+
+    def count_throughput(self, counter: ThroughputCounter, task_qs):
+        group_fn = self.get_group_fn()
+        if get_throughput_chart_backend() == LOAD_BACKEND_DB:
+            count_throughput_in_db(counter, task_qs, group_fn)
+        else:
+            counter.extend(
+                (group_fn(actor_name, queue_name), status, created_at, updated_at)
+                for actor_name, queue_name, status, created_at, updated_at in iter_task_rows(
+                    task_qs, ('actor_name', 'queue_name', 'status', 'created_at', 'updated_at'))
+            )
+
+    def get_chart_data(self) -> dict:
+        cd = self.cleaned_data
+        start_date, end_date = self.get_period()
+        counter = ThroughputCounter(start_date, end_date, cd['time_interval'])
+        with self.timing.phase('fetch'):
+            self.count_throughput(counter, self.get_task_qs(start_date, end_date))
+        self.timing.count('rows', counter.row_count)
+        self.timing.count('ticks', counter.tick_count)
+        group_counts = counter.get_counts()
+        if not group_counts:
+            return {
+                'empty_qs': True,
+                'chart_title': self.get_title(),
+            }
+        categories = sorted(group_counts)
+        self.timing.count('groups', len(categories))
+        present_series = {series for counts in group_counts.values() for series in counts}
+        series = [i for i in [counter.CREATED] + [status for status, _ in models.Task.STATUSES] if i in present_series]
+        empty_counts = [0] * counter.tick_count
+        failure_rates = []
+        for group in categories:
+            failed = group_counts[group].get(models.Task.STATUS_FAILED, empty_counts)
+            done = group_counts[group].get(models.Task.STATUS_DONE, empty_counts)
+            failure_rates.append([
+                round(failed_count / (failed_count + done_count), 4) if failed_count + done_count else None
+                for failed_count, done_count in zip(failed, done)
+            ])
+        color_table = get_actor_color_table()
+        return {
+            'categories': categories,
+            'colors': [color_table.get_color(group) for group in categories],
+            'series': series,
+            'counts': [[group_counts[group].get(i, empty_counts) for i in series] for group in categories],
+            # failed / (failed + done) of each tick, None for ticks without finished tasks
+            'failure_rates': failure_rates,
+            # tick N has events in [start_date + N * time_interval, start_date + (N + 1) * time_interval)
+            'start_date': start_date.strftime(self.dt_format_sec),
+            'time_interval': cd['time_interval'],
+            'first_tick': 0,
+            'tick_count': counter.tick_count,
+            'chart_title': self.get_title(),
+            'empty_qs': False,
+        }
+
+    def get_export_data(self) -> (ExportColumns, Iterable[tuple]):
+        """Chart counts as (tick, group, created, <status>..., failure_rate) rows, empty ticks are skipped"""
+        chart_data = self.get_chart_data()
+        if chart_data['empty_qs']:
+            return [('tick', 'datetime'), ('group', 'str'), ('failure_rate', 'float')], []
+        columns = [('tick', 'datetime'), ('group', 'str')] + [
+            (series, 'int') for series in chart_data['series']] + [('failure_rate', 'float')]
+
+        def get_values(tick: int, group_counts: List[List[int]], failure_rates: List[Optional[float]]):
+            if any(counts[tick] for counts in group_counts):
+                return (*(counts[tick] for counts in group_counts), failure_rates[tick])
+            return None
+
+        return columns, self.get_tick_rows(chart_data, ['counts', 'failure_rates'], get_values)
+
+
+class DramatiqQueueChartForm(TickChartForm):
+    """Queue depth (enqueued and not started tasks) and wait time of each queue by time intervals"""
+    waiting_statuses = (models.Task.STATUS_ENQUEUED, models.Task.STATUS_DELAYED)
+
+    def get_qs_filter(self) -> Optional[Q]:
+        return get_queue_chart_qs_filter()
+
+    def get_period_filter(self, start_date: datetime.datetime, end_date: datetime.datetime) -> Q:
+        """Tasks started in the period or not started, a started task is updated after its start"""
+        return (Q(updated_at__gte=start_date) | Q(status__in=self.waiting_statuses)) & Q(created_at__lte=end_date)
+
+    def iter_waits(self, task_qs, now: datetime.datetime) -> Iterable[
+            Tuple[str, datetime.datetime, datetime.datetime, bool]]:
+        """
+        (queue_name, enqueued_at, started_at, started) of the tasks
+        Enqueue time is message_timestamp of message_data if it is before the task creation, else created_at,
+        delayed messages wait from their eta
+        Start time is saved to message_data by TaskStartMiddleware, running tasks without it are started at updated_at,
+        finished tasks without it are skipped and counted in self.unknown_starts,
+        enqueued and delayed tasks wait till now
+        """
+        self.unknown_starts = 0
+        rows = iter_task_rows(task_qs, ('id', 'updated_at', 'queue_name', 'status', 'created_at'))
+        for (_, updated_at, queue_name, status, created_at), (message_ms, eta_ms, started_ms) in \
+                iter_with_message_times(rows):
+            enqueued_at = created_at
+            if message_ms is not None:
+                enqueued_at = min(enqueued_at, epoch_ms_to_dt(message_ms))
+            if eta_ms is not None:
+                enqueued_at = max(enqueued_at, epoch_ms_to_dt(eta_ms))
+            if status in self.waiting_statuses:
+                yield queue_name, enqueued_at, now, False
+            elif started_ms is not None:
+                yield queue_name, enqueued_at, max(epoch_ms_to_dt(started_ms), enqueued_at), True
+            elif status == models.Task.STATUS_RUNNING:
+                yield queue_name, enqueued_at, max(updated_at, enqueued_at), True
+            else:
+                self.unknown_starts += 1
+
+    def get_chart_data(self) -> dict:
+        cd = self.cleaned_data
+        start_date, end_date = self.get_period()
+        counter = QueueWaitCounter(start_date, end_date, cd['time_interval'])
+        with self.timing.phase('fetch'):
+            counter.extend(self.iter_waits(self.get_task_qs(start_date, end_date), timezone.now()))
+        self.timing.count('rows', counter.row_count)
+        self.timing.count('ticks', counter.tick_count)
+        self.timing.count('unknown_starts', self.unknown_starts)
+        queue_data = counter.get_data()
+        if not queue_data:
+            return {
+                'empty_qs': True,
+                'unknown_starts': self.unknown_starts,
+                'chart_title': self.get_title(),
+            }
+        categories = sorted(queue_data)
+        self.timing.count('queues', len(categories))
+        color_table = get_color_table(categories)
+        return {
+            'categories': categories,
+            'colors': [color_table.get_color(queue) for queue in categories],
+            'depths': [queue_data[queue][0] for queue in categories],
+            # wait seconds of the tasks started in the tick interval, None for ticks without started tasks
+            'mean_waits': [queue_data[queue][1] for queue in categories],
+            'max_waits': [queue_data[queue][2] for queue in categories],
+            # depth of tick N is at start_date + N * time_interval
+            'start_date': start_date.strftime(self.dt_format_sec),
+            'time_interval': cd['time_interval'],
+            'first_tick': 0,
+            'tick_count': counter.tick_count,
+            # finished tasks without the recorded start, they are not on the chart
+            'unknown_starts': self.unknown_starts,
+            'chart_title': self.get_title(),
+            'empty_qs': False,
+        }
+
+    def get_export_data(self) -> (ExportColumns, Iterable[tuple]):
+        """Chart data as (tick, queue, depth, mean_wait_sec, max_wait_sec) rows, empty ticks are skipped"""
+        columns = [('tick', 'datetime'), ('queue', 'str'), ('depth', 'int'),
+                   ('mean_wait_sec', 'float'), ('max_wait_sec', 'float')]
+        return columns, self.get_tick_rows(
+            self.get_chart_data(), ['depths', 'mean_waits', 'max_waits'],
+            lambda tick, depths, mean_waits, max_waits: (depths[tick], mean_waits[tick], max_waits[tick])
+            if depths[tick] or mean_waits[tick] is not None else None)
+
 
 class DramatiqTimelineChartForm(BasicFilterForm):
     status = forms.MultipleChoiceField(label='Status', required=False, choices=models.Task.STATUSES)
 
+    # latest first
+    task_ordering = ('-created_at', '-updated_at')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['start_date'].initial = _1_hours_ago
 
+    def get_qs_filter(self) -> Optional[Q]:
+        return get_timeline_chart_qs_filter()
+
     def get_chart_data(self) -> dict:
         cd = self.cleaned_data
-        start_date = cd['start_date']
-        end_date = cd['end_date']
+        start_date, end_date = self.get_period()
         actors = cd.get('actor')
         queues = cd.get('queue')
         statuses = cd.get('status')
-        task_qs = models.Task.tasks.filter(
-            updated_at__gte=start_date, created_at__lte=end_date
-        ).order_by('-created_at', '-updated_at')
-        timeline_chart_qs_filter = get_timeline_chart_qs_filter()
-        if actors:
-            task_qs = task_qs.filter(actor_name__in=actors)
-        if queues:
-            task_qs = task_qs.filter(queue_name__in=queues)
-        if statuses:
-            task_qs = task_qs.filter(status__in=statuses)
-        if timeline_chart_qs_filter:
-            task_qs = task_qs.filter(timeline_chart_qs_filter)
-        if not task_qs.count():
+        task_query = self.get_task_query(start_date, end_date)
+        timeline = TimelineColumns(get_actor_color_table().get_color)
+        with self.timing.phase('fetch'):
+            timeline.extend(task_query.iter_rows(('actor_name', 'queue_name', 'status', 'created_at', 'updated_at')))
+        self.timing.count('rows', timeline.row_count)
+        if not timeline.row_count:
             return {
                 'chart_title': self.get_title(),
                 'empty_qs': True,
@@ -235,23 +675,24 @@ class DramatiqTimelineChartForm(BasicFilterForm):
             'queue': queues,
             'status': statuses,
         }
-        chart_data = []
-        color_map = {}
-        for task in task_qs:
-            if task.actor_name not in color_map:
-                color_map[task.actor_name] = permanent_hex_color_for_name(task.actor_name)
-            chart_data.append({
-                'actor': task.actor_name,
-                'queue': task.queue_name,
-                'status': task.status,
-                'color': color_map[task.actor_name],
-                'duration': get_dt_delta_ms(task.created_at, task.updated_at),
-                'start': task.created_at.strftime(self.dt_format_ms),
-                'end': task.updated_at.strftime(self.dt_format_ms),
-            })
+        max_bars = get_timeline_max_bars()
+        with self.timing.phase('aggregate'):
+            chart_data = timeline.get_data(max_bars, get_dt_delta_ms(start_date, end_date))
+        self.timing.count('bars', len(chart_data['start']))
         return {
-            'filter_data': json.dumps(filter_data),
-            'chart_data': json.dumps(chart_data),
+            'filter_data': filter_data,
+            'chart_data': chart_data,
+            # short tasks are merged, details are available for a shorter period
+            'merged': bool(max_bars) and timeline.row_count > max_bars,
+            'task_count': timeline.row_count,
             'chart_title': self.get_title(),
             'empty_qs': False,
         }
+
+    def get_export_data(self) -> (ExportColumns, Iterable[tuple]):
+        """Tasks of the chart, latest first, rows are read from the database by keyset pages"""
+        columns = [('id', 'str'), ('actor', 'str'), ('queue', 'str'), ('status', 'str'),
+                   ('created_at', 'datetime'), ('updated_at', 'datetime')]
+        pages = self.get_task_query(*self.get_period()).iter_pages(
+            ('id', 'actor_name', 'queue_name', 'status', 'created_at', 'updated_at'), descending=True)
+        return columns, ((str(task_id), *row) for page in pages for task_id, *row in page)
@@ -0,0 +1,67 @@
+from typing import List, Set
+
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import connections
+from django.db.models import Index, Q
+from django_dramatiq.models import Task
+
+
+def get_chart_indexes(using: str) -> List[Index]:
+    """
+    Task table indexes for the chart queries: updated_at >= period start and created_at <= period end,
+    optionally actor_name in (...), BRIN index for created_at on PostgreSQL - tasks are inserted in created_at order
+    """
+    connection = connections[using]
+    features = connection.features
+    indexes = [
+        Index(fields=['updated_at', 'created_at'], name='ddc_task_upd_crt',
+              include=['actor_name'] if features.supports_covering_indexes else None),
+        Index(fields=['actor_name', 'updated_at'], name='ddc_task_actor_upd'),
+        # keyset pages of the export
+        Index(fields=['created_at', 'id'], name='ddc_task_crt_id'),
+    ]
+    if features.supports_partial_indexes:
+        # load chart status by default
+        indexes.append(Index(fields=['updated_at', 'created_at'], name='ddc_task_done_upd_crt',
+                             condition=Q(status=Task.STATUS_DONE)))
+    if connection.vendor == 'postgresql':
+        indexes.append(BrinIndex(fields=['created_at'], name='ddc_task_crt_brin'))
+    return indexes
+
+
+def get_existing_index_names(using: str) -> Set[str]:
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, Task._meta.db_table))
+
+
+def create_chart_indexes(using: str, concurrently: bool = False) -> List[str]:
+    """Create missing chart indexes, concurrently - PostgreSQL only, without write locks, returns created names"""
+    existing_names = get_existing_index_names(using)
+    created_names = []
+    with connections[using].schema_editor(atomic=not concurrently) as schema_editor:
+        for index in get_chart_indexes(using):
+            if index.name in existing_names:
+                continue
+            if concurrently:
+                schema_editor.execute(index.create_sql(Task, schema_editor, concurrently=True))
+            else:
+                schema_editor.add_index(Task, index)
+            created_names.append(index.name)
+    return created_names
+
+
+def drop_chart_indexes(using: str, concurrently: bool = False) -> List[str]:
+    """Drop existing chart indexes, returns dropped names"""
+    existing_names = get_existing_index_names(using)
+    dropped_names = []
+    with connections[using].schema_editor(atomic=not concurrently) as schema_editor:
+        for index in get_chart_indexes(using):
+            if index.name not in existing_names:
+                continue
+            if concurrently:
+                schema_editor.execute(index.remove_sql(Task, schema_editor, concurrently=True))
+            else:
+                schema_editor.remove_index(Task, index)
+            dropped_names.append(index.name)
+    return dropped_names
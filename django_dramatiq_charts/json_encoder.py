@@ -0,0 +1,60 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from .config import get_json_encoder
+from .consts import JSON_ENCODER_AUTO, JSON_ENCODER_ORJSON, JSON_ENCODER_MSGSPEC, JSON_ENCODER_JSON
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+_django_json_encoder = DjangoJSONEncoder()
+
+
+def _default(obj):
+    # types that are not native for the encoder: Decimal, UUID, lazy strings...
+    return _django_json_encoder.default(obj)
+
+
+def get_json_encoder_name() -> str:
+    """Encoder by DJANGO_DRAMATIQ_CHARTS_JSON_ENCODER, "auto" is the fastest installed one"""
+    name = get_json_encoder()
+    if name == JSON_ENCODER_AUTO:
+        if msgspec is not None:
+            return JSON_ENCODER_MSGSPEC
+        if orjson is not None:
+            return JSON_ENCODER_ORJSON
+        return JSON_ENCODER_JSON
+    modules = {JSON_ENCODER_ORJSON: orjson, JSON_ENCODER_MSGSPEC: msgspec, JSON_ENCODER_JSON: json}
+    if name not in modules:
+        raise ImproperlyConfigured('DJANGO_DRAMATIQ_CHARTS_JSON_ENCODER: unknown encoder "{}"'.format(name))
+    if modules[name] is None:
+        raise ImproperlyConfigured('DJANGO_DRAMATIQ_CHARTS_JSON_ENCODER: {} is not installed'.format(name))
+    return name
+
+
+def dumps(data) -> bytes:
+    """Compact JSON of the chart data"""
+    name = get_json_encoder_name()
+    if name == JSON_ENCODER_ORJSON:
+        return orjson.dumps(data, default=_default)
+    if name == JSON_ENCODER_MSGSPEC:
+        return msgspec.json.encode(data, enc_hook=_default)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+class ChartJsonResponse(HttpResponse):
+    """JsonResponse for chart data, encoded by dumps"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
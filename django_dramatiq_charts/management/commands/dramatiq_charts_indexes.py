@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from django_dramatiq_charts.forms import DramatiqLoadChartForm, DramatiqTimelineChartForm
+from django_dramatiq_charts.indexes import get_chart_indexes, get_existing_index_names, create_chart_indexes, \
+    drop_chart_indexes
+
+
+class Command(BaseCommand):
+    help = 'List, create or drop task table indexes for the chart queries, explain the chart query plan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('list', 'create', 'drop', 'explain'))
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--concurrently', action='store_true',
+                            help='PostgreSQL: create and drop indexes without locking task writes')
+        explain = parser.add_argument_group('explain', 'chart filter, same as the chart form fields')
+        explain.add_argument('--chart', choices=('load', 'timeline'), default='load')
+        explain.add_argument('--start-date', help='YYYY-MM-DD HH:MM:SS')
+        explain.add_argument('--end-date', help='YYYY-MM-DD HH:MM:SS')
+        explain.add_argument('--time-interval', type=int, default=10)
+        explain.add_argument('--actor', nargs='*', default=[])
+        explain.add_argument('--queue', nargs='*', default=[])
+        explain.add_argument('--status', nargs='*', default=[])
+        explain.add_argument('--analyze', action='store_true', help='Execute the query, PostgreSQL and MySQL')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        concurrently = options['concurrently']
+        if concurrently and connections[using].vendor != 'postgresql':
+            raise CommandError('--concurrently is PostgreSQL only')
+        if options['action'] == 'list':
+            existing_names = get_existing_index_names(using)
+            for index in get_chart_indexes(using):
+                self.stdout.write('{} {}: {}'.format(
+                    '+' if index.name in existing_names else '-', index.name, repr(index)))
+        elif options['action'] == 'create':
+            self.stdout.write('Created indexes: {}'.format(
+                ', '.join(create_chart_indexes(using, concurrently)) or '-'))
+        elif options['action'] == 'drop':
+            self.stdout.write('Dropped indexes: {}'.format(
+                ', '.join(drop_chart_indexes(using, concurrently)) or '-'))
+        else:
+            self.stdout.write(self._explain(options))
+
+    @staticmethod
+    def _explain(options) -> str:
+        form_data = {
+            'start_date': options['start_date'],
+            'end_date': options['end_date'],
+            'actor': options['actor'],
+            'queue': options['queue'],
+            'status': options['status'],
+        }
+        if options['chart'] == 'load':
+            form = DramatiqLoadChartForm(data=dict(form_data, time_interval=options['time_interval']))
+            fields = ('created_at', 'updated_at', 'actor_name')
+        else:
+            form = DramatiqTimelineChartForm(data=form_data)
+            fields = ('actor_name', 'queue_name', 'status', 'created_at', 'updated_at')
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        task_qs = form.get_task_qs(*form.get_period()).using(options['database']).values_list(*fields)
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        return '{}\n\n{}'.format(task_qs.query, task_qs.explain(**explain_options))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_dramatiq_charts.config import get_load_rollup_interval_sec
+from django_dramatiq_charts.rollup import update_load_rollup
+
+
+class Command(BaseCommand):
+    help = 'Update the load chart rollup by the tasks changed since the previous run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recount the rollup from the whole task table')
+
+    def handle(self, *args, **options):
+        if not get_load_rollup_interval_sec():
+            raise CommandError('DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_INTERVAL_SEC is not set')
+        watermark = update_load_rollup(rebuild=options['rebuild'])
+        self.stdout.write('Load rollup is updated up to {}'.format(watermark))
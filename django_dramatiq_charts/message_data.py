@@ -0,0 +1,77 @@
+import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Tuple
+
+import dramatiq
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .config import get_cache_message_data_sec, get_qs_chunk_size
+from .consts import CACHE_KEY_MESSAGE_TIMES_PREFIX, MESSAGE_OPTION_STARTED_AT
+from .query import TaskQuery, iter_task_rows
+
+# message_timestamp, options.eta and the start by TaskStartMiddleware of the message, epoch milliseconds or None
+MessageTimes = Tuple[Optional[int], Optional[int], Optional[int]]
+_no_message_times = (None, None, None)
+
+
+def decode_message_times(message_data: bytes) -> MessageTimes:
+    """Enqueue time, delayed message eta and start time from the task message_data, None for unknown times"""
+    try:
+        message = dramatiq.get_encoder().decode(bytes(message_data))
+    except Exception:  # data of a custom encoder or of an old message format
+        return _no_message_times
+    if not isinstance(message, dict):
+        return _no_message_times
+    options = message.get('options')
+    if not isinstance(options, dict):
+        options = {}
+    return message.get('message_timestamp'), options.get('eta'), options.get(MESSAGE_OPTION_STARTED_AT)
+
+
+def epoch_ms_to_dt(epoch_ms: int) -> datetime.datetime:
+    """Datetime of epoch milliseconds, naive in the default time zone without USE_TZ, like the task dates"""
+    dt = datetime.datetime.fromtimestamp(epoch_ms / 1000, tz=datetime.timezone.utc)
+    if settings.USE_TZ:
+        return dt
+    return timezone.make_naive(dt, timezone.get_default_timezone())
+
+
+def _get_cache_key(task_id, updated_at: datetime.datetime) -> str:
+    # message_data changes with the task status, so the key has the update date
+    return '{}:{}:{}'.format(CACHE_KEY_MESSAGE_TIMES_PREFIX, task_id, updated_at.timestamp())
+
+
+def get_message_times(tasks: Iterable[Tuple[object, datetime.datetime]]) -> dict:
+    """
+    Message times of the (task id, updated_at) tasks: {task id: MessageTimes}
+    Cached times are taken by one cache request, message_data of the rest is fetched by one query and decoded
+    """
+    keys = {_get_cache_key(task_id, updated_at): task_id for task_id, updated_at in tasks}
+    cached_times = cache.get_many(keys)
+    result = {keys[key]: tuple(times) for key, times in cached_times.items()}
+    missing_keys = {task_id: key for key, task_id in keys.items() if key not in cached_times}
+    if missing_keys:
+        new_times = {}
+        for task_id, message_data in iter_task_rows(
+                TaskQuery(Q(id__in=missing_keys)).get_queryset(), ('id', 'message_data')):
+            result[task_id] = new_times[missing_keys[task_id]] = decode_message_times(message_data)
+        cache.set_many(new_times, get_cache_message_data_sec())
+    return result
+
+
+def iter_with_message_times(rows: Iterable[tuple]) -> Iterator[Tuple[tuple, MessageTimes]]:
+    """
+    Add message times to the task rows by batches of DJANGO_DRAMATIQ_CHARTS_QS_CHUNK_SIZE rows,
+    the first two row columns are task id and updated_at, message_data is not fetched with the rows
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, get_qs_chunk_size()))
+        if not batch:
+            return
+        message_times = get_message_times((row[0], row[1]) for row in batch)
+        for row in batch:
+            yield row, message_times.get(row[0], _no_message_times)
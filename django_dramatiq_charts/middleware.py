@@ -0,0 +1,15 @@
+import time
+
+from dramatiq.middleware import Middleware
+
+from .consts import MESSAGE_OPTION_STARTED_AT
+
+
+class TaskStartMiddleware(Middleware):
+    """
+    Dramatiq middleware: the start time of the message processing is saved to the message options,
+    django_dramatiq AdminMiddleware stores it in message_data of the finished task, the queue chart reads it
+    """
+
+    def before_process_message(self, broker, message):
+        message.options[MESSAGE_OPTION_STARTED_AT] = int(time.time() * 1000)
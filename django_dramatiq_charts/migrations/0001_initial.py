@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tick', models.DateTimeField(db_index=True)),
+                ('actor_name', models.CharField(max_length=300, null=True)),
+                ('queue_name', models.CharField(max_length=100, null=True)),
+                ('status', models.CharField(choices=[('enqueued', 'Enqueued'), ('delayed', 'Delayed'), ('running', 'Running'), ('failed', 'Failed'), ('done', 'Done'), ('skipped', 'Skipped')], max_length=8)),
+                ('count', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoadRollupState',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('interval_sec', models.PositiveIntegerField()),
+                ('watermark', models.DateTimeField()),
+            ],
+        ),
+    ]
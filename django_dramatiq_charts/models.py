@@ -0,0 +1,19 @@
+from django.db import models
+from django_dramatiq.models import Task
+
+
+class LoadRollup(models.Model):
+    """Number of simultaneously running tasks at the tick, see dramatiq_charts_rollup command"""
+    id = models.BigAutoField(primary_key=True)
+    tick = models.DateTimeField(db_index=True)
+    actor_name = models.CharField(max_length=300, null=True)
+    queue_name = models.CharField(max_length=100, null=True)
+    status = models.CharField(max_length=8, choices=Task.STATUSES)
+    count = models.PositiveIntegerField()
+
+
+class LoadRollupState(models.Model):
+    """Rollup state: tasks updated up to the watermark are counted with the interval"""
+    id = models.BigAutoField(primary_key=True)
+    interval_sec = models.PositiveIntegerField()
+    watermark = models.DateTimeField()
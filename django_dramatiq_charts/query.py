@@ -0,0 +1,81 @@
+from typing import Iterator, List, Optional, Sequence
+
+from django.db.models import Q
+from django_dramatiq import models
+
+from .config import get_qs_chunk_size, get_task_qs_fn, get_task_rows_fn
+
+
+def iter_task_rows(task_qs, fields: Sequence[str]) -> Iterator[tuple]:
+    """
+    Values of the fields of the tasks by one query, read by DJANGO_DRAMATIQ_CHARTS_QS_CHUNK_SIZE chunks
+    DJANGO_DRAMATIQ_CHARTS_TASK_ROWS_FN(task_qs, fields) reads the rows instead if it is set
+    """
+    task_rows_fn = get_task_rows_fn()
+    if task_rows_fn:
+        return iter(task_rows_fn(task_qs, tuple(fields)))
+    return task_qs.values_list(*fields).iterator(chunk_size=get_qs_chunk_size())
+
+
+class TaskQuery:
+    """
+    Tasks of a chart: the chart period condition, the filter form values and the additional filter from settings
+    The queryset is passed through DJANGO_DRAMATIQ_CHARTS_TASK_QS_FN (read replica, materialized view model)
+    """
+
+    def __init__(self, period_filter: Q, actors: Optional[Sequence[str]] = None,
+                 queues: Optional[Sequence[str]] = None, statuses: Optional[Sequence[str]] = None,
+                 qs_filter: Optional[Q] = None, ordering: Sequence[str] = ()):
+        self.period_filter = period_filter
+        self.actors = actors
+        self.queues = queues
+        self.statuses = statuses
+        self.qs_filter = qs_filter
+        self.ordering = ordering
+
+    def get_queryset(self):
+        """Filtered tasks, without ordering they are not ordered (the model has default ordering)"""
+        task_qs = models.Task.tasks.filter(self.period_filter)
+        if self.actors:
+            task_qs = task_qs.filter(actor_name__in=self.actors)
+        if self.queues:
+            task_qs = task_qs.filter(queue_name__in=self.queues)
+        if self.statuses:
+            task_qs = task_qs.filter(status__in=self.statuses)
+        if self.qs_filter:
+            task_qs = task_qs.filter(self.qs_filter)
+        task_qs = task_qs.order_by(*self.ordering)
+        task_qs_fn = get_task_qs_fn()
+        if task_qs_fn:
+            task_qs = task_qs_fn(task_qs)
+        return task_qs
+
+    def iter_rows(self, fields: Sequence[str]) -> Iterator[tuple]:
+        return iter_task_rows(self.get_queryset(), fields)
+
+    def iter_pages(self, fields: Sequence[str], page_size: Optional[int] = None,
+                   descending: bool = False) -> Iterator[List[tuple]]:
+        """
+        Pages of the field values ordered by (created_at, id), keyset pagination:
+        each page is a short query of the tasks after the last task of the previous page,
+        no server-side cursor or transaction is held between pages
+        """
+        page_size = page_size or get_qs_chunk_size()
+        if descending:
+            task_qs = self.get_queryset().order_by('-created_at', '-id')
+        else:
+            task_qs = self.get_queryset().order_by('created_at', 'id')
+        values_qs = task_qs.values_list(*fields, 'created_at', 'id')
+        field_count = len(fields)
+        page_qs = values_qs
+        while True:
+            page = list(page_qs[:page_size])
+            if page:
+                yield [row[:field_count] for row in page]
+            if len(page) < page_size:
+                return
+            created_at, task_id = page[-1][field_count:]
+            if descending:
+                page_qs = values_qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=task_id))
+            else:
+                page_qs = values_qs.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=task_id))
@@ -0,0 +1,138 @@
+import datetime
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Max, Min, Q, Sum
+from django.utils import timezone
+from django_dramatiq.models import Task
+
+from .aggregation import LoadTickCounter
+from .config import get_load_chart_qs_filter, get_load_rollup_interval_sec, get_qs_chunk_size, \
+    get_load_rollup_max_lag_sec
+from .models import LoadRollup, LoadRollupState
+
+_1_day = datetime.timedelta(days=1)
+_1_us = datetime.timedelta(microseconds=1)
+# counter ticks in one rollup query, below the query parameter limits
+_rollup_ticks_chunk_size = 500
+
+
+def _get_epoch(dt: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc if timezone.is_aware(dt) else None)
+
+
+def floor_to_interval(dt: datetime.datetime, interval_sec: int) -> datetime.datetime:
+    """The nearest rollup tick before the dt, rollup ticks are counted from the epoch"""
+    return dt - datetime.timedelta(microseconds=(dt - _get_epoch(dt)) // _1_us % (interval_sec * 10 ** 6))
+
+
+def can_use_load_rollup(start_date: datetime.datetime, tick_sec: int) -> bool:
+    """Load chart ticks are the rollup ticks"""
+    interval_sec = get_load_rollup_interval_sec()
+    return bool(interval_sec) and tick_sec % interval_sec == 0 and \
+        floor_to_interval(start_date, interval_sec) == start_date
+
+
+def is_load_rollup_built(end_date: datetime.datetime) -> bool:
+    """
+    The rollup is counted with the current interval up to the end date or up to the max lag before now,
+    so only a short tail of the period is read from the task table
+    """
+    state = LoadRollupState.objects.first()
+    if not state or state.interval_sec != get_load_rollup_interval_sec():
+        return False
+    return state.watermark >= min(end_date, timezone.now() - datetime.timedelta(seconds=get_load_rollup_max_lag_sec()))
+
+
+def update_load_rollup(rebuild: bool = False) -> Optional[datetime.datetime]:
+    """
+    Count tasks updated after the previous watermark, returns the new watermark
+    Ticks since the earliest start of these tasks are recounted from the task table
+    """
+    interval_sec = get_load_rollup_interval_sec()
+    state = LoadRollupState.objects.first()
+    if rebuild or not state or state.interval_sec != interval_sec:
+        with transaction.atomic():
+            LoadRollup.objects.all().delete()
+            LoadRollupState.objects.all().delete()
+        state = None
+    task_qs = Task.tasks.order_by()
+    load_chart_qs_filter = get_load_chart_qs_filter()
+    if load_chart_qs_filter:
+        task_qs = task_qs.filter(load_chart_qs_filter)
+    watermark = task_qs.aggregate(Max('updated_at'))['updated_at__max']
+    if watermark is None or (state and watermark <= state.watermark):
+        return state.watermark if state else None
+    task_qs = task_qs.filter(updated_at__lte=watermark)
+    if state:
+        changed_qs = task_qs.filter(updated_at__gt=state.watermark)
+        changed_start = changed_qs.aggregate(Min('created_at'))['created_at__min']
+        # ticks after the previous watermark may have been cut off
+        dirty_start = min(changed_start, state.watermark)
+    else:
+        dirty_start = task_qs.aggregate(Min('created_at'))['created_at__min']
+    interval = datetime.timedelta(seconds=interval_sec)
+    window_start = floor_to_interval(dirty_start, interval_sec)
+    with transaction.atomic():
+        LoadRollup.objects.filter(tick__gte=window_start).delete()
+        while window_start <= watermark:
+            window_end = min(window_start + _1_day - interval, watermark)
+            # tasks longer than a day are not counted, so tasks that start before the counter start are not needed
+            counter_start = window_start - _1_day - interval
+            counter = LoadTickCounter(counter_start, window_end, interval_sec,
+                                      min_tick=(window_start - counter_start) // interval)
+            counter.extend(
+                (created_at, updated_at, (actor_name, queue_name, status))
+                for created_at, updated_at, actor_name, queue_name, status in task_qs.filter(
+                    updated_at__gte=window_start - interval, created_at__lte=window_end,
+                ).values_list(
+                    'created_at', 'updated_at', 'actor_name', 'queue_name', 'status'
+                ).iterator(chunk_size=get_qs_chunk_size())
+            )
+            LoadRollup.objects.bulk_create(
+                (
+                    LoadRollup(
+                        tick=counter.start_date + interval * tick, actor_name=actor_name, queue_name=queue_name,
+                        status=status, count=count,
+                    )
+                    for (actor_name, queue_name, status), counts in counter.get_counts().items()
+                    for tick, count in enumerate(counts) if count
+                ),
+                batch_size=get_qs_chunk_size(),
+            )
+            window_start = window_end + interval
+        LoadRollupState.objects.update_or_create(defaults=dict(interval_sec=interval_sec, watermark=watermark))
+    return watermark
+
+
+def count_load_from_rollup(counter: LoadTickCounter, actors: list, queues: list, statuses: list) -> int:
+    """
+    Add rollup counts to the counter, the counter ticks should be the rollup ticks
+    Returns the first counter tick that is not in the rollup
+    """
+    state = LoadRollupState.objects.first()
+    if not state or state.interval_sec != get_load_rollup_interval_sec() or state.watermark < counter.start_date:
+        return 0
+    rollup_qs = LoadRollup.objects.filter(tick__gte=counter.start_date, tick__lte=counter.end_date)
+    if actors:
+        rollup_qs = rollup_qs.filter(actor_name__in=actors)
+    if queues:
+        rollup_qs = rollup_qs.filter(queue_name__in=queues)
+    if statuses:
+        rollup_qs = rollup_qs.filter(status__in=statuses)
+    tick = datetime.timedelta(seconds=counter.tick_sec)
+    if counter.tick_sec == state.interval_sec:
+        tick_filters = [Q()]
+    else:
+        # only the rollup ticks at the counter ticks are read, actors of the other ticks are added without counts
+        for actor_name in rollup_qs.values_list('actor_name', flat=True).order_by().distinct():
+            counter.add_tick_count(actor_name, None, 0)
+        tick_dates = [counter.start_date + tick * tick_index for tick_index in range(counter.tick_count)
+                      if counter.start_date + tick * tick_index <= counter.end_date]
+        tick_filters = [Q(tick__in=tick_dates[i:i + _rollup_ticks_chunk_size])
+                        for i in range(0, len(tick_dates), _rollup_ticks_chunk_size)]
+    for tick_filter in tick_filters:
+        for actor_name, tick_dt, count in rollup_qs.filter(tick_filter).values_list(
+                'actor_name', 'tick').annotate(Sum('count')).order_by():
+            counter.add_tick_count(actor_name, (tick_dt - counter.start_date) // tick, count)
+    return (state.watermark - counter.start_date) // tick + 1
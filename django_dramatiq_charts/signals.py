@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# sent after a chart view response when DJANGO_DRAMATIQ_CHARTS_TIMING is enabled
+# sender - url name of the view, kwargs: request, timing - ChartTiming
+chart_timing = Signal()
@@ -0,0 +1,8 @@
+from django.urls import path
+from django_dramatiq_charts.async_views import load_chart_export, timeline_chart_export
+
+# urlpatterns of an ASGI project
+urlpatterns = [
+    path('load_chart/export/', load_chart_export, name='ddc_load_chart_export'),
+    path('timeline_chart/export/', timeline_chart_export, name='ddc_timeline_chart_export'),
+]
@@ -0,0 +1,9 @@
+from django.urls import path
+from django_dramatiq_charts.views import load_chart, timeline_chart, clean_cache
+
+# urlpatterns of the versions before the chart data views
+urlpatterns = [
+    path('django_dramatiq_charts/load_chart/', load_chart, name='ddc_load_chart'),
+    path('django_dramatiq_charts/timeline_chart/', timeline_chart, name='ddc_timeline_chart'),
+    path('django_dramatiq_charts/clean_cache/', clean_cache, name='ddc_clean_cache'),
+]
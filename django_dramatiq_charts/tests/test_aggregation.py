@@ -0,0 +1,236 @@
+import random
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from django_dramatiq_charts import aggregation
+from django_dramatiq_charts.aggregation import LoadTickCounter, TimelineColumns, DDSketch, DurationCounter, \
+    ThroughputCounter, QueueWaitCounter, get_duration_bin_labels
+
+
+class TestLoadTickCounter(SimpleTestCase):
+    start_date = datetime(2022, 1, 1, 1, 0, 0)
+    end_date = datetime(2022, 1, 1, 1, 1, 0)
+    rows = (
+        (datetime(2022, 1, 1, 0, 59, 50), datetime(2022, 1, 1, 1, 0, 7), 'a'),  # external
+        (datetime(2022, 1, 1, 1, 0, 5), datetime(2022, 1, 1, 1, 0, 35), 'a'),
+        (datetime(2022, 1, 1, 1, 0, 21), datetime(2022, 1, 1, 1, 0, 22), 'b'),
+        (datetime(2022, 1, 1, 1, 0, 55), datetime(2022, 1, 1, 1, 3, 0), 'b'),  # ends after the period
+        (datetime(2021, 12, 31, 1, 0, 0), datetime(2022, 1, 1, 1, 0, 30), 'c'),  # more than a day
+    )
+
+    def _get_counts(self, tick_sec: int) -> dict:
+        counter = LoadTickCounter(self.start_date, self.end_date, tick_sec)
+        counter.extend(self.rows)
+        return counter.get_counts()
+
+    def test_counts(self):
+        counter = LoadTickCounter(self.start_date, self.end_date, 10)
+        self.assertEqual(7, counter.tick_count)
+        self.assertEqual({}, counter.get_counts())
+        counter.extend(self.rows)
+        self.assertEqual(['a', 'b'], counter.actor_names)
+        self.assertEqual(
+            {
+                'a': [1, 1, 1, 1, 1, None, None],
+                'b': [None, None, None, 1, None, None, 1],
+            }, counter.get_counts()
+        )
+        # the last tick is after the end of the period
+        self.assertEqual(6, LoadTickCounter(self.start_date, self.end_date, 13).tick_count)
+
+    def test_pure_python_fallback(self):
+        for tick_sec in (1, 7, 10, 13, 30):
+            counts = self._get_counts(tick_sec)
+            with mock.patch.object(aggregation, 'numpy', None):
+                self.assertEqual(counts, self._get_counts(tick_sec))
+
+    def test_merge(self):
+        counter = LoadTickCounter(self.start_date, self.end_date, 10)
+        for row in self.rows[:2]:
+            counter.add(*row)
+        other = LoadTickCounter(self.start_date, self.end_date, 10)
+        other.extend(self.rows[2:])
+        other.add_tick_count('c', 1, 2)
+        counter.merge(other)
+        self.assertEqual(len(self.rows) + 1, counter.row_count)
+        counts = self._get_counts(10)
+        counts['c'] = [None, 2, None, None, None, None, None]
+        self.assertEqual(counts, counter.get_counts())
+
+    def test_sampled_memory(self):
+        # tasks are added to the difference arrays, memory does not grow with rows
+        counter = LoadTickCounter(self.start_date, self.end_date, 10)
+        counter.extend(self.rows * 1000)
+        self.assertEqual([], counter._task_actors)
+        self.assertEqual(2, len(counter._diffs))
+        self.assertEqual({actor: [count and count * 1000 for count in counts]
+                          for actor, counts in self._get_counts(10).items()}, counter.get_counts())
+
+    def test_external_task_hits_no_ticks(self):
+        counter = LoadTickCounter(self.start_date, self.end_date, 10)
+        counter.add(self.end_date + timedelta(seconds=5), self.end_date + timedelta(seconds=10), 'a')
+        self.assertEqual({'a': [None] * 7}, counter.get_counts())
+
+    def test_interval_counts(self):
+        # the short task of "b" is between ticks 20 and 30
+        counter = LoadTickCounter(self.start_date, self.end_date, 10, load_value='max')
+        counter.extend(self.rows)
+        self.assertEqual(
+            {
+                'a': [2, 1, 1, 1, None, None, None],
+                'b': [None, None, 1, None, None, 1, 1],
+            }, counter.get_counts()
+        )
+        counter = LoadTickCounter(self.start_date, self.end_date, 10, load_value='mean')
+        counter.extend(self.rows)
+        self.assertEqual(
+            {
+                'a': [1.2, 1.0, 1.0, 0.5, None, None, None],
+                'b': [None, None, 0.1, None, None, 0.5, 1.0],
+            }, counter.get_counts()
+        )
+
+    def test_interval_counts_pure_python_fallback(self):
+        rnd = random.Random(1)
+        rows = []
+        for _ in range(200):
+            created_at = self.start_date + timedelta(seconds=rnd.randint(-20, 70))
+            rows.append((created_at, created_at + timedelta(milliseconds=rnd.randint(0, 20000)), rnd.choice('abc')))
+        for load_value in ('max', 'mean'):
+            for tick_sec, min_tick in ((1, 0), (7, 0), (10, 2), (13, 0), (30, 1)):
+                counter = LoadTickCounter(self.start_date, self.end_date, tick_sec, min_tick, load_value)
+                counter.extend(rows)
+                counts = counter.get_counts()
+                with mock.patch.object(aggregation, 'numpy', None):
+                    self.assertEqual(counts, counter.get_counts())
+
+
+class TestTimelineColumns(SimpleTestCase):
+    start_date = datetime(2022, 1, 1, 1, 0, 0)
+
+    def _get_timeline(self) -> TimelineColumns:
+        timeline = TimelineColumns(lambda name: '#000000')
+        for i in range(10):
+            start = self.start_date + timedelta(seconds=i)
+            timeline.add('a', 'default', 'done', start, start + timedelta(milliseconds=100))
+        timeline.add('a', 'default', 'done', self.start_date, self.start_date + timedelta(seconds=50))
+        timeline.add('b', 'default', 'done', self.start_date, self.start_date + timedelta(seconds=1))
+        return timeline
+
+    def test_full_detail(self):
+        data = self._get_timeline().get_data(max_bars=12, period_ms=60000)
+        self.assertEqual(12, len(data['start']))
+        self.assertNotIn('count', data)
+
+    def test_merged(self):
+        data = self._get_timeline().get_data(max_bars=4, period_ms=60000)
+        # short tasks of "a" are merged, the long task is kept
+        self.assertEqual([10, 1, 1], sorted(data['count'], reverse=True))
+        self.assertEqual(50000, max(end - start for start, end in zip(data['start'], data['end'])))
+        self.assertEqual(data['start'], sorted(data['start'], reverse=True))
+
+    def test_sampled(self):
+        # actors can not be merged
+        data = self._get_timeline().get_data(max_bars=1, period_ms=60000)
+        self.assertEqual(1, len(data['start']))
+        self.assertEqual(1, len(data['count']))
+
+
+class TestDDSketch(SimpleTestCase):
+
+    def test_relative_accuracy(self):
+        rnd = random.Random(0)
+        values = sorted(rnd.lognormvariate(0, 2) for _ in range(10000))
+        sketch = DDSketch(0.01)
+        self.assertIsNone(sketch.quantile(0.5))
+        for value in values:
+            sketch.add(value)
+        for q in (0, 0.01, 0.5, 0.95, 0.99, 1):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(exact, sketch.quantile(q), delta=exact * 0.01)
+        # bins depend on the value range, not on the value count
+        self.assertLess(len(sketch.bins), 1500)
+
+    def test_merge(self):
+        sketch, other = DDSketch(), DDSketch()
+        for value in (0, 1, 2):
+            sketch.add(value)
+        for value in (3, 4):
+            other.add(value)
+        sketch.merge(other)
+        self.assertEqual((5, 1), (sketch.count, sketch.zero_count))
+        self.assertEqual(0, sketch.quantile(0))
+        self.assertAlmostEqual(2, sketch.quantile(0.5), delta=0.02)
+
+
+class TestDurationCounter(SimpleTestCase):
+    start_date = datetime(2022, 1, 1, 1, 0, 0)
+
+    def test_durations(self):
+        counter = DurationCounter(self.start_date, datetime(2022, 1, 1, 1, 1, 0), 25)
+        self.assertEqual(3, counter.tick_count)
+        counter.extend((
+            (datetime(2022, 1, 1, 0, 59, 0), datetime(2022, 1, 1, 1, 0, 10), 'a'),
+            (datetime(2022, 1, 1, 1, 0, 9), datetime(2022, 1, 1, 1, 0, 10), 'a'),
+            (datetime(2022, 1, 1, 1, 0, 30), datetime(2022, 1, 1, 1, 0, 30, 1500), 'b'),
+            (datetime(2022, 1, 1, 1, 0, 50), datetime(2022, 1, 1, 1, 0, 50), 'b'),
+        ))
+        self.assertEqual(4, counter.row_count)
+        self.assertEqual(['a', 'b'], counter.actor_names)
+        quantiles = counter.get_quantiles([0, 1])
+        a_durations, a_counts = quantiles['a']
+        self.assertEqual([2, None, None], a_counts)
+        self.assertAlmostEqual(1, a_durations[0][0], delta=0.02)
+        self.assertAlmostEqual(70, a_durations[1][0], delta=1.4)
+        self.assertEqual([None, None], [a_durations[0][1], a_durations[1][2]])
+        self.assertEqual([None, 1, 1], quantiles['b'][1])
+        self.assertEqual(0, quantiles['b'][0][0][2])
+        # bins: < 1 ms, 1 ms - 2 ms, ..., 1 s - 2 s, ..., 1 min - 2 min
+        labels = get_duration_bin_labels()
+        histogram = counter.get_histogram()
+        self.assertEqual(1, histogram['a'][labels.index('1 s - 2 s')])
+        self.assertEqual(1, histogram['a'][labels.index('1 min - 2 min')])
+        self.assertEqual(1, histogram['b'][labels.index('< 1 ms')])
+        self.assertEqual(1, histogram['b'][labels.index('1 ms - 2 ms')])
+        self.assertEqual(len(labels), len(histogram['b']))
+        self.assertEqual('> 1 d', labels[-1])
+
+
+class TestThroughputCounter(SimpleTestCase):
+
+    def test_counts(self):
+        counter = ThroughputCounter(datetime(2022, 1, 1, 1, 0, 0), datetime(2022, 1, 1, 1, 1, 0), 20)
+        counter.extend((
+            ('a', 'done', datetime(2022, 1, 1, 0, 59, 0), datetime(2022, 1, 1, 1, 0, 10)),  # created before
+            ('a', 'failed', datetime(2022, 1, 1, 1, 0, 20), datetime(2022, 1, 1, 1, 0, 30)),
+            ('b', 'running', datetime(2022, 1, 1, 1, 0, 50), datetime(2022, 1, 1, 1, 1, 0)),  # updated after
+        ))
+        self.assertEqual(3, counter.row_count)
+        self.assertEqual(
+            {
+                'a': {'created': [0, 1, 0], 'done': [1, 0, 0], 'failed': [0, 1, 0]},
+                'b': {'created': [0, 0, 1]},
+            }, counter.get_counts()
+        )
+
+
+class TestQueueWaitCounter(SimpleTestCase):
+
+    def test_data(self):
+        counter = QueueWaitCounter(datetime(2022, 1, 1, 1, 0, 0), datetime(2022, 1, 1, 1, 1, 0), 20)
+        counter.extend((
+            ('a', datetime(2022, 1, 1, 0, 59, 50), datetime(2022, 1, 1, 1, 0, 25), True),  # enqueued before
+            ('a', datetime(2022, 1, 1, 1, 0, 21), datetime(2022, 1, 1, 1, 0, 30), True),
+            ('b', datetime(2022, 1, 1, 1, 0, 30), datetime(2022, 1, 1, 1, 2, 0), False),  # not started
+            ('b', datetime(2021, 12, 31, 1, 0, 0), datetime(2022, 1, 1, 1, 2, 0), False),  # more than a day
+            ('c', datetime(2022, 1, 1, 1, 0, 59), datetime(2022, 1, 1, 1, 1, 0), True),  # out of ticks
+        ))
+        self.assertEqual(5, counter.row_count)
+        self.assertEqual(
+            {
+                'a': ([1, 1, 0], [None, 22.0, None], [None, 35.0, None]),
+                'b': ([0, 0, 1], [None, None, None], [None, None, None]),
+            }, counter.get_data()
+        )
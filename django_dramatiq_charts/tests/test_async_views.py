@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TransactionTestCase, override_settings, AsyncRequestFactory
+from django_dramatiq_charts import async_views, views
+
+_fixture_dataset = 'fixtures/dataset.json'
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER='', DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER='')
+class TestAsyncViews(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+    load_params = '?start_date=2022-01-01+01:00:00&end_date=2022-01-01+01:01:00&time_interval=10'
+    timeline_params = '?start_date=2022-01-01+01:00:00&end_date=2022-01-01+01:01:00'
+
+    async def test_chart_data(self):
+        factory = AsyncRequestFactory()
+        threads = []
+        get_cached_chart_data = views.get_cached_chart_data
+
+        def get_chart_data(form):
+            threads.append(threading.current_thread().name)
+            return get_cached_chart_data(form)
+
+        with mock.patch.object(views, 'get_cached_chart_data', get_chart_data):
+            load_response, timeline_response = await asyncio.gather(
+                async_views.load_chart_data(factory.get('/' + self.load_params)),
+                async_views.timeline_chart_data(factory.get('/' + self.timeline_params)),
+            )
+        self.assertEqual(['specific_tasks', 'sequential_tasks', 'parallel_tasks', 'different_status'],
+                         json.loads(load_response.content)['categories'])
+        self.assertEqual(27, len(json.loads(timeline_response.content)['chart_data']['start']))
+        # computed in the chart thread pool
+        self.assertEqual(2, len(threads))
+        self.assertTrue(all(name.startswith('django_dramatiq_charts') for name in threads))
+
+    async def test_errors(self):
+        response = await async_views.load_chart_data(AsyncRequestFactory().get('/'))
+        self.assertEqual(400, response.status_code)
+
+    async def test_export(self):
+        response = await async_views.load_chart_export(AsyncRequestFactory().get('/' + self.load_params))
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        if getattr(response, 'is_async', False):
+            # Django 4.2+: rows are produced in the chart thread pool
+            content = b''.join([part async for part in response.streaming_content])
+        else:
+            content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'tick,actor,count'))
+
+    @staticmethod
+    async def _asgi_get(path: str, query_string: str) -> (int, bytes):
+        """Status and body of the response of the ASGI handler"""
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'root_path': '', 'query_string': query_string.encode(),
+            'headers': [(b'host', b'testserver')], 'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+        }
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        messages = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # the client waits for the response
+            return await asyncio.get_running_loop().create_future()
+
+        async def send(message):
+            messages.append(message)
+
+        await ASGIHandler()(scope, receive, send)
+        return messages[0]['status'], b''.join(message.get('body', b'') for message in messages[1:])
+
+    @override_settings(ROOT_URLCONF='django_dramatiq_charts.tests.async_urls')
+    async def test_asgi_export(self):
+        # timeline rows are read by pages while the response is sent
+        status, content = await self._asgi_get('/timeline_chart/export/', self.timeline_params[1:] + '&format=csv')
+        self.assertEqual(200, status)
+        lines = content.decode().splitlines()
+        self.assertEqual('id,actor,queue,status,created_at,updated_at', lines[0])
+        self.assertEqual(28, len(lines))
+        status, content = await self._asgi_get('/load_chart/export/', self.load_params[1:] + '&format=csv')
+        self.assertEqual(200, status)
+        self.assertTrue(content.startswith(b'tick,actor,count'))
+
+    async def test_iter_in_executor(self):
+        threads = []
+        closed = []
+
+        def iter_parts(count: int):
+            try:
+                for i in range(count):
+                    threads.append(threading.current_thread().name)
+                    yield i
+            finally:
+                closed.append(threading.current_thread().name)
+
+        parts = [part async for part in async_views._iter_in_executor(iter_parts(10))]
+        self.assertEqual(list(range(10)), parts)
+        # all parts are produced in one thread of the chart pool
+        self.assertEqual(1, len(set(threads + closed)))
+        self.assertTrue(threads[0].startswith('django_dramatiq_charts'))
+        # the client is gone: the producer stops
+        closed.clear()
+        stream = async_views._iter_in_executor(iter_parts(1000))
+        self.assertEqual(0, await stream.__anext__())
+        await stream.aclose()
+        self.assertEqual(1, len(closed))
+        self.assertLess(len(threads), 100)
+        # errors of the iterator are raised in the stream
+        with self.assertRaises(ZeroDivisionError):
+            [part async for part in async_views._iter_in_executor(1 // part for part in (1, 0))]
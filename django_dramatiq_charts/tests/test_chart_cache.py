@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.test import TransactionTestCase, override_settings
+from django_dramatiq_charts.chart_cache import get_cached_chart_data, get_chart_data_cache_key, \
+    get_chart_data_cache_timeout, clean_chart_data_cache
+from django_dramatiq_charts.forms import DramatiqLoadChartForm, DramatiqTimelineChartForm
+
+_fixture_dataset = 'fixtures/dataset.json'
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_CACHE_CHART_DATA_SEC=60, DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER='',
+                   DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER='')
+class TestChartDataCache(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    @staticmethod
+    def _get_form(form_class, **data):
+        form = form_class(data=dict(dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+        ), **data))
+        assert form.is_valid(), form.errors
+        return form
+
+    def setUp(self):
+        clean_chart_data_cache()
+
+    def test_cached(self):
+        for form_class in (DramatiqLoadChartForm, DramatiqTimelineChartForm):
+            data = get_cached_chart_data(self._get_form(form_class, time_interval=10))
+            with self.assertNumQueries(0):
+                self.assertEqual(data, get_cached_chart_data(self._get_form(form_class, time_interval=10)))
+            # clean cache
+            clean_chart_data_cache()
+            with self.assertNumQueries(1):
+                self.assertEqual(data, get_cached_chart_data(self._get_form(form_class, time_interval=10)))
+
+    def test_cache_key(self):
+        key = get_chart_data_cache_key(self._get_form(
+            DramatiqLoadChartForm, time_interval=10, actor=['parallel_tasks', 'different_status']))
+        # dates are snapped to minutes, lists are sorted
+        self.assertEqual(key, get_chart_data_cache_key(self._get_form(
+            DramatiqLoadChartForm, time_interval=10, actor=['different_status', 'parallel_tasks'],
+            start_date=datetime(2022, 1, 1, 1, 0, 15))))
+        # other filter
+        self.assertNotEqual(key, get_chart_data_cache_key(self._get_form(
+            DramatiqLoadChartForm, time_interval=10, actor=['parallel_tasks'])))
+        # other chart
+        self.assertNotEqual(key, get_chart_data_cache_key(self._get_form(
+            DramatiqTimelineChartForm, actor=['parallel_tasks', 'different_status'])))
+        # settings qs filter
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER=~Q(actor_name='parallel_tasks')):
+            self.assertNotEqual(key, get_chart_data_cache_key(self._get_form(
+                DramatiqLoadChartForm, time_interval=10, actor=['parallel_tasks', 'different_status'])))
+        # chart data settings
+        timeline_key = get_chart_data_cache_key(self._get_form(DramatiqTimelineChartForm))
+        for name, value in (('TIMELINE_MAX_BARS', 10), ('AUTO_TICKS', 50), ('JSON_ENCODER', 'json')):
+            with self.settings(**{'DJANGO_DRAMATIQ_CHARTS_' + name: value}):
+                self.assertNotEqual(timeline_key, get_chart_data_cache_key(self._get_form(DramatiqTimelineChartForm)))
+
+    def test_cache_timeout(self):
+        self.assertEqual(60, get_chart_data_cache_timeout(self._get_form(DramatiqTimelineChartForm)))
+        # period is not finished
+        form = self._get_form(DramatiqTimelineChartForm, start_date=datetime.now() - timedelta(hours=1),
+                              end_date=datetime.now() + timedelta(minutes=1))
+        self.assertEqual(10, get_chart_data_cache_timeout(form))
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_CACHE_CHART_DATA_SEC=0):
+            self.assertEqual(0, get_chart_data_cache_timeout(form))
+            with self.assertNumQueries(1):
+                get_cached_chart_data(form)
+            with self.assertNumQueries(1):
+                get_cached_chart_data(form)
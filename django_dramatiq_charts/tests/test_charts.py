@@ -1,14 +1,35 @@
-import json
+import uuid
 from datetime import datetime
+from unittest import mock
 
+from django.core.cache import cache
 from django.db.models import Q
 from django_dramatiq.models import Task
 from django.test import TransactionTestCase, override_settings
-from django_dramatiq_charts.forms import DramatiqLoadChartForm, DramatiqTimelineChartForm
+from dramatiq import Message
+from django_dramatiq_charts import forms
+from django_dramatiq_charts.forms import DramatiqLoadChartForm, DramatiqLoadChartDeltaForm, \
+    DramatiqDurationChartForm, DramatiqThroughputChartForm, DramatiqQueueChartForm, DramatiqTimelineChartForm, \
+    get_actor_choices, get_auto_tick_sec
+from django_dramatiq_charts.consts import MESSAGE_OPTION_STARTED_AT
 
 _fixture_dataset = 'fixtures/dataset.json'
 
 
+class TestTickChartForm(TransactionTestCase):
+
+    def test_tick_chart_forms(self):
+        for form_class, initial_time_interval in ((DramatiqLoadChartForm, 10), (DramatiqDurationChartForm, 600),
+                                                  (DramatiqThroughputChartForm, 600), (DramatiqQueueChartForm, 60)):
+            form = form_class()
+            self.assertEqual(initial_time_interval, form.fields['time_interval'].initial)
+            self.assertEqual(['start_date', 'end_date', 'time_interval'], list(form.fields)[:3])
+            form = form_class(data=dict(start_date='2022-01-01 01:00:30', end_date='2022-01-01 01:10:59'))
+            self.assertTrue(form.is_valid(), form.errors)
+            # the period is aligned to minutes
+            self.assertEqual((datetime(2022, 1, 1, 1, 0, 0), datetime(2022, 1, 1, 1, 10, 0)), form.get_period())
+
+
 @override_settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER='')
 class TestDramatiqLoadChart(TransactionTestCase):
     fixtures = [_fixture_dataset]
@@ -34,14 +55,15 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertFalse(data['empty_qs'])
 
         # chart height
-        self.assertEqual('320', data['chart_height'])
+        self.assertEqual(320, data['chart_height'])
 
         # categories
         self.assertEqual(['specific_tasks', 'sequential_tasks', 'parallel_tasks', 'different_status'],
-                         json.loads(data['categories']))
+                         data['categories'])
 
-        # dates
-        self.assertEqual(7, len(json.loads(data['dates'])))
+        # ticks
+        self.assertEqual(('2022-01-01 01:00:00', 10, 0, 7),
+                         (data['start_date'], data['time_interval'], data['first_tick'], data['tick_count']))
 
         # working actors count
         self.assertEqual(
@@ -50,7 +72,7 @@ class TestDramatiqLoadChart(TransactionTestCase):
                 [1, 1, 1, 1, 2, 1, 1],
                 [1, 1, 6, 9, 7, 1, 1],
                 [None, 1, None, None, None, None, None]
-            ], json.loads(data['working_actors_count'])
+            ], data['working_actors_count']
         )
 
     def test_invalid_forms(self):
@@ -89,6 +111,34 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertFalse(form.is_valid())
         self.assertEqual(['Ensure this value is greater than or equal to 1.'], form.errors['time_interval'])
 
+        # too many intervals
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_MAX_TICKS=5):
+            form = DramatiqLoadChartForm(data=dict(
+                start_date=datetime(2022, 1, 1, 1, 0, 0),
+                end_date=datetime(2022, 1, 1, 1, 1, 0),
+                time_interval=10,
+            ))
+            self.assertFalse(form.is_valid())
+            self.assertEqual(['The maximum number of intervals is 5, increase the interval or leave it empty'],
+                             form.non_field_errors())
+
+    def test_auto_interval(self):
+        self.assertEqual(1, get_auto_tick_sec(60, 500))
+        self.assertEqual(60 * 60 * 2, get_auto_tick_sec(60 * 60 * 24 * 30, 500))
+        self.assertEqual(60 * 60 * 24 * 2, get_auto_tick_sec(60 * 60 * 24 * 90, 50))
+        # empty interval is chosen by the number of ticks
+        form_data = dict(start_date=datetime(2022, 1, 1, 1, 0, 0), end_date=datetime(2022, 1, 1, 1, 1, 0))
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_AUTO_TICKS=4):
+            form = DramatiqLoadChartForm(data=form_data)
+            self.assertTrue(form.is_valid())
+            data = form.get_chart_data()
+        self.assertEqual((15, 5), (data['time_interval'], data['tick_count']))
+        # the maximum date range is a setting
+        form_data['end_date'] = datetime(2022, 1, 9, 1, 0, 0)
+        self.assertFalse(DramatiqLoadChartForm(data=form_data).is_valid())
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_MAX_DATE_RANGE_DAYS=30):
+            self.assertTrue(DramatiqLoadChartForm(data=form_data).is_valid())
+
     def test_filters(self):
         # queue
         form = DramatiqLoadChartForm(data=dict(
@@ -100,8 +150,8 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        self.assertEqual(['specific_tasks'], json.loads(data['categories']))
-        self.assertEqual([[None, None, None, None, 1, None, None]], json.loads(data['working_actors_count']))
+        self.assertEqual(['specific_tasks'], data['categories'])
+        self.assertEqual([[None, None, None, None, 1, None, None]], data['working_actors_count'])
 
         # actor
         form = DramatiqLoadChartForm(data=dict(
@@ -113,8 +163,8 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        self.assertEqual(['different_status'], json.loads(data['categories']))
-        self.assertEqual([[None, 4, 1, 1, 1, None, 1]], json.loads(data['working_actors_count']))
+        self.assertEqual(['different_status'], data['categories'])
+        self.assertEqual([[None, 4, 1, 1, 1, None, 1]], data['working_actors_count'])
 
         # status
         form = DramatiqLoadChartForm(data=dict(
@@ -126,8 +176,8 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        self.assertEqual(['different_status'], json.loads(data['categories']))
-        self.assertEqual([[None, 2, None, None, 1, None, None]], json.loads(data['working_actors_count']))
+        self.assertEqual(['different_status'], data['categories'])
+        self.assertEqual([[None, 2, None, None, 1, None, None]], data['working_actors_count'])
 
         # time interval
         form = DramatiqLoadChartForm(data=dict(
@@ -138,7 +188,7 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        self.assertEqual(61, len(json.loads(data['dates'])))
+        self.assertEqual(61, data['tick_count'])
 
         # date period
         form = DramatiqLoadChartForm(data=dict(
@@ -149,8 +199,8 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        self.assertEqual(5, len(json.loads(data['categories'])))
-        self.assertIn('external_tasks', json.loads(data['categories']))
+        self.assertEqual(5, len(data['categories']))
+        self.assertIn('external_tasks', data['categories'])
 
     @override_settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER=~Q(actor_name='specific_tasks'))
     def test_qs_filter(self):
@@ -163,7 +213,318 @@ class TestDramatiqLoadChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        self.assertEqual(['sequential_tasks', 'parallel_tasks', 'different_status'], json.loads(data['categories']))
+        self.assertEqual(['sequential_tasks', 'parallel_tasks', 'different_status'], data['categories'])
+
+    def test_db_backend(self):
+        # same data as python backend
+        for form_data in (
+                dict(time_interval=10),
+                dict(time_interval=1, status=[Task.STATUS_RUNNING, Task.STATUS_DONE]),
+                dict(time_interval=7, actor=['different_status', 'parallel_tasks']),
+                dict(time_interval=13, start_date=datetime(2022, 1, 1, 0, 0, 0)),
+        ):
+            form_data = dict(dict(start_date=datetime(2022, 1, 1, 1, 0, 0), end_date=datetime(2022, 1, 1, 1, 1, 0)),
+                             **form_data)
+            form = DramatiqLoadChartForm(data=form_data)
+            self.assertTrue(form.is_valid())
+            data = form.get_chart_data()
+            with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_BACKEND='db'):
+                self.assertEqual(data, form.get_chart_data())
+
+    def test_load_value(self):
+        form_data = dict(start_date=datetime(2022, 1, 1, 1, 0, 0), end_date=datetime(2022, 1, 1, 1, 1, 0),
+                         time_interval=10)
+        form = DramatiqLoadChartForm(data=form_data)
+        self.assertTrue(form.is_valid())
+        sampled_data = form.get_chart_data()
+        actor_counts = {}
+        for load_value in ('max', 'mean'):
+            form = DramatiqLoadChartForm(data=dict(form_data, load_value=load_value))
+            self.assertTrue(form.is_valid())
+            data = form.get_chart_data()
+            self.assertEqual(sampled_data['categories'], data['categories'])
+            actor_counts[load_value] = data['working_actors_count']
+            # the database backend and workers fetch the tasks
+            for backend in ('python', 'db'):
+                with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_WORKERS=4, DJANGO_DRAMATIQ_CHARTS_LOAD_BACKEND=backend):
+                    self.assertEqual(data, form.get_chart_data())
+        for max_counts, mean_counts in zip(actor_counts['max'], actor_counts['mean']):
+            self.assertTrue(all((i or 0) >= (j or 0) for i, j in zip(max_counts, mean_counts)))
+
+    def test_workers(self):
+        # tasks are counted once in time shards
+        for form_data in (
+                dict(time_interval=10),
+                dict(time_interval=1, status=[Task.STATUS_RUNNING, Task.STATUS_DONE]),
+                dict(time_interval=13, start_date=datetime(2022, 1, 1, 0, 0, 0)),
+        ):
+            form_data = dict(dict(start_date=datetime(2022, 1, 1, 1, 0, 0), end_date=datetime(2022, 1, 1, 1, 1, 0)),
+                             **form_data)
+            form = DramatiqLoadChartForm(data=form_data)
+            self.assertTrue(form.is_valid())
+            data = form.get_chart_data()
+            for backend in ('python', 'db'):
+                with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_WORKERS=4, DJANGO_DRAMATIQ_CHARTS_LOAD_BACKEND=backend):
+                    self.assertEqual(data, form.get_chart_data())
+
+    def test_single_query(self):
+        form = DramatiqLoadChartForm(data=dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+            time_interval=10,
+        ))
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(1):
+            self.assertFalse(form.get_chart_data()['empty_qs'])
+
+        # empty qs
+        form = DramatiqLoadChartForm(data=dict(
+            start_date=datetime(2021, 1, 1, 1, 0, 0),
+            end_date=datetime(2021, 1, 1, 1, 1, 0),
+            time_interval=10,
+        ))
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(1):
+            self.assertTrue(form.get_chart_data()['empty_qs'])
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER='')
+@mock.patch('django.utils.timezone.now', lambda: datetime(2022, 1, 1, 1, 1, 0))
+class TestDramatiqLoadChartDelta(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    @staticmethod
+    def _get_form(form_class, **data):
+        form = form_class(data=dict(dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+            time_interval=10,
+        ), **data))
+        assert form.is_valid(), form.errors
+        return form
+
+    def _assert_delta(self, delta: dict, first_tick: int):
+        data = self._get_form(DramatiqLoadChartForm).get_chart_data()
+        self.assertEqual((first_tick, data['tick_count'] - first_tick), (delta['first_tick'], delta['tick_count']))
+        counts = [actor_counts[first_tick:] for actor_counts in data['working_actors_count']]
+        self.assertEqual(
+            [(actor, actor_counts) for actor, actor_counts in zip(data['categories'], counts) if any(actor_counts)],
+            list(zip(delta['categories'], delta['working_actors_count']))
+        )
+
+    def test_delta(self):
+        # without watermark the last day is recounted
+        delta = self._get_form(DramatiqLoadChartDeltaForm, since_tick=3).get_chart_delta()
+        self._assert_delta(delta, 0)
+        self.assertEqual('2022-01-01 01:01:00.000000', delta['watermark'])
+        # no changes after the watermark, the last fixture task is updated at 2022-01-14
+        with self.assertNumQueries(2):
+            delta = self._get_form(DramatiqLoadChartDeltaForm, since_tick=3,
+                                   watermark=datetime(2022, 1, 15)).get_chart_delta()
+        self._assert_delta(delta, 3)
+        # changed task is recounted since its start
+        task = Task.tasks.filter(
+            created_at__gte=datetime(2022, 1, 1, 1, 0, 1), created_at__lte=datetime(2022, 1, 1, 1, 0, 10),
+        ).order_by('created_at')[0]
+        Task.tasks.filter(pk=task.pk).update(updated_at=datetime(2022, 1, 15))
+        delta = self._get_form(DramatiqLoadChartDeltaForm, since_tick=3,
+                               watermark=datetime(2022, 1, 15)).get_chart_delta()
+        self._assert_delta(delta, 0)
+
+    def test_db_backend(self):
+        for watermark in (None, datetime(2022, 1, 1, 1, 0, 0)):
+            form = self._get_form(DramatiqLoadChartDeltaForm, since_tick=3, watermark=watermark)
+            delta = form.get_chart_delta()
+            with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_BACKEND='db'):
+                self.assertEqual(delta, form.get_chart_delta())
+
+    def test_invalid_forms(self):
+        # the last tick is before the period start
+        form = DramatiqLoadChartDeltaForm(data=dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+            time_interval=10,
+            since_tick=-1,
+        ))
+        self.assertFalse(form.is_valid())
+        # since_tick is required
+        form = DramatiqLoadChartDeltaForm(data=dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+            time_interval=10,
+        ))
+        self.assertFalse(form.is_valid())
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_DURATION_QS_FILTER='')
+class TestDramatiqDurationChart(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    @staticmethod
+    def _get_chart_data(**data) -> dict:
+        form = DramatiqDurationChartForm(data=dict(dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+            time_interval=20,
+            status=[Task.STATUS_DONE],
+        ), **data))
+        assert form.is_valid(), form.errors
+        return form.get_chart_data()
+
+    def test_valid_form(self):
+        data = self._get_chart_data()
+        self.assertFalse(data['empty_qs'])
+        self.assertEqual(['different_status', 'parallel_tasks', 'sequential_tasks', 'specific_tasks'],
+                         data['categories'])
+        self.assertEqual(('2022-01-01 01:00:00', 20, 3),
+                         (data['start_date'], data['time_interval'], data['tick_count']))
+        self.assertEqual([50, 95, 99], data['percentiles'])
+        task_count = Task.tasks.filter(
+            status=Task.STATUS_DONE, updated_at__gte=datetime(2022, 1, 1, 1, 0, 0),
+            updated_at__lt=datetime(2022, 1, 1, 1, 1, 0)).count()
+        self.assertEqual(task_count, sum(count or 0 for counts in data['task_counts'] for count in counts))
+        self.assertEqual(task_count, sum(map(sum, data['histograms'])))
+        self.assertEqual(len(data['histogram_bins']), len(data['histograms'][0]))
+        for actor_durations, actor_counts in zip(data['durations'], data['task_counts']):
+            self.assertEqual(3, len(actor_durations))
+            for durations in actor_durations:
+                self.assertEqual([count is None for count in actor_counts], [i is None for i in durations])
+            # percentiles are not decreasing
+            for p50, p99 in zip(actor_durations[0], actor_durations[2]):
+                self.assertTrue(p50 is None or p50 <= p99)
+        # empty qs
+        self.assertTrue(self._get_chart_data(start_date=datetime(2021, 1, 1, 1, 0, 0),
+                                             end_date=datetime(2021, 1, 1, 1, 1, 0))['empty_qs'])
+
+    def test_db_backend(self):
+        # exact percentiles on PostgreSQL, the same tasks on other databases
+        data = self._get_chart_data(status=[])
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_DURATION_BACKEND='db'):
+            db_data = self._get_chart_data(status=[])
+        for key in ('categories', 'task_counts', 'histogram_bins', 'histograms', 'tick_count'):
+            self.assertEqual(data[key], db_data[key])
+        for actor_durations, db_actor_durations, actor_counts in zip(
+                data['durations'], db_data['durations'], data['task_counts']):
+            # single task ticks have the same percentiles within the sketch accuracy
+            for durations, db_durations in zip(actor_durations, db_actor_durations):
+                for duration, db_duration, count in zip(durations, db_durations, actor_counts):
+                    if count == 1:
+                        self.assertAlmostEqual(db_duration, duration, delta=db_duration * 0.01 + 1e-6)
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_THROUGHPUT_QS_FILTER='')
+class TestDramatiqThroughputChart(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    @staticmethod
+    def _get_chart_data(**data) -> dict:
+        form = DramatiqThroughputChartForm(data=dict(dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+            time_interval=20,
+            group_by='actor',
+        ), **data))
+        assert form.is_valid(), form.errors
+        return form.get_chart_data()
+
+    def test_valid_form(self):
+        data = self._get_chart_data()
+        self.assertFalse(data['empty_qs'])
+        self.assertIn('Group by: <b>Actor</b>', data['chart_title'])
+        self.assertEqual('created', data['series'][0])
+        self.assertEqual(3, data['tick_count'])
+        period_tasks = Task.tasks.filter(created_at__gte=datetime(2022, 1, 1, 1, 0, 0),
+                                         created_at__lt=datetime(2022, 1, 1, 1, 1, 0))
+        self.assertEqual(period_tasks.count(), sum(sum(counts[0]) for counts in data['counts']))
+        done_index = data['series'].index(Task.STATUS_DONE)
+        self.assertEqual(
+            Task.tasks.filter(status=Task.STATUS_DONE, updated_at__gte=datetime(2022, 1, 1, 1, 0, 0),
+                              updated_at__lt=datetime(2022, 1, 1, 1, 1, 0)).count(),
+            sum(sum(counts[done_index]) for counts in data['counts']))
+        for rates in data['failure_rates']:
+            self.assertTrue(all(rate is None or 0 <= rate <= 1 for rate in rates))
+        # groups
+        data = self._get_chart_data(group_by='actor_queue', status=[Task.STATUS_FAILED])
+        self.assertEqual(['created', 'failed'], data['series'])
+        self.assertTrue(all(' (' in group for group in data['categories']))
+        self.assertEqual([1] * len(data['categories']),
+                         [max(i for i in rates if i is not None) for rates in data['failure_rates']])
+        self.assertTrue(self._get_chart_data(start_date=datetime(2021, 1, 1, 1, 0, 0),
+                                             end_date=datetime(2021, 1, 1, 1, 1, 0))['empty_qs'])
+
+    def test_db_backend(self):
+        for group_by in ('actor', 'queue', 'actor_queue'):
+            data = self._get_chart_data(group_by=group_by, time_interval=7)
+            with self.settings(DJANGO_DRAMATIQ_CHARTS_THROUGHPUT_BACKEND='db'):
+                self.assertEqual(data, self._get_chart_data(group_by=group_by, time_interval=7))
+
+
+class TestDramatiqQueueChart(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def _add_task(queue_name: str, status: str, message_data: bytes, created_at: datetime, updated_at: datetime):
+        task = Task.tasks.create(id=uuid.uuid4(), status=status, message_data=message_data,
+                                 actor_name='actor', queue_name=queue_name)
+        Task.tasks.filter(id=task.id).update(created_at=created_at, updated_at=updated_at)
+
+    @staticmethod
+    def _get_message_data(message_date: datetime, eta_date: datetime = None, started_date: datetime = None) -> bytes:
+        options = {'eta': int(eta_date.timestamp() * 1000)} if eta_date else {}
+        if started_date:
+            options[MESSAGE_OPTION_STARTED_AT] = int(started_date.timestamp() * 1000)
+        return Message(queue_name='', actor_name='actor', args=(), kwargs={}, options=options,
+                       message_timestamp=int(message_date.timestamp() * 1000)).encode()
+
+    def test_valid_form(self):
+        # waits from the message timestamp till updated_at
+        self._add_task('q1', Task.STATUS_RUNNING, self._get_message_data(datetime(2022, 2, 1, 0, 0, 5)),
+                       datetime(2022, 2, 1, 0, 0, 6), datetime(2022, 2, 1, 0, 0, 25))
+        # waits from the message timestamp till the start saved by TaskStartMiddleware
+        self._add_task('q1', Task.STATUS_DONE, self._get_message_data(
+            datetime(2022, 2, 1, 0, 0, 12), started_date=datetime(2022, 2, 1, 0, 0, 17)),
+            datetime(2022, 2, 1, 0, 0, 15), datetime(2022, 2, 1, 0, 0, 50))
+        # finished without the saved start, not counted
+        self._add_task('q1', Task.STATUS_FAILED, self._get_message_data(datetime(2022, 2, 1, 0, 0, 2)),
+                       datetime(2022, 2, 1, 0, 0, 3), datetime(2022, 2, 1, 0, 0, 55))
+        # waits from the eta till now
+        self._add_task('q2', Task.STATUS_DELAYED, self._get_message_data(
+            datetime(2022, 2, 1, 0, 0, 0), datetime(2022, 2, 1, 0, 0, 30)),
+            datetime(2022, 2, 1, 0, 0, 1), datetime(2022, 2, 1, 0, 0, 1))
+        # waits from created_at without message timestamp
+        self._add_task('q2', Task.STATUS_RUNNING, b'-', datetime(2022, 2, 1, 0, 0, 40), datetime(2022, 2, 1, 0, 0, 45))
+        form = DramatiqQueueChartForm(data=dict(
+            start_date=datetime(2022, 2, 1, 0, 0, 0),
+            end_date=datetime(2022, 2, 1, 0, 1, 0),
+            time_interval=10,
+        ))
+        self.assertTrue(form.is_valid())
+        with mock.patch.object(forms.timezone, 'now', return_value=datetime(2022, 2, 1, 0, 2, 0)):
+            # tasks and their message_data
+            with self.assertNumQueries(2):
+                data = form.get_chart_data()
+            # message_data is cached
+            with self.assertNumQueries(1):
+                self.assertEqual(data, form.get_chart_data())
+        self.assertEqual(['q1', 'q2'], data['categories'])
+        self.assertEqual([[0, 1, 1, 0, 0, 0], [0, 0, 0, 1, 2, 1]], data['depths'])
+        self.assertEqual([[None, 5.0, 20.0, None, None, None], [None, None, None, None, 5.0, None]],
+                         data['mean_waits'])
+        self.assertEqual(data['mean_waits'], data['max_waits'])
+        self.assertEqual(1, data['unknown_starts'])
+        self.assertEqual(6, data['tick_count'])
+        # queue filter
+        form = DramatiqQueueChartForm(data=dict(
+            start_date=datetime(2022, 2, 1, 0, 0, 0),
+            end_date=datetime(2022, 2, 1, 0, 1, 0),
+            time_interval=10,
+            queue=['q1'],
+        ))
+        form.fields['queue'].choices = [('q1', 'q1')]
+        self.assertTrue(form.is_valid())
+        self.assertEqual(['q1'], form.get_chart_data()['categories'])
 
 
 @override_settings(DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER='')
@@ -190,18 +551,20 @@ class TestDramatiqTimelineChart(TransactionTestCase):
         self.assertFalse(data['empty_qs'])
 
         # chart data
-        dt_format = "%Y-%m-%d %H:%M:%S.%f"
-        chart_data = json.loads(data['chart_data'])
-        self.assertEqual(27, len(chart_data))
-        self.assertEqual('sequential_tasks', chart_data[-1]['actor'])
-        self.assertEqual('done', chart_data[-1]['status'])
-        self.assertEqual(17000, chart_data[-1]['duration'])
-        self.assertEqual(datetime(2022, 1, 1, 0, 59, 50), datetime.strptime(chart_data[-1]['start'], dt_format))
-        self.assertEqual(datetime(2022, 1, 1, 1, 0, 7), datetime.strptime(chart_data[-1]['end'], dt_format))
+        chart_data = data['chart_data']
+        self.assertEqual(27, len(chart_data['start']))
+        self.assertEqual({'actor', 'queue', 'status', 'start', 'end', 'actors', 'colors', 'queues', 'statuses'},
+                         set(chart_data))
+        self.assertEqual(len(chart_data['actors']), len(chart_data['colors']))
+        self.assertEqual('sequential_tasks', chart_data['actors'][chart_data['actor'][-1]])
+        self.assertEqual('done', chart_data['statuses'][chart_data['status'][-1]])
+        self.assertEqual(17000, chart_data['end'][-1] - chart_data['start'][-1])
+        self.assertEqual(datetime(2022, 1, 1, 0, 59, 50), datetime.utcfromtimestamp(chart_data['start'][-1] / 1000))
+        self.assertEqual(datetime(2022, 1, 1, 1, 0, 7), datetime.utcfromtimestamp(chart_data['end'][-1] / 1000))
 
         # filter data
         dt_format = "%Y-%m-%d %H:%M:%S"
-        filter_data = json.loads(data['filter_data'])
+        filter_data = data['filter_data']
         self.assertEqual(5, len(filter_data))
         self.assertEqual(datetime(2022, 1, 1, 1, 0, 0), datetime.strptime(filter_data['start_date'], dt_format))
         self.assertEqual(datetime(2022, 1, 1, 1, 1, 0), datetime.strptime(filter_data['end_date'], dt_format))
@@ -237,9 +600,9 @@ class TestDramatiqTimelineChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        chart_data = json.loads(data['chart_data'])
-        self.assertEqual(3, len(chart_data))
-        self.assertEqual({'specific_tasks'}, {task['actor'] for task in chart_data})
+        chart_data = data['chart_data']
+        self.assertEqual(3, len(chart_data['start']))
+        self.assertEqual({'specific_tasks'}, set(chart_data['actors']))
 
         # actor
         form = DramatiqTimelineChartForm(data=dict(
@@ -250,9 +613,9 @@ class TestDramatiqTimelineChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        chart_data = json.loads(data['chart_data'])
-        self.assertEqual(8, len(chart_data))
-        self.assertEqual({'different_status'}, {task['actor'] for task in chart_data})
+        chart_data = data['chart_data']
+        self.assertEqual(8, len(chart_data['start']))
+        self.assertEqual({'different_status'}, set(chart_data['actors']))
 
         # status
         form = DramatiqTimelineChartForm(data=dict(
@@ -263,9 +626,9 @@ class TestDramatiqTimelineChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        chart_data = json.loads(data['chart_data'])
-        self.assertEqual(3, len(chart_data))
-        self.assertEqual({'running'}, {task['status'] for task in chart_data})
+        chart_data = data['chart_data']
+        self.assertEqual(3, len(chart_data['start']))
+        self.assertEqual({'running'}, set(chart_data['statuses']))
 
         # date period
         form = DramatiqTimelineChartForm(data=dict(
@@ -275,9 +638,9 @@ class TestDramatiqTimelineChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        chart_data = json.loads(data['chart_data'])
-        self.assertEqual(28, len(chart_data))
-        self.assertIn('external_tasks', {task['actor'] for task in chart_data})
+        chart_data = data['chart_data']
+        self.assertEqual(28, len(chart_data['start']))
+        self.assertIn('external_tasks', set(chart_data['actors']))
 
     @override_settings(DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER=~Q(actor_name='specific_tasks'))
     def test_qs_filter(self):
@@ -289,6 +652,47 @@ class TestDramatiqTimelineChart(TransactionTestCase):
         self.assertTrue(form.is_valid())
         data = form.get_chart_data()
         self.assertFalse(data['empty_qs'])
-        chart_data = json.loads(data['chart_data'])
+        chart_data = data['chart_data']
         self.assertEqual(['different_status', 'parallel_tasks', 'sequential_tasks'],
-                         sorted(list({task['actor'] for task in chart_data})))
+                         sorted(list(set(chart_data['actors']))))
+
+    @override_settings(DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER='', DJANGO_DRAMATIQ_CHARTS_TIMELINE_MAX_BARS=20)
+    def test_max_bars(self):
+        form = DramatiqTimelineChartForm(data=dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+        ))
+        self.assertTrue(form.is_valid())
+        data = form.get_chart_data()
+        self.assertTrue(data['merged'])
+        self.assertGreaterEqual(20, len(data['chart_data']['start']))
+        self.assertEqual(data['task_count'], sum(data['chart_data']['count']))
+        # full detail for a shorter period
+        form = DramatiqTimelineChartForm(data=dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 0, 10),
+        ))
+        self.assertTrue(form.is_valid())
+        data = form.get_chart_data()
+        self.assertFalse(data['merged'])
+        self.assertEqual(data['task_count'], len(data['chart_data']['start']))
+
+    def test_single_query(self):
+        form = DramatiqTimelineChartForm(data=dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+        ))
+        self.assertTrue(form.is_valid())
+        # actor colors are built from the cached actor choices
+        get_actor_choices()
+        with self.assertNumQueries(1):
+            self.assertFalse(form.get_chart_data()['empty_qs'])
+
+        # empty qs
+        form = DramatiqTimelineChartForm(data=dict(
+            start_date=datetime(2021, 1, 1, 1, 0, 0),
+            end_date=datetime(2021, 1, 1, 1, 1, 0),
+        ))
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(1):
+            self.assertTrue(form.get_chart_data()['empty_qs'])
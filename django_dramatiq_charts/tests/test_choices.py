@@ -0,0 +1,65 @@
+import time
+from datetime import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django_dramatiq.models import Task
+from django_dramatiq_charts import choices
+from django_dramatiq_charts.choices import distinct_choices, recent_distinct_choices, broker_choices, \
+    get_cached_choices
+from django_dramatiq_charts.consts import CACHE_KEY_ACTOR_CHOICES
+
+_fixture_dataset = 'fixtures/dataset.json'
+
+
+class TestChoices(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    def setUp(self):
+        cache.delete_many((CACHE_KEY_ACTOR_CHOICES, CACHE_KEY_ACTOR_CHOICES + '__refresh'))
+
+    def tearDown(self):
+        # choices of the changed tasks
+        cache.delete(CACHE_KEY_ACTOR_CHOICES)
+
+    def test_providers(self):
+        actors = list(distinct_choices('actor_name'))
+        self.assertEqual(sorted(set(Task.tasks.values_list('actor_name', flat=True))), actors)
+        # tasks of the last day only
+        with mock.patch('django.utils.timezone.now', lambda: datetime(2022, 1, 14, 3, 0)), \
+                self.settings(DJANGO_DRAMATIQ_CHARTS_CHOICES_RECENT_DAYS=1):
+            recent_actors = list(recent_distinct_choices('actor_name'))
+        self.assertEqual(['external_tasks'], recent_actors)
+        # demo project actor
+        with self.assertNumQueries(0):
+            self.assertIn('process_job', broker_choices('actor_name'))
+            queues = broker_choices('queue_name')
+        self.assertIn('queue', queues)
+        self.assertFalse([i for i in queues if i.endswith('.DQ')])
+
+    def test_choices_fn(self):
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_CACHE_FORM_DATA_SEC=0,
+                           DJANGO_DRAMATIQ_CHARTS_CHOICES_FN=lambda field_name: ['a', 'b']):
+            with self.assertNumQueries(0):
+                self.assertEqual((('a', 'a'), ('b', 'b')), get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name'))
+
+    @override_settings(DJANGO_DRAMATIQ_CHARTS_CACHE_FORM_DATA_SEC=60)
+    @mock.patch.object(choices.threading, 'Thread')
+    def test_stale_while_revalidate(self, thread_mock):
+        with self.assertNumQueries(1):
+            actor_choices = get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name')
+        with self.assertNumQueries(0):
+            self.assertEqual(actor_choices, get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name'))
+        thread_mock.assert_not_called()
+        # expired choices are returned, new ones are built in background once
+        Task.tasks.filter(actor_name='parallel_tasks').update(actor_name='renamed_tasks')
+        now = time.time() + 61
+        with mock.patch.object(choices.time, 'time', lambda: now), self.assertNumQueries(0):
+            self.assertEqual(actor_choices, get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name'))
+            self.assertEqual(actor_choices, get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name'))
+        self.assertEqual(1, thread_mock.call_count)
+        thread_mock.call_args[1]['target'](*thread_mock.call_args[1]['args'])
+        self.assertIn(('renamed_tasks', 'renamed_tasks'), get_cached_choices(CACHE_KEY_ACTOR_CHOICES, 'actor_name'))
+        # refresh lock is released
+        self.assertIsNone(cache.get(CACHE_KEY_ACTOR_CHOICES + '__refresh'))
@@ -0,0 +1,71 @@
+import colorsys
+import re
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from django_dramatiq_charts import colors
+from django_dramatiq_charts.colors import ColorTable, get_color_table, get_name_color, get_actor_color_table, \
+    _hue_distance
+from django_dramatiq_charts.forms import permanent_hex_color_for_name
+
+
+def _hue(hex_color: str) -> float:
+    rgb = [int(hex_color[i:i + 2], 16) / 255 for i in (1, 3, 5)]
+    return colorsys.rgb_to_hls(*rgb)[0] * 360
+
+
+class TestColors(SimpleTestCase):
+
+    def test_name_color(self):
+        self.assertRegex(get_name_color('actor'), re.compile('^#[0-9a-f]{6}$'))
+        self.assertEqual(get_name_color('actor'), get_name_color('actor'))
+
+    def test_color_table(self):
+        names = ['actor_{}'.format(i) for i in range(12)]
+        table = ColorTable(names)
+        # deterministic, independent of the order
+        self.assertEqual(table.colors, ColorTable(reversed(names)).colors)
+        self.assertEqual(table.version, ColorTable(reversed(names)).version)
+        self.assertNotEqual(table.version, ColorTable(names[1:]).version)
+        # no similar hues, up to rgb rounding
+        hues = [_hue(table.colors[name]) for name in names]
+        for i, hue in enumerate(hues):
+            for other in hues[i + 1:]:
+                self.assertGreaterEqual(_hue_distance(hue, other), 22)
+        # names outside of the table
+        self.assertEqual(get_name_color('other'), table.get_color('other'))
+        # built once
+        self.assertIs(get_color_table(names), get_color_table(reversed(names)))
+
+    def test_new_name_keeps_colors(self):
+        names = ['actor_{}'.format(i) for i in range(12)]
+        table = ColorTable(names)
+        for new_name in ('actor_0a', 'a', 'z'):
+            new_table = ColorTable(names + [new_name], table.assigned)
+            self.assertEqual(table.colors, {name: new_table.colors[name] for name in names})
+            self.assertNotEqual(table.version, new_table.version)
+            # apart from the assigned hues, they are not evenly spaced
+            new_hue = _hue(new_table.colors[new_name])
+            self.assertGreaterEqual(min(_hue_distance(new_hue, _hue(color)) for color in table.colors.values()), 12)
+
+    def test_actor_color_table(self):
+        cache.clear()
+        names = ['actor_{}'.format(i) for i in range(5)]
+        with mock.patch.object(colors, 'get_cached_choices', return_value=[(name, name) for name in names]):
+            table = get_actor_color_table()
+            self.assertIs(table, get_actor_color_table())
+        # an actor that sorts first appears, the assigned colors are kept in the cache
+        with mock.patch.object(colors, 'get_cached_choices', return_value=[(name, name) for name in ['a'] + names]):
+            new_table = get_actor_color_table()
+        self.assertEqual(table.colors, {name: new_table.colors[name] for name in names})
+        self.assertIn('a', new_table.colors)
+        # removed actors keep their colors
+        with mock.patch.object(colors, 'get_cached_choices', return_value=[]):
+            self.assertEqual(new_table.colors, get_actor_color_table().colors)
+        cache.clear()
+
+    def test_permanent_hex_color_for_name(self):
+        # md5 color of the previous versions
+        self.assertEqual('#98f6bc', permanent_hex_color_for_name('test'))
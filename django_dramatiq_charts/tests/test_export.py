@@ -0,0 +1,106 @@
+import csv
+import io
+from datetime import datetime
+from unittest import skipIf
+
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django_dramatiq.models import Task
+
+from django_dramatiq_charts import export
+from django_dramatiq_charts.export import iter_export
+from django_dramatiq_charts.forms import DramatiqLoadChartForm, DramatiqDurationChartForm, \
+    DramatiqThroughputChartForm, DramatiqQueueChartForm, DramatiqTimelineChartForm
+
+_fixture_dataset = 'fixtures/dataset.json'
+_period = dict(start_date=datetime(2022, 1, 1, 1, 0, 0), end_date=datetime(2022, 1, 1, 1, 1, 0))
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER='', DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER='',
+                   DJANGO_DRAMATIQ_CHARTS_DURATION_QS_FILTER='', DJANGO_DRAMATIQ_CHARTS_THROUGHPUT_QS_FILTER='',
+                   DJANGO_DRAMATIQ_CHARTS_QUEUE_QS_FILTER='')
+class TestExport(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    @staticmethod
+    def _get_export_data(form_class, **data):
+        form = form_class(data=dict(_period, **data))
+        assert form.is_valid(), form.errors
+        return form.get_export_data()
+
+    def test_export_data(self):
+        # load: nonzero counts of the chart
+        columns, rows = self._get_export_data(DramatiqLoadChartForm, time_interval=10)
+        self.assertEqual(['tick', 'actor', 'count'], [name for name, _ in columns])
+        rows = list(rows)
+        self.assertIn((datetime(2022, 1, 1, 1, 0, 30), 'parallel_tasks', 9), rows)
+        self.assertNotIn(None, [count for _, _, count in rows])
+        # duration
+        columns, rows = self._get_export_data(DramatiqDurationChartForm, time_interval=20)
+        self.assertEqual(['tick', 'actor', 'tasks', 'p50', 'p95', 'p99'], [name for name, _ in columns])
+        self.assertTrue(all(len(row) == 6 for row in rows))
+        # throughput
+        columns, rows = self._get_export_data(DramatiqThroughputChartForm, time_interval=20, group_by='queue')
+        self.assertEqual(['tick', 'group', 'created'], [name for name, _ in columns][:3])
+        self.assertEqual('failure_rate', columns[-1][0])
+        rows = list(rows)
+        self.assertTrue(rows)
+        self.assertTrue(all(any(row[2:-1]) for row in rows))
+        # queue: ticks with waiting or started tasks
+        columns, rows = self._get_export_data(DramatiqQueueChartForm, time_interval=20)
+        self.assertEqual(['tick', 'queue', 'depth', 'mean_wait_sec', 'max_wait_sec'], [name for name, _ in columns])
+        self.assertTrue(all(depth or mean_wait is not None for _, _, depth, mean_wait, _ in rows))
+        # timeline: all tasks of the period
+        columns, rows = self._get_export_data(DramatiqTimelineChartForm)
+        self.assertEqual(27, len(list(rows)))
+        # empty
+        columns, rows = self._get_export_data(DramatiqLoadChartForm, time_interval=10,
+                                              start_date=datetime(2021, 1, 1, 1, 0, 0),
+                                              end_date=datetime(2021, 1, 1, 1, 1, 0))
+        self.assertEqual([], list(rows))
+
+    def test_csv(self):
+        columns = [('tick', 'datetime'), ('actor', 'str'), ('count', 'int')]
+        rows = [(datetime(2022, 1, 1, 1, 0, i), 'a,b', i) for i in range(5)]
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_QS_CHUNK_SIZE=2):
+            parts = list(iter_export('csv', columns, rows))
+        # header and batches
+        self.assertEqual(4, len(parts))
+        self.assertEqual([['tick', 'actor', 'count'], ['2022-01-01 01:00:00', 'a,b', '0']],
+                         list(csv.reader(io.StringIO(''.join(parts))))[:2])
+
+    @skipIf(export.pyarrow is None, 'pyarrow is not installed')
+    def test_arrow(self):
+        import pyarrow.ipc
+        import pyarrow.parquet
+        columns = [('tick', 'datetime'), ('actor', 'str'), ('count', 'int'), ('rate', 'float')]
+        rows = [(datetime(2022, 1, 1, 1, 0, i), 'a', i, None) for i in range(5)]
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_QS_CHUNK_SIZE=2):
+            arrow_data = b''.join(iter_export('arrow', columns, rows))
+            parquet_parts = list(iter_export('parquet', columns, rows))
+        table = pyarrow.ipc.open_stream(arrow_data).read_all()
+        self.assertEqual(list(range(5)), table.column('count').to_pylist())
+        # row groups are streamed
+        self.assertGreater(len(parquet_parts), 2)
+        table = pyarrow.parquet.read_table(io.BytesIO(b''.join(parquet_parts)))
+        self.assertEqual(5, table.num_rows)
+        self.assertEqual([row[0] for row in rows], table.column('tick').to_pylist())
+
+    def test_views(self):
+        params = '?start_date=2022-01-01+01:00:00&end_date=2022-01-01+01:01:00&time_interval=10'
+        response = self.client.get(reverse('ddc_timeline_chart_export') + params)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('attachment; filename="timeline_chart.csv"', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual('id,actor,queue,status,created_at,updated_at', lines[0])
+        self.assertEqual(Task.tasks.filter(updated_at__gte=_period['start_date'],
+                                           created_at__lte=_period['end_date']).count(), len(lines) - 1)
+        for url_name in ('ddc_load_chart_export', 'ddc_duration_chart_export', 'ddc_throughput_chart_export'):
+            response = self.client.get(reverse(url_name) + params)
+            self.assertEqual(200, response.status_code)
+            self.assertIn('text/csv', response['Content-Type'])
+        # unknown format, invalid form
+        response = self.client.get(reverse('ddc_load_chart_export') + params + '&format=xls')
+        self.assertEqual(400, response.status_code)
+        response = self.client.get(reverse('ddc_load_chart_export'))
+        self.assertEqual(400, response.status_code)
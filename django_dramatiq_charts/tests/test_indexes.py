@@ -0,0 +1,50 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test import TransactionTestCase
+from django_dramatiq_charts.indexes import get_chart_indexes, get_existing_index_names, create_chart_indexes, \
+    drop_chart_indexes
+
+_fixture_dataset = 'fixtures/dataset.json'
+
+
+class TestChartIndexes(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    def tearDown(self):
+        drop_chart_indexes(DEFAULT_DB_ALIAS)
+
+    def test_create_drop(self):
+        index_names = {index.name for index in get_chart_indexes(DEFAULT_DB_ALIAS)}
+        self.assertFalse(index_names & get_existing_index_names(DEFAULT_DB_ALIAS))
+        self.assertEqual(index_names, set(create_chart_indexes(DEFAULT_DB_ALIAS)))
+        self.assertEqual(index_names, index_names & get_existing_index_names(DEFAULT_DB_ALIAS))
+        # existing indexes are skipped
+        self.assertEqual([], create_chart_indexes(DEFAULT_DB_ALIAS))
+        self.assertEqual(index_names, set(drop_chart_indexes(DEFAULT_DB_ALIAS)))
+        self.assertFalse(index_names & get_existing_index_names(DEFAULT_DB_ALIAS))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('dramatiq_charts_indexes', 'create', stdout=out)
+        call_command('dramatiq_charts_indexes', 'list', stdout=out)
+        self.assertIn('+ ddc_task_upd_crt', out.getvalue())
+        for chart in ('load', 'timeline'):
+            out = StringIO()
+            call_command('dramatiq_charts_indexes', 'explain', '--chart', chart, '--start-date', '2022-01-01 01:00:00',
+                         '--end-date', '2022-01-01 01:01:00', '--actor', 'parallel_tasks', stdout=out)
+            self.assertIn('parallel_tasks', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('dramatiq_charts_indexes', 'explain', '--start-date', '2022-01-01 01:00:00', stdout=out)
+
+    def test_concurrently(self):
+        if connection.vendor == 'postgresql':
+            call_command('dramatiq_charts_indexes', 'create', '--concurrently', stdout=StringIO())
+            self.assertIn('ddc_task_upd_crt', get_existing_index_names(DEFAULT_DB_ALIAS))
+            call_command('dramatiq_charts_indexes', 'drop', '--concurrently', stdout=StringIO())
+            self.assertNotIn('ddc_task_upd_crt', get_existing_index_names(DEFAULT_DB_ALIAS))
+        else:
+            for action in ('create', 'drop'):
+                with self.assertRaisesMessage(CommandError, '--concurrently is PostgreSQL only'):
+                    call_command('dramatiq_charts_indexes', action, '--concurrently', stdout=StringIO())
@@ -0,0 +1,48 @@
+import json
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from django_dramatiq_charts import json_encoder
+from django_dramatiq_charts.json_encoder import ChartJsonResponse, dumps, get_json_encoder_name
+
+
+class TestJsonEncoder(SimpleTestCase):
+    data = {
+        'categories': ['actor_ä', 'b"'],
+        'working_actors_count': [[None, 1, 2], [3, None, None]],
+        'durations': [[0.5, 1e-06, None]],
+        'tick_count': 3,
+        'empty_qs': False,
+        'id': uuid.UUID(int=1),
+        'rate': Decimal('0.25'),
+    }
+
+    def test_encoders(self):
+        expected = json.loads(json.dumps(self.data, cls=json_encoder.DjangoJSONEncoder))
+        for name in ('json', 'orjson', 'msgspec'):
+            if name != 'json' and getattr(json_encoder, name) is None:
+                continue
+            with self.settings(DJANGO_DRAMATIQ_CHARTS_JSON_ENCODER=name):
+                self.assertEqual(name, get_json_encoder_name())
+                content = dumps(self.data)
+            self.assertIsInstance(content, bytes)
+            self.assertEqual(expected, json.loads(content))
+            # compact
+            self.assertNotIn(b', ', content)
+
+    def test_auto(self):
+        with mock.patch.object(json_encoder, 'orjson', None), mock.patch.object(json_encoder, 'msgspec', None):
+            self.assertEqual('json', get_json_encoder_name())
+            with self.settings(DJANGO_DRAMATIQ_CHARTS_JSON_ENCODER='orjson'), self.assertRaises(ImproperlyConfigured):
+                get_json_encoder_name()
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_JSON_ENCODER='yaml'), self.assertRaises(ImproperlyConfigured):
+            get_json_encoder_name()
+
+    def test_response(self):
+        response = ChartJsonResponse({'a': [1, None]})
+        self.assertEqual('application/json', response['Content-Type'])
+        self.assertEqual({'a': [1, None]}, json.loads(response.content))
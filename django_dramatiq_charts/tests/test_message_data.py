@@ -0,0 +1,60 @@
+import uuid
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django_dramatiq.models import Task
+from dramatiq import Message
+
+from django_dramatiq_charts import middleware
+from django_dramatiq_charts.middleware import TaskStartMiddleware
+from django_dramatiq_charts.message_data import decode_message_times, epoch_ms_to_dt, get_message_times, \
+    iter_with_message_times
+
+
+def get_message_data(message_timestamp: int, **options) -> bytes:
+    return Message(queue_name='default', actor_name='actor', args=(), kwargs={}, options=options,
+                   message_timestamp=message_timestamp).encode()
+
+
+class TestMessageData(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_decode(self):
+        self.assertEqual((1643673600000, None, None), decode_message_times(get_message_data(1643673600000)))
+        self.assertEqual((1643673600000, 1643673630000, None),
+                         decode_message_times(get_message_data(1643673600000, eta=1643673630000)))
+        self.assertEqual((None, None, None), decode_message_times(b'\xff not json'))
+        self.assertEqual((None, None, None), decode_message_times(b'[1, 2]'))
+
+    def test_task_start_middleware(self):
+        message = Message(queue_name='default', actor_name='actor', args=(), kwargs={}, options={},
+                          message_timestamp=1643673600000)
+        with mock.patch.object(middleware.time, 'time', return_value=1643673605.5):
+            TaskStartMiddleware().before_process_message(None, message)
+        self.assertEqual((1643673600000, None, 1643673605500), decode_message_times(message.encode()))
+
+    def test_epoch_ms_to_dt(self):
+        self.assertEqual(datetime(2022, 2, 1, 0, 0, 0, 500000), epoch_ms_to_dt(1643673600500))
+        with self.settings(USE_TZ=True):
+            self.assertEqual(datetime(2022, 2, 1, tzinfo=timezone.utc), epoch_ms_to_dt(1643673600000))
+
+    def test_cached_times(self):
+        task = Task.tasks.create(id=uuid.uuid4(), message_data=get_message_data(1643673600000))
+        missing_id = uuid.uuid4()
+        tasks = [(task.id, task.updated_at), (missing_id, task.updated_at)]
+        # message_data is fetched by one query, then it is cached
+        with self.assertNumQueries(1):
+            self.assertEqual({task.id: (1643673600000, None, None)}, get_message_times(tasks))
+        with self.assertNumQueries(0):
+            self.assertEqual({task.id: (1643673600000, None, None)}, get_message_times(tasks[:1]))
+        # the task is updated
+        Task.tasks.filter(id=task.id).update(message_data=get_message_data(1643673600000, eta=1643673630000),
+                                             updated_at=datetime(2022, 2, 1))
+        task.refresh_from_db()
+        with self.assertNumQueries(1):
+            rows = list(iter_with_message_times([(task.id, task.updated_at, 'default')]))
+        self.assertEqual([((task.id, task.updated_at, 'default'), (1643673600000, 1643673630000, None))], rows)
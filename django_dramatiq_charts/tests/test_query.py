@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from django.db.models import Q
+from django.test import TransactionTestCase, override_settings
+from django_dramatiq.models import Task
+
+from django_dramatiq_charts.query import TaskQuery, iter_task_rows
+
+_fixture_dataset = 'fixtures/dataset.json'
+
+_period_filter = Q(updated_at__gte=datetime(2022, 1, 1), created_at__lte=datetime(2022, 1, 2))
+
+
+def _replica_rows(task_qs, fields):
+    return [('replica',) * len(fields)]
+
+
+class TestTaskQuery(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    def test_filters(self):
+        task_qs = TaskQuery(_period_filter).get_queryset()
+        self.assertEqual(set(Task.tasks.filter(_period_filter)), set(task_qs))
+        self.assertFalse(task_qs.ordered)
+        task_qs = TaskQuery(_period_filter, actors=['parallel_tasks', 'different_status'], statuses=['done'],
+                            qs_filter=~Q(actor_name='different_status')).get_queryset()
+        self.assertTrue(task_qs.exists())
+        self.assertEqual({('parallel_tasks', 'done')}, set(task_qs.values_list('actor_name', 'status')))
+        self.assertFalse(TaskQuery(_period_filter, queues=['no_queue']).get_queryset().exists())
+        task_qs = TaskQuery(_period_filter, ordering=('-created_at', '-updated_at')).get_queryset()
+        self.assertEqual(list(Task.tasks.filter(_period_filter).order_by('-created_at', '-updated_at')), list(task_qs))
+
+    def test_pages(self):
+        task_query = TaskQuery(_period_filter)
+        fields = ('id', 'actor_name')
+        for descending, ordering in ((False, ('created_at', 'id')), (True, ('-created_at', '-id'))):
+            expected_rows = list(Task.tasks.filter(_period_filter).order_by(*ordering).values_list(*fields))
+            self.assertGreater(len(expected_rows), 3)
+            # the fixture has tasks created at the same time, they are separated by id
+            pages = list(task_query.iter_pages(fields, page_size=3, descending=descending))
+            self.assertTrue(all(len(page) <= 3 for page in pages))
+            self.assertEqual(expected_rows, [row for page in pages for row in page])
+            with self.assertNumQueries(1):
+                pages = list(task_query.iter_pages(fields, page_size=len(expected_rows) + 1, descending=descending))
+            self.assertEqual([expected_rows], pages)
+        self.assertEqual([], list(TaskQuery(Q(actor_name='no_actor')).iter_pages(fields)))
+
+    def test_hooks(self):
+        task_query = TaskQuery(_period_filter)
+        with override_settings(DJANGO_DRAMATIQ_CHARTS_TASK_QS_FN=lambda task_qs: task_qs.filter(status='done')):
+            self.assertEqual({'done'}, set(task_query.get_queryset().values_list('status', flat=True)))
+        with override_settings(DJANGO_DRAMATIQ_CHARTS_TASK_ROWS_FN=_replica_rows):
+            self.assertEqual([('replica', 'replica')], list(task_query.iter_rows(('id', 'status'))))
+            self.assertEqual([('replica',)], list(iter_task_rows(Task.tasks.all(), ['id'])))
+        self.assertEqual(set(Task.tasks.filter(_period_filter).values_list('id', flat=True)),
+                         {task_id for task_id, in task_query.iter_rows(('id',))})
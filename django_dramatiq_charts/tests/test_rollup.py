@@ -0,0 +1,124 @@
+from io import StringIO
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django_dramatiq.models import Task
+from django_dramatiq_charts import rollup
+from django_dramatiq_charts.aggregation import LoadTickCounter
+from django_dramatiq_charts.forms import DramatiqLoadChartForm
+from django_dramatiq_charts.models import LoadRollup, LoadRollupState
+from django_dramatiq_charts.rollup import update_load_rollup, floor_to_interval, is_load_rollup_built
+
+_fixture_dataset = 'fixtures/dataset.json'
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER='', DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_INTERVAL_SEC=10)
+class TestLoadRollup(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+
+    @staticmethod
+    def _get_chart_data(**data) -> dict:
+        form = DramatiqLoadChartForm(data=dict(dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=datetime(2022, 1, 1, 1, 1, 0),
+            time_interval=10,
+        ), **data))
+        assert form.is_valid(), form.errors
+        return form.get_chart_data()
+
+    def _assert_rollup_data_equal(self):
+        for form_data in (
+                dict(),
+                dict(status=[Task.STATUS_RUNNING]),
+                dict(actor=['different_status', 'parallel_tasks'], queue=['queue']),
+                dict(start_date=datetime(2022, 1, 1, 0, 0, 0), end_date=datetime(2022, 1, 1, 2, 0, 0)),
+        ):
+            with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_INTERVAL_SEC=None):
+                data = self._get_chart_data(**form_data)
+            self.assertEqual(data, self._get_chart_data(**form_data))
+
+    @staticmethod
+    def _get_rollup() -> list:
+        return list(LoadRollup.objects.order_by('tick', 'actor_name', 'queue_name', 'status').values_list(
+            'tick', 'actor_name', 'queue_name', 'status', 'count'))
+
+    def test_floor_to_interval(self):
+        self.assertEqual(datetime(2022, 1, 1, 1, 0, 0), floor_to_interval(datetime(2022, 1, 1, 1, 0, 0), 60))
+        self.assertEqual(datetime(2022, 1, 1, 1, 0, 0), floor_to_interval(datetime(2022, 1, 1, 1, 0, 59, 1), 60))
+        self.assertEqual(datetime(2022, 1, 1, 1, 0, 50), floor_to_interval(datetime(2022, 1, 1, 1, 0, 59), 10))
+
+    def test_rollup(self):
+        call_command('dramatiq_charts_rollup', stdout=StringIO())
+        state = LoadRollupState.objects.get()
+        self.assertEqual(10, state.interval_sec)
+        self.assertEqual(Task.tasks.latest('updated_at').updated_at, state.watermark)
+        self.assertTrue(LoadRollup.objects.exists())
+        self._assert_rollup_data_equal()
+        # nothing is read from the task table
+        with self.assertNumQueries(2):
+            self._get_chart_data()
+        # ticks are sampled from the rollup ticks: state, actors and the rollup rows at the chart ticks
+        with self.assertNumQueries(3):
+            data = self._get_chart_data(time_interval=20)
+        self.assertEqual(4, data['tick_count'])
+        # rollup rows of the other ticks are not read
+        with mock.patch.object(LoadTickCounter, 'add_tick_count', autospec=True,
+                               side_effect=LoadTickCounter.add_tick_count) as add_tick_count:
+            data = self._get_chart_data(time_interval=30, status=[Task.STATUS_DONE])
+        read_ticks = [call.args[2] for call in add_tick_count.call_args_list]
+        self.assertEqual({None, 0, 1, 2}, set(read_ticks))
+        # actors are added once without counts
+        self.assertEqual(len(data['categories']), read_ticks.count(None))
+        # chart ticks are read by chunks
+        with mock.patch.object(rollup, '_rollup_ticks_chunk_size', 1), self.assertNumQueries(5):
+            self.assertEqual(data, self._get_chart_data(time_interval=30, status=[Task.STATUS_DONE]))
+
+    def test_incremental_update(self):
+        watermark = update_load_rollup()
+        # running task is done, new task is running
+        task = Task.tasks.filter(status=Task.STATUS_RUNNING).earliest('created_at')
+        Task.tasks.filter(id=task.id).update(status=Task.STATUS_DONE, updated_at=watermark + timedelta(seconds=5))
+        new_task = Task.tasks.get(id=task.id)
+        new_task.id, new_task.status = '00000000-0000-0000-0000-000000000001', Task.STATUS_RUNNING
+        new_task.save(force_insert=True)
+        Task.tasks.filter(id=new_task.id).update(
+            created_at=watermark + timedelta(seconds=1), updated_at=watermark + timedelta(seconds=12))
+        self.assertEqual(watermark + timedelta(seconds=12), update_load_rollup())
+        rollup = self._get_rollup()
+        # same as counted from scratch
+        update_load_rollup(rebuild=True)
+        self.assertEqual(rollup, self._get_rollup())
+        self._assert_rollup_data_equal()
+
+    @staticmethod
+    def _get_long_form(end_date: datetime = datetime(2022, 1, 12, 1, 0, 0), time_interval: int = 60):
+        return DramatiqLoadChartForm(data=dict(
+            start_date=datetime(2022, 1, 1, 1, 0, 0),
+            end_date=end_date,
+            time_interval=time_interval,
+        ))
+
+    def test_max_date_range(self):
+        update_load_rollup()
+        self.assertTrue(self._get_long_form().is_valid())
+        # not rollup ticks
+        form = self._get_long_form(time_interval=61)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(['The maximum date range is 7 days'], form.non_field_errors())
+
+    def test_max_date_range_rollup_not_built(self):
+        # rollup is configured, but the command has not run: the period would be read from the task table
+        self.assertFalse(is_load_rollup_built(datetime(2022, 1, 12, 1, 0, 0)))
+        form = self._get_long_form()
+        self.assertFalse(form.is_valid())
+        self.assertEqual(['The maximum date range is 7 days'], form.non_field_errors())
+        # the watermark (the last fixture task) is before the period end and long before now
+        update_load_rollup()
+        self.assertFalse(self._get_long_form(end_date=datetime(2022, 1, 20, 1, 0, 0)).is_valid())
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_MAX_LAG_SEC=10 ** 10):
+            self.assertTrue(self._get_long_form(end_date=datetime(2022, 1, 20, 1, 0, 0)).is_valid())
+        # the rollup of another interval
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_LOAD_ROLLUP_INTERVAL_SEC=60):
+            self.assertFalse(self._get_long_form().is_valid())
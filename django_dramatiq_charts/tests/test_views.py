@@ -0,0 +1,146 @@
+from datetime import datetime
+from unittest import mock
+
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django_dramatiq_charts.signals import chart_timing
+
+_fixture_dataset = 'fixtures/dataset.json'
+
+
+@override_settings(DJANGO_DRAMATIQ_CHARTS_LOAD_QS_FILTER='', DJANGO_DRAMATIQ_CHARTS_TIMELINE_QS_FILTER='',
+                   DJANGO_DRAMATIQ_CHARTS_DURATION_QS_FILTER='', DJANGO_DRAMATIQ_CHARTS_THROUGHPUT_QS_FILTER='',
+                   DJANGO_DRAMATIQ_CHARTS_QUEUE_QS_FILTER='')
+class TestChartViews(TransactionTestCase):
+    fixtures = [_fixture_dataset]
+    load_params = '?start_date=2022-01-01+01:00:00&end_date=2022-01-01+01:01:00&time_interval=10'
+    timeline_params = '?start_date=2022-01-01+01:00:00&end_date=2022-01-01+01:01:00'
+
+    def test_chart_pages(self):
+        for url_name, params in (('ddc_load_chart', self.load_params), ('ddc_duration_chart', self.load_params),
+                                 ('ddc_throughput_chart', self.load_params + '&group_by=queue'),
+                                 ('ddc_queue_chart', self.load_params),
+                                 ('ddc_timeline_chart', self.timeline_params)):
+            # no data is computed on the page
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse(url_name) + params)
+            self.assertEqual(200, response.status_code)
+            self.assertIn('{}data/'.format(reverse(url_name)), response.context['data_url'])
+            self.assertEqual(url_name == 'ddc_load_chart', bool(response.context['delta_url']))
+            # form is not valid
+            response = self.client.get(reverse(url_name))
+            self.assertEqual('', response.context['data_url'])
+
+    @override_settings(ROOT_URLCONF='django_dramatiq_charts.tests.previous_urls')
+    def test_previous_urlpatterns(self):
+        for url_name, params, data_key in (('ddc_load_chart', self.load_params, 'categories'),
+                                           ('ddc_timeline_chart', self.timeline_params, 'chart_data')):
+            response = self.client.get(reverse(url_name) + params)
+            self.assertEqual(200, response.status_code)
+            # the page serves its data, there are no export and live mode
+            data_url = response.context['data_url']
+            self.assertTrue(data_url.startswith(reverse(url_name) + '?'))
+            self.assertEqual('', response.context['export_url'])
+            self.assertEqual('', response.context['delta_url'])
+            self.assertNotIn('Export:', response.content.decode())
+            response = self.client.get(data_url)
+            self.assertEqual(200, response.status_code)
+            self.assertIn(data_key, response.json())
+
+    def test_chart_data(self):
+        response = self.client.get(reverse('ddc_load_chart_data') + self.load_params)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(['specific_tasks', 'sequential_tasks', 'parallel_tasks', 'different_status'],
+                         response.json()['categories'])
+
+        response = self.client.get(reverse('ddc_duration_chart_data') + self.load_params)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([50, 95, 99], response.json()['percentiles'])
+
+        response = self.client.get(reverse('ddc_throughput_chart_data') + self.load_params + '&group_by=queue')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('created', response.json()['series'][0])
+
+        response = self.client.get(reverse('ddc_queue_chart_data') + self.load_params)
+        self.assertEqual(200, response.status_code)
+        # fixture tasks are finished without the start saved by TaskStartMiddleware
+        self.assertEqual(['queue'], response.json()['categories'])
+        self.assertGreater(response.json()['unknown_starts'], 0)
+
+        response = self.client.get(reverse('ddc_timeline_chart_data') + self.timeline_params)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(27, len(response.json()['chart_data']['start']))
+
+        # not modified
+        etag = response['ETag']
+        response = self.client.get(reverse('ddc_timeline_chart_data') + self.timeline_params,
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+
+        # gzip
+        response = self.client.get(reverse('ddc_timeline_chart_data') + self.timeline_params,
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual('gzip', response['Content-Encoding'])
+
+    @mock.patch('django.utils.timezone.now', lambda: datetime(2022, 1, 1, 1, 1, 0))
+    def test_load_chart_delta(self):
+        response = self.client.get(reverse('ddc_load_chart_delta') + self.load_params + '&since_tick=3')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual((0, 7), (response.json()['first_tick'], response.json()['tick_count']))
+        self.assertIn('no-cache', response['Cache-Control'])
+        # before the period start
+        response = self.client.get(reverse('ddc_load_chart_delta') + self.load_params + '&since_tick=-1')
+        self.assertEqual(400, response.status_code)
+        # live mode is disabled
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_LIVE_REFRESH_SEC=0):
+            response = self.client.get(reverse('ddc_load_chart') + self.load_params)
+            self.assertEqual('', response.context['delta_url'])
+
+    def test_chart_colors(self):
+        response = self.client.get(reverse('ddc_chart_colors'))
+        self.assertEqual(200, response.status_code)
+        version = response.json()['version']
+        self.assertIn('parallel_tasks', response.json()['colors'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        # not modified
+        response = self.client.get(reverse('ddc_chart_colors'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(304, response.status_code)
+        # versioned url
+        response = self.client.get(reverse('ddc_chart_colors') + '?v=' + version)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_timing(self):
+        response = self.client.get(reverse('ddc_load_chart_data') + self.load_params)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+        timings = []
+
+        def receiver(sender, request, timing, **kwargs):
+            timings.append((sender, timing.as_dict()))
+
+        chart_timing.connect(receiver)
+        try:
+            with self.settings(DJANGO_DRAMATIQ_CHARTS_TIMING=True), \
+                    self.assertLogs('django_dramatiq_charts.timing', 'INFO') as logs:
+                response = self.client.get(reverse('ddc_load_chart_data') + self.load_params)
+                self.client.get(reverse('ddc_timeline_chart') + self.timeline_params)
+        finally:
+            chart_timing.disconnect(receiver)
+        for metric in ('validate;dur=', 'fetch;dur=', 'aggregate;dur=', 'encode;dur=', 'rows;desc=', 'ticks;desc=7'):
+            self.assertIn(metric, response['Server-Timing'])
+        self.assertEqual(['ddc_load_chart_data', 'ddc_timeline_chart'], [sender for sender, timing in timings])
+        self.assertIn('rows', timings[0][1]['counts'])
+        self.assertIn('render', timings[1][1]['durations_ms'])
+        self.assertEqual(timings[0][1], logs.records[0].chart_timing)
+
+    def test_chart_data_errors(self):
+        response = self.client.get(reverse('ddc_load_chart_data'))
+        self.assertEqual(400, response.status_code)
+        self.assertIn('start_date', response.json()['errors'])
+
+        response = self.client.post(reverse('ddc_load_chart_data') + self.load_params)
+        self.assertEqual(b'<h3>GET only</h3>', response.content)
+
+        with self.settings(DJANGO_DRAMATIQ_CHARTS_PERM_FN=lambda request: False):
+            response = self.client.get(reverse('ddc_timeline_chart_data') + self.timeline_params)
+            self.assertIn(b'Access denied', response.content)
@@ -0,0 +1,50 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from .config import get_timing_enabled
+from .signals import chart_timing
+
+logger = logging.getLogger(__name__)
+
+
+class ChartTiming:
+    """Durations of the chart request phases and the numbers of rows, ticks, etc."""
+
+    def __init__(self):
+        self.durations = {}  # phase: seconds
+        self.counts = {}  # name: number
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0) + time.perf_counter() - started
+
+    def count(self, name: str, value: int):
+        self.counts[name] = value
+
+    def as_dict(self) -> dict:
+        return {
+            'durations_ms': {name: round(sec * 1000, 3) for name, sec in self.durations.items()},
+            'counts': dict(self.counts),
+        }
+
+    def get_server_timing(self) -> str:
+        """Server-Timing header value, counts are metric descriptions"""
+        metrics = ['{};dur={:.3f}'.format(name, sec * 1000) for name, sec in self.durations.items()]
+        metrics.extend('{};desc={}'.format(name, value) for name, value in self.counts.items())
+        return ', '.join(metrics)
+
+
+def report_timing(request, response, timing: ChartTiming):
+    """Server-Timing header, log record and chart_timing signal, if DJANGO_DRAMATIQ_CHARTS_TIMING is enabled"""
+    if not get_timing_enabled():
+        return
+    view_name = request.resolver_match.url_name if request.resolver_match else request.path
+    server_timing = timing.get_server_timing()
+    response['Server-Timing'] = server_timing
+    logger.info('%s %s', view_name, server_timing, extra={'view_name': view_name, 'chart_timing': timing.as_dict()})
+    chart_timing.send(sender=view_name, request=request, timing=timing)
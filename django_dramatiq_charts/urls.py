@@ -0,0 +1,28 @@
+from django.urls import path
+
+from .views import load_chart, load_chart_data, load_chart_export, load_chart_delta, duration_chart, \
+    duration_chart_data, duration_chart_export, throughput_chart, throughput_chart_data, throughput_chart_export, \
+    queue_chart, queue_chart_data, queue_chart_export, timeline_chart, timeline_chart_data, timeline_chart_export, \
+    chart_colors, clean_cache
+
+# path('django_dramatiq_charts/', include('django_dramatiq_charts.urls')), url names are used by the chart pages
+urlpatterns = [
+    path('load_chart/', load_chart, name='ddc_load_chart'),
+    path('load_chart/data/', load_chart_data, name='ddc_load_chart_data'),
+    path('load_chart/export/', load_chart_export, name='ddc_load_chart_export'),
+    path('load_chart/delta/', load_chart_delta, name='ddc_load_chart_delta'),
+    path('duration_chart/', duration_chart, name='ddc_duration_chart'),
+    path('duration_chart/data/', duration_chart_data, name='ddc_duration_chart_data'),
+    path('duration_chart/export/', duration_chart_export, name='ddc_duration_chart_export'),
+    path('throughput_chart/', throughput_chart, name='ddc_throughput_chart'),
+    path('throughput_chart/data/', throughput_chart_data, name='ddc_throughput_chart_data'),
+    path('throughput_chart/export/', throughput_chart_export, name='ddc_throughput_chart_export'),
+    path('queue_chart/', queue_chart, name='ddc_queue_chart'),
+    path('queue_chart/data/', queue_chart_data, name='ddc_queue_chart_data'),
+    path('queue_chart/export/', queue_chart_export, name='ddc_queue_chart_export'),
+    path('timeline_chart/', timeline_chart, name='ddc_timeline_chart'),
+    path('timeline_chart/data/', timeline_chart_data, name='ddc_timeline_chart_data'),
+    path('timeline_chart/export/', timeline_chart_export, name='ddc_timeline_chart_export'),
+    path('colors/', chart_colors, name='ddc_chart_colors'),
+    path('clean_cache/', clean_cache, name='ddc_clean_cache'),
+]
@@ -1,16 +1,33 @@
-from django.http import HttpResponse, HttpResponseRedirect
+from hashlib import md5
+from typing import Optional
+
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.core.cache import cache
 from django.core.handlers.wsgi import WSGIRequest
 from django.conf import settings
-from django.utils.http import url_has_allowed_host_and_scheme
+from django.urls import reverse, NoReverseMatch
+from django.utils.cache import get_conditional_response, patch_cache_control, add_never_cache_headers
+from django.utils.http import url_has_allowed_host_and_scheme, quote_etag
+from django.views.decorators.gzip import gzip_page
 
+from .colors import get_actor_color_table
+from .chart_cache import get_cached_chart_data, get_chart_data_cache_timeout, clean_chart_data_cache
 from .consts import CACHE_KEY_ACTOR_CHOICES, CACHE_KEY_QUEUE_CHOICES
-from .forms import DramatiqLoadChartForm, DramatiqTimelineChartForm
-from .config import get_perm_fn, get_cache_form_data_sec, get_clean_cache_redirect_url
+from .timing import ChartTiming, report_timing
+from .json_encoder import ChartJsonResponse
+from .export import EXPORT_FORMAT_CSV, get_export_formats, get_export_content_type, get_export_file_name, \
+    iter_export
+from .forms import DramatiqLoadChartForm, DramatiqLoadChartDeltaForm, DramatiqDurationChartForm, \
+    DramatiqThroughputChartForm, DramatiqQueueChartForm, DramatiqTimelineChartForm
+from .config import get_perm_fn, get_cache_form_data_sec, get_clean_cache_redirect_url, get_cache_chart_data_sec, \
+    get_live_refresh_sec
 
 _err_get_only = '<h3>GET only</h3>'
 _err_access_denied = '<h3>Access denied, <a href="/">go home 🏠</a></h3>'
+_colors_max_age_sec = 60 * 60 * 24 * 365
+# the chart page returns its data with this parameter, when the data view is not in the urlpatterns
+_page_data_param = 'chart_data'
 
 
 def _safe_redirect_to_http_referer(request: WSGIRequest, fallback_url: str = '/') -> HttpResponseRedirect:
@@ -25,40 +42,221 @@ def _safe_redirect_to_http_referer(request: WSGIRequest, fallback_url: str = '/'
         return redirect(fallback_url)
 
 
-def load_chart(request):
+def _check_request(request) -> Optional[HttpResponse]:
+    """Error response for the request that can not get a chart"""
     if request.method != "GET":
         return HttpResponse(_err_get_only)
     if not (get_perm_fn())(request):
         return HttpResponse(_err_access_denied)
-    response = {}
-    form = DramatiqLoadChartForm(request.GET or None)
-    if form.is_valid():
-        response.update(form.get_chart_data())
-    response.update({
-        'form': form,
-        'cache_enabled': get_cache_form_data_sec(),
-    })
-    return render(request, 'django_dramatiq_charts/load_chart.html', response)
+    return None
+
+
+def _get_chart_view_url(request, url_name: str) -> str:
+    """Url of the chart view with the page query, empty if the view is not in the urlpatterns"""
+    try:
+        return '{}?{}'.format(reverse(url_name), request.GET.urlencode())
+    except NoReverseMatch:
+        return ''
+
+
+def _render_chart_page(request, form_class, template_name: str, data_url_name: str, export_url_name: str,
+                       delta_url_name: str = ''):
+    if request.GET.get(_page_data_param):
+        # urlpatterns of the previous versions have the chart pages only
+        return _chart_data_response(request, form_class)
+    error_response = _check_request(request)
+    if error_response:
+        return error_response
+    timing = ChartTiming()
+    form = form_class(request.GET or None, timing=timing)
+    data_url = export_url = delta_url = ''
+    live_refresh_sec = get_live_refresh_sec()
+    with timing.phase('validate'):
+        is_valid = form.is_valid()
+    if is_valid:
+        # chart data is loaded by the page
+        data_url = _get_chart_view_url(request, data_url_name) or '{}?{}&{}=1'.format(
+            request.path, request.GET.urlencode(), _page_data_param)
+        export_url = _get_chart_view_url(request, export_url_name)
+        if delta_url_name and live_refresh_sec:
+            delta_url = _get_chart_view_url(request, delta_url_name)
+    with timing.phase('render'):
+        response = render(request, template_name, {
+            'form': form,
+            'data_url': data_url,
+            'export_url': export_url,
+            'export_formats': get_export_formats(),
+            'delta_url': delta_url,
+            'live_refresh_sec': live_refresh_sec,
+            'cache_enabled': get_cache_form_data_sec() or get_cache_chart_data_sec(),
+        })
+    report_timing(request, response, timing)
+    return response
+
+
+def _chart_data_response(request, form_class) -> HttpResponse:
+    error_response = _check_request(request)
+    if error_response:
+        return error_response
+    timing = ChartTiming()
+    form = form_class(request.GET, timing=timing)
+    with timing.phase('validate'):
+        is_valid = form.is_valid()
+    if not is_valid:
+        return JsonResponse({'errors': form.errors}, status=400)
+    with timing.phase('chart_data'):
+        chart_data = get_cached_chart_data(form)
+    with timing.phase('encode'):
+        response = ChartJsonResponse(chart_data)
+    etag = quote_etag(md5(response.content).hexdigest())
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=get_chart_data_cache_timeout(form))
+    response = get_conditional_response(request, etag=etag, response=response)
+    report_timing(request, response, timing)
+    return response
+
+
+def _chart_export_response(request, form_class, name: str) -> HttpResponse:
+    """Chart data rows streamed in the format of the "format" query parameter: csv, arrow or parquet"""
+    error_response = _check_request(request)
+    if error_response:
+        return error_response
+    timing = ChartTiming()
+    form = form_class(request.GET, timing=timing)
+    with timing.phase('validate'):
+        is_valid = form.is_valid()
+    if not is_valid:
+        return JsonResponse({'errors': form.errors}, status=400)
+    export_format = request.GET.get('format', EXPORT_FORMAT_CSV)
+    if export_format not in get_export_formats():
+        return JsonResponse({'errors': {'format': ['Available formats: ' + ', '.join(get_export_formats())]}},
+                            status=400)
+    with timing.phase('chart_data'):
+        columns, rows = form.get_export_data()
+    response = StreamingHttpResponse(iter_export(export_format, columns, rows),
+                                     content_type=get_export_content_type(export_format))
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(get_export_file_name(name, export_format))
+    add_never_cache_headers(response)
+    report_timing(request, response, timing)
+    return response
+
+
+def load_chart(request):
+    return _render_chart_page(request, DramatiqLoadChartForm, 'django_dramatiq_charts/load_chart.html',
+                              'ddc_load_chart_data', 'ddc_load_chart_export', 'ddc_load_chart_delta')
+
+
+@gzip_page
+def load_chart_data(request):
+    return _chart_data_response(request, DramatiqLoadChartForm)
+
+
+@gzip_page
+def load_chart_export(request):
+    return _chart_export_response(request, DramatiqLoadChartForm, 'load_chart')
+
+
+@gzip_page
+def load_chart_delta(request):
+    """Live load chart update, see DramatiqLoadChartDeltaForm"""
+    error_response = _check_request(request)
+    if error_response:
+        return error_response
+    timing = ChartTiming()
+    form = DramatiqLoadChartDeltaForm(request.GET, timing=timing)
+    with timing.phase('validate'):
+        is_valid = form.is_valid()
+    if not is_valid:
+        return JsonResponse({'errors': form.errors}, status=400)
+    with timing.phase('chart_data'):
+        chart_delta = form.get_chart_delta()
+    with timing.phase('encode'):
+        response = ChartJsonResponse(chart_delta)
+    add_never_cache_headers(response)
+    report_timing(request, response, timing)
+    return response
+
+
+def duration_chart(request):
+    return _render_chart_page(request, DramatiqDurationChartForm, 'django_dramatiq_charts/duration_chart.html',
+                              'ddc_duration_chart_data', 'ddc_duration_chart_export')
+
+
+@gzip_page
+def duration_chart_data(request):
+    return _chart_data_response(request, DramatiqDurationChartForm)
+
+
+@gzip_page
+def duration_chart_export(request):
+    return _chart_export_response(request, DramatiqDurationChartForm, 'duration_chart')
+
+
+def throughput_chart(request):
+    return _render_chart_page(request, DramatiqThroughputChartForm, 'django_dramatiq_charts/throughput_chart.html',
+                              'ddc_throughput_chart_data', 'ddc_throughput_chart_export')
+
+
+@gzip_page
+def throughput_chart_data(request):
+    return _chart_data_response(request, DramatiqThroughputChartForm)
+
+
+@gzip_page
+def throughput_chart_export(request):
+    return _chart_export_response(request, DramatiqThroughputChartForm, 'throughput_chart')
+
+
+def queue_chart(request):
+    return _render_chart_page(request, DramatiqQueueChartForm, 'django_dramatiq_charts/queue_chart.html',
+                              'ddc_queue_chart_data', 'ddc_queue_chart_export')
+
+
+@gzip_page
+def queue_chart_data(request):
+    return _chart_data_response(request, DramatiqQueueChartForm)
+
+
+@gzip_page
+def queue_chart_export(request):
+    return _chart_export_response(request, DramatiqQueueChartForm, 'queue_chart')
 
 
 def timeline_chart(request):
-    if request.method != "GET":
-        return HttpResponse(_err_get_only)
-    if not (get_perm_fn())(request):
-        return HttpResponse(_err_access_denied)
-    response = {}
-    form = DramatiqTimelineChartForm(request.GET or None)
-    if form.is_valid():
-        response.update(form.get_chart_data())
-    response.update({
-        'form': form,
-        'cache_enabled': get_cache_form_data_sec(),
-    })
-    return render(request, 'django_dramatiq_charts/timeline_chart.html', response)
+    return _render_chart_page(
+        request, DramatiqTimelineChartForm, 'django_dramatiq_charts/timeline_chart.html', 'ddc_timeline_chart_data',
+        'ddc_timeline_chart_export')
+
+
+@gzip_page
+def timeline_chart_data(request):
+    return _chart_data_response(request, DramatiqTimelineChartForm)
+
+
+@gzip_page
+def timeline_chart_export(request):
+    return _chart_export_response(request, DramatiqTimelineChartForm, 'timeline_chart')
+
+
+def chart_colors(request):
+    """Actor color table of the charts, the url with ?v=<version> is cached by the browser"""
+    error_response = _check_request(request)
+    if error_response:
+        return error_response
+    color_table = get_actor_color_table()
+    response = ChartJsonResponse({'version': color_table.version, 'colors': color_table.colors})
+    if request.GET.get('v') == color_table.version:
+        patch_cache_control(response, private=True, max_age=_colors_max_age_sec, immutable=True)
+        return response
+    etag = quote_etag(color_table.version)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
 
 
 def clean_cache(request):
     cache.delete_many((CACHE_KEY_ACTOR_CHOICES, CACHE_KEY_QUEUE_CHOICES))
+    clean_chart_data_cache()
     clean_cache_redirect_url = get_clean_cache_redirect_url()
     if clean_cache_redirect_url:
         return redirect(clean_cache_redirect_url)
@@ -17,6 +17,19 @@ setuptools.setup(
     version=get_version('django_dramatiq_charts'),
     packages=setuptools.find_packages(exclude=['django_dramatiq_charts.tests']),
     include_package_data=True,
+    python_requires='>=3.7',
+    install_requires=[
+        'Django>=3.2',
+        'asgiref>=3.5',
+        'dramatiq>=1.11',
+        'django_dramatiq>=0.10.0',
+    ],
+    extras_require={
+        'numpy': ['numpy'],
+        'arrow': ['pyarrow'],
+        'msgspec': ['msgspec'],
+        'orjson': ['orjson'],
+    },
     url='https://github.com/ikvk/django_dramatiq_charts',
     license='Apache-2.0',
     long_description=long_description,